@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import collections.abc
 import sys
+import typing
 import uuid
 from abc import ABC, abstractmethod
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
 from enum import Enum
 from typing import TYPE_CHECKING, Any, Generic
 
@@ -31,6 +34,18 @@ if TYPE_CHECKING:
     from pydiverse.pipedag.materialize.core import MaterializingTask
 
 
+def batch_type(type_: Any) -> Any | None:
+    """Returns `X` if `type_` is ``Iterator[X]``, otherwise None
+
+    Tasks with ``input_type=Iterator[X]`` receive their input tables as iterators
+    of batches of type `X` (see `TableHook.retrieve_batches`).
+    """
+    if typing.get_origin(type_) is collections.abc.Iterator:
+        (item_type,) = typing.get_args(type_)
+        return item_type
+    return None
+
+
 class TableHookResolver:
     class ClassState:
         def __init__(self):
@@ -146,6 +161,9 @@ class TableHookResolver:
         self: Self, type_: type[T] | tuple | dict
     ) -> type[TableHook[Self]]:
         """Get a table hook that can retrieve the specified type"""
+        if (item_type := batch_type(type_)) is not None:
+            type_ = item_type
+
         if isinstance(type_, tuple):
             type_ = type_[0]
         elif isinstance(type_, dict):
@@ -248,6 +266,8 @@ class TableHookResolver:
                 return hook.retrieve_for_auto_versioning_lazy(
                     self, table, stage_name, as_type
                 )
+            if (item_type := batch_type(as_type)) is not None:
+                return hook.retrieve_batches(self, table, stage_name, item_type)
 
             return hook.retrieve(self, table, stage_name, as_type)
         except Exception as e:
@@ -337,9 +357,39 @@ class BaseTableStore(TableHookResolver, Disposable):
 
     def store_table(self, table: Table, task: MaterializingTask | None):
         super().store_table(table, task)
-        if self.local_table_cache:
+        # The cache key of tables produced by fingerprinting tasks only is final
+        # after the fingerprint got compared. They get stored in the local table
+        # cache by the caller.
+        if self.local_table_cache and not (task is not None and task.fingerprint):
             self.local_table_cache.store_table(table, task)
 
+    @contextmanager
+    def defer_table_ddl(self):
+        """Context manager for storing several tables at once
+
+        Table stores can use it to postpone expensive DDL on the stored tables
+        (e.g. creating indexes) until all of them have been written. The
+        postponed DDL gets executed when the context exits without an exception.
+        By default, nothing gets postponed.
+        """
+        yield
+
+    def compute_table_fingerprint(self, table: Table) -> str | None:
+        """Computes a fingerprint of the content of a materialized table
+
+        Gets called after the table has been stored for tasks with
+        `fingerprint=True`. If the fingerprint is the same as in the previous
+        run of the task, the table keeps its previous cache key.
+
+        :return: A string that only changes if the content of the table changes,
+            or ``None`` if no fingerprint can be computed for this table.
+        """
+        try:
+            hook = self.get_m_table_hook(type(table.obj))
+            return hook.content_fingerprint(self, table.obj)
+        except TypeError:
+            return None
+
     def execute_raw_sql(self, raw_sql: RawSql):
         """Executed raw SQL statements in the associated transaction stage
 
@@ -596,14 +646,21 @@ class BaseTableStore(TableHookResolver, Disposable):
         if for_auto_versioning:
             return super().retrieve_table_obj(table, as_type, for_auto_versioning)
 
-        if self.local_table_cache:
+        if batch_type(as_type) is not None:
+            # Batches get streamed from the table store and can't be cached
+            return super().retrieve_table_obj(table, as_type)
+
+        # Samples and row limits are only drawn by the table store, such that
+        # every read returns the same rows
+        if self.local_table_cache and table.sample is None and table.limit is None:
             obj = self.local_table_cache.retrieve_table_obj(table, as_type)
             if obj is not None:
                 return obj
 
         obj = super().retrieve_table_obj(table, as_type)
 
-        if self.local_table_cache:
+        # Only complete tables can be used as cache for other tasks
+        if self.local_table_cache and not table.is_partial_read:
             t = table.copy_without_obj()
             t.obj = obj
             self.local_table_cache.store_input(t, task=None)
@@ -640,6 +697,19 @@ class BaseTableStore(TableHookResolver, Disposable):
         as the same position hash as the `task` object, it should get returned.
         """
 
+    def retrieve_stage_task_metadata(self, stage: Stage) -> list[TaskMetadata]:
+        """Retrieves the metadata of all tasks in the committed stage
+
+        Only metadata that is associated with the base stage / cache (and not
+        the current transaction) should get returned. This allows looking up
+        the cache validity of many tasks without querying the store for each
+        individual task (see :py:meth:`Flow.plan`).
+
+        By default, no metadata gets returned, which means that all tasks are
+        predicted to run.
+        """
+        return []
+
     # Lazy Table Metadata
 
     @abstractmethod
@@ -698,8 +768,54 @@ class BaseTableStore(TableHookResolver, Disposable):
             "This table store does not support executing raw sql statements"
         )
 
+    def flush_metadata(self, stage: Stage | None = None):
+        """Writes all buffered metadata to the store
+
+        Table stores may buffer the metadata passed to the `store_*_metadata`
+        methods (and `store_task_duration`) instead of writing it immediately.
+        The buffered metadata must get written before the stage gets committed
+        at the latest.
+
+        :param stage: If provided, only the metadata of this stage gets written.
+            Otherwise, the metadata of all stages gets written.
+        """
+
+    # Task Durations
+
+    def store_task_duration(self, task: MaterializingTask, duration: float):
+        """Stores how long it took to execute a task
+
+        Task durations are only used as a heuristic for scheduling tasks and
+        thus aren't associated with a stage transaction. Table stores that
+        don't support storing task durations can ignore this call.
+
+        :param task: The task that was executed.
+        :param duration: The duration in seconds.
+        """
+
+    def retrieve_task_durations(self, stages: Iterable[Stage]) -> dict[str, float]:
+        """Retrieve the most recent durations of all tasks in the given stages
+
+        :param stages: The stages for which task durations should be retrieved.
+        :return: A dictionary mapping from the position hash of a task to
+            the duration (in seconds) of the most recent execution of the task.
+        """
+        return {}
+
     # Utility
 
+    def has_committed_tables(self, stage: Stage, names: Iterable[str]) -> bool:
+        """Check that all tables with the given names exist in the committed stage
+
+        Used before reading cache valid outputs directly from the committed
+        stage (see `cache_validation.skip_cache_valid_stages`). Table stores
+        that can't check this should return False.
+
+        :param stage: The stage in which to look for the tables.
+        :param names: The names of the tables.
+        """
+        return False
+
     @abstractmethod
     def get_objects_in_stage(self, stage: Stage) -> list[str]:
         """
@@ -800,6 +916,47 @@ class TableHook(Generic[TableHookResolverT], ABC):
         :return: The retrieved table (converted to the correct type)
         """
 
+    @classmethod
+    def retrieve_batches(
+        cls,
+        store: TableHookResolverT,
+        table: Table,
+        stage_name: str | None,
+        as_type: type[T] | tuple | dict[str, Any],
+    ) -> Iterator[T]:
+        """Retrieve a table from the store as an iterator of batches
+
+        Used for tasks with ``input_type=Iterator[as_type]``. The default
+        implementation retrieves the complete table and returns it as a single
+        batch. Hooks that can read tables incrementally should override this
+        method, such that only one batch needs to be held in memory at a time.
+
+        :param as_type: The type of the individual batches
+        :return: An iterator over the batches of the table
+        """
+        return iter([cls.retrieve(store, table, stage_name, as_type)])
+
+    @classmethod
+    def retrieve_handoff(
+        cls,
+        store: TableHookResolverT,
+        table: Table,
+        obj: T,
+        as_type: type[T],
+    ) -> T:
+        """Hand over an object returned by a task without reading it from the store
+
+        Used for downstream tasks in the same process that request a table as
+        the same type that was materialized (see the `write_behind` and
+        `handoff_cache` config options). The result must look as if `table`
+        had been retrieved from the store with ``retrieve`` (index, dtypes, ...)
+        and must not share mutable state with `obj`.
+
+        :raises TypeError: if the object can't be handed over. The table gets
+            retrieved from the store instead.
+        """
+        raise TypeError(f"Handoff not supported for objects of type {type(obj)}")
+
     @classmethod
     def auto_table(cls, obj: T) -> Table[T]:
         """Wrap an object inside a `Table`
@@ -825,6 +982,20 @@ class TableHook(Generic[TableHookResolverT], ABC):
         """
         raise TypeError(f"Lazy query not supported with object of type {type(obj)}")
 
+    @classmethod
+    def content_fingerprint(cls, store: TableHookResolverT, obj) -> str:
+        """Fingerprint of the content of the associated object
+
+        Used for materializing tasks with `fingerprint=True` to detect that a
+        re-executed task produced a table with the same content as before.
+        The fingerprint should not depend on the order of the rows.
+
+        :raises TypeError: if the type doesn't support content fingerprints.
+        """
+        raise TypeError(
+            f"Content fingerprint not supported with object of type {type(obj)}"
+        )
+
     @classmethod
     def retrieve_for_auto_versioning_lazy(
         cls,
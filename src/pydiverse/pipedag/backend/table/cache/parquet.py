@@ -7,6 +7,7 @@ from pathlib import Path
 from typing import Any
 
 import pandas as pd
+import pyarrow.parquet as pq
 from packaging.version import Version
 
 from pydiverse.pipedag import ConfigContext, Stage, Table
@@ -150,7 +151,9 @@ class PandasTableHook(TableHook[ParquetTableCache]):
     @classmethod
     def _retrieve(cls, store, table, **pandas_kwargs):
         path = store.get_table_path(table, ".parquet")
-        return pd.read_parquet(path, **pandas_kwargs)
+        if table.filters is not None:
+            pandas_kwargs["filters"] = table.filters
+        return pd.read_parquet(path, columns=table.columns, **pandas_kwargs)
 
 
 try:
@@ -185,7 +188,10 @@ class PolarsTableHook(TableHook[ParquetTableCache]):
         as_type: type,
     ):
         path = store.get_table_path(table, ".parquet")
-        return polars.read_parquet(path)
+        if table.filters is None:
+            return polars.read_parquet(path, columns=table.columns)
+        data = pq.read_table(path, columns=table.columns, filters=table.filters)
+        return polars.from_arrow(data)
 
 
 try:
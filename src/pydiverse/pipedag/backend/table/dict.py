@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import warnings
+from collections.abc import Iterable
 
 import pandas as pd
 
@@ -114,6 +115,9 @@ class DictTableStore(BaseTableStore):
                 task_metadata.append(m)
         return task_metadata
 
+    def retrieve_stage_task_metadata(self, stage: Stage) -> list[TaskMetadata]:
+        return list(self.metadata.get(stage, {}).values())
+
     def store_lazy_table_metadata(self, metadata: LazyTableMetadata):
         cache_key = metadata.query_hash + metadata.task_hash
         self.t_lazy_table_metadata[metadata.stage][cache_key] = metadata
@@ -130,6 +134,9 @@ class DictTableStore(BaseTableStore):
     def get_objects_in_stage(self, stage):
         return list(self.store[stage.transaction_name].keys())
 
+    def has_committed_tables(self, stage: Stage, names: Iterable[str]) -> bool:
+        return set(names) <= self.store.get(stage.name, {}).keys()
+
     def get_table_objects_in_stage(self, stage: Stage, include_views=True) -> list[str]:
         _ = include_views  # not supported for dict table store
         return list(self.store[stage.transaction_name].keys())
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable, Hashable, Iterable
+from typing import Any
+
+import sqlalchemy as sa
+
+from pydiverse.pipedag.container import Schema
+
+
+class CatalogCache:
+    """In-memory cache of the database catalog used during a single flow run
+
+    It holds the names of all tables and views of a schema, and the reflected
+    :py:class:`sqlalchemy.Table` objects of a schema. Both get loaded in bulk
+    (once per schema) the first time they are needed.
+
+    Whenever pipedag itself modifies a schema (create, drop, rename, schema
+    swap, ...), the :py:class:`SQLTableStore` calls :py:meth:`invalidate` for
+    the affected schemas. Changes made by other processes (e.g. a stage commit
+    with ``DaskEngine``) aren't noticed this way. Instead, every entry is
+    stored together with the state returned by ``get_state(schema)`` when it
+    was loaded, and gets reloaded once that state changes.
+
+    Schema names are compared case-insensitively: invalidating too much is
+    harmless, while a stale entry is not.
+    """
+
+    def __init__(self, run_id: str, get_state: Callable[[str], Hashable]):
+        self.run_id = run_id
+        self.get_state = get_state
+
+        self._lock = threading.RLock()
+        self._names = {}  # type: dict[str, tuple[Hashable, set[str]]]
+        self._view_names = {}  # type: dict[str, tuple[Hashable, set[str]]]
+        self._tables = {}  # type: dict[str, tuple[Hashable, dict[str, sa.Table]]]
+
+    @staticmethod
+    def _key(schema: str) -> str:
+        return schema.lower()
+
+    def _get_entry(self, cache: dict, schema: str, load: Callable[[], Any]):
+        key = self._key(schema)
+        state = self.get_state(key)
+        with self._lock:
+            entry = cache.get(key)
+            if entry is None or entry[0] != state:
+                entry = cache[key] = (state, load())
+            return entry[1]
+
+    def get_names(
+        self, schema: str, load: Callable[[], Iterable[str]]
+    ) -> frozenset[str]:
+        """Names of all tables and views in a schema
+
+        :param load: Function that returns the names if they aren't cached yet.
+        """
+        return frozenset(self._get_entry(self._names, schema, lambda: set(load())))
+
+    def get_view_names(
+        self, schema: str, load: Callable[[], Iterable[str]]
+    ) -> frozenset[str]:
+        """Names of all views in a schema
+
+        :param load: Function that returns the names if they aren't cached yet.
+        """
+        return frozenset(self._get_entry(self._view_names, schema, lambda: set(load())))
+
+    def get_table(
+        self,
+        schema: str,
+        name: str,
+        load_schema: Callable[[], Iterable[sa.Table]],
+        load_table: Callable[[], sa.Table],
+    ) -> sa.Table:
+        """Reflected table object
+
+        :param load_schema: Function that reflects all tables in the schema.
+            Gets called once per schema.
+        :param load_table: Function that reflects just this table. Gets called
+            if the table wasn't found by `load_schema`.
+        """
+        tables = self._get_entry(
+            self._tables,
+            schema,
+            lambda: {tbl.name: tbl for tbl in load_schema()},
+        )
+        with self._lock:
+            if name not in tables:
+                tables[name] = load_table()
+            return tables[name]
+
+    def invalidate(self, schema: str | Schema | None = None):
+        """Drop the cached catalog of a schema, or of all schemas if None"""
+        with self._lock:
+            if schema is None:
+                self._names.clear()
+                self._view_names.clear()
+                self._tables.clear()
+                return
+
+            if isinstance(schema, Schema):
+                schema = schema.get()
+            key = self._key(schema)
+            self._names.pop(key, None)
+            self._view_names.pop(key, None)
+            self._tables.pop(key, None)
+
+
+def get_ddl_schemas(statement: sa.schema.DDLElement) -> list[str | Schema] | None:
+    """Schemas that get modified by a DDL statement
+
+    Returns None if they can't be determined, in which case all schemas must be
+    considered modified.
+    """
+    if isinstance(statement, sa.schema._CreateDropBase):
+        # SQLAlchemy DDL (CreateTable, CreateIndex, ...)
+        element = statement.element
+        if isinstance(element, sa.Index):
+            element = element.table
+        schema = getattr(element, "schema", None)
+        return None if schema is None else [schema]
+
+    # Pipedag DDL
+    schemas = []
+    for attr in ("schema", "from_", "to", "from_schema", "to_schema"):
+        schema = getattr(statement, attr, None)
+        if isinstance(schema, (str, Schema)):
+            schemas.append(schema)
+    return schemas or None
@@ -22,6 +22,7 @@ __all__ = [
     "CreateAlias",
     "CopyTable",
     "RenameTable",
+    "MoveTable",
     "DropTable",
     "CreateDatabase",
     "DropAlias",
@@ -201,6 +202,23 @@ class RenameTable(DDLElement):
         self.schema = schema
 
 
+class MoveTable(DDLElement):
+    """
+    Move a table to another schema without copying its content.
+    Only supported by some dialects (e.g. postgres and snowflake).
+    """
+
+    def __init__(
+        self,
+        name,
+        from_schema: Schema,
+        to_schema: Schema,
+    ):
+        self.name = name
+        self.from_schema = from_schema
+        self.to_schema = to_schema
+
+
 class DropTable(DDLElement):
     def __init__(self, name, schema: Schema | str, if_exists=False, cascade=False):
         self.name = name
@@ -902,6 +920,24 @@ def visit_rename_table(rename_table: RenameTable, compiler, **kw):
     return f"ALTER TABLE {schema}.{from_table} RENAME TO {schema}.{to_table}"
 
 
+@compiles(MoveTable)
+def visit_move_table(move_table: MoveTable, compiler, **kw):
+    _ = kw
+    table = compiler.preparer.quote(move_table.name)
+    from_schema = compiler.preparer.format_schema(move_table.from_schema.get())
+    to_schema = compiler.preparer.format_schema(move_table.to_schema.get())
+    return f"ALTER TABLE {from_schema}.{table} SET SCHEMA {to_schema}"
+
+
+@compiles(MoveTable, "snowflake")
+def visit_move_table_snowflake(move_table: MoveTable, compiler, **kw):
+    _ = kw
+    table = compiler.preparer.quote(move_table.name)
+    from_schema = compiler.preparer.format_schema(move_table.from_schema.get())
+    to_schema = compiler.preparer.format_schema(move_table.to_schema.get())
+    return f"ALTER TABLE {from_schema}.{table} RENAME TO {to_schema}.{table}"
+
+
 @compiles(DropTable)
 def visit_drop_table(drop: DropTable, compiler, **kw):
     return _visit_drop_anything(drop, "TABLE", compiler, **kw)
@@ -1263,6 +1299,32 @@ def visit_lock_source_table_ibm_db_sa(
     return f"LOCK TABLE {schema}.{name} IN SHARE MODE"
 
 
+@compiles(sa.sql.expression.TableSample, "duckdb")
+def visit_table_sample_duckdb(sample: sa.sql.expression.TableSample, compiler, **kw):
+    """DuckDB expects ``TABLESAMPLE 10% (bernoulli, seed)``"""
+    method = sample._get_method()
+    (percent,) = method.clauses
+    options = [method.name]
+    if sample.seed is not None:
+        options.append(compiler.process(sample.seed, **kw))
+    kw["asfrom"] = True
+    alias = compiler.visit_alias(sample, **kw)
+    percent = compiler.process(percent, **kw)
+    return f"{alias} TABLESAMPLE {percent}% ({', '.join(options)})"
+
+
+@compiles(sa.sql.expression.TableSample, "mssql")
+def visit_table_sample_mssql(sample: sa.sql.expression.TableSample, compiler, **kw):
+    """SQL Server only supports sampling of pages: ``TABLESAMPLE (10 PERCENT)``"""
+    (percent,) = sample._get_method().clauses
+    kw["asfrom"] = True
+    alias = compiler.visit_alias(sample, **kw)
+    text = f"{alias} TABLESAMPLE ({compiler.process(percent, **kw)} PERCENT)"
+    if sample.seed is not None:
+        text += f" REPEATABLE ({compiler.process(sample.seed, **kw)})"
+    return text
+
+
 def _get_nullable_change_statements(change, compiler):
     table = compiler.preparer.quote(change.table_name)
     schema = compiler.preparer.format_schema(change.schema.get())
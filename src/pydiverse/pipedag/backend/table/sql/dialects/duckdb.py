@@ -1,14 +1,19 @@
 from __future__ import annotations
 
+import uuid
 import warnings
 from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
 import sqlalchemy as sa
 
 from pydiverse.pipedag import Table
 from pydiverse.pipedag.backend.table.sql.hooks import (
+    ArrowDownloadError,
+    ArrowTableHook,
     IbisTableHook,
+    LazyPolarsTableHook,
     PandasTableHook,
     PolarsTableHook,
 )
@@ -64,6 +69,41 @@ class DuckDBTableStore(SQLTableStore):
         _ = table, is_sql
         return False  # DuckDB is not good with stable type arithmetic
 
+    def get_table_fingerprint_query(self, table: sa.sql.expression.TableClause):
+        # hash(t) hashes the whole row; summing as HUGEINT avoids overflow
+        return sa.select(sa.text("sum(hash(t)::HUGEINT)"), sa.func.count()).select_from(
+            table.alias("t")
+        )
+
+    def _swap_alias_with_table_copy(self, table: Table, table_copy: Table):
+        # DuckDB can't rename tables that have indexes (this includes primary
+        # keys). -> Drop them and create the indexes of `table` after renaming.
+        schema = self.get_schema(table.stage.transaction_name)
+        query = sa.text(
+            "SELECT index_name FROM duckdb_indexes() "
+            "WHERE schema_name = :schema AND table_name = :name"
+        ).bindparams(schema=schema.get(), name=table_copy.name)
+        with self.engine_connect() as conn:
+            index_names = conn.execute(query).scalars().all()
+        if not index_names:
+            return super()._swap_alias_with_table_copy(table, table_copy)
+
+        preparer = self.engine.dialect.identifier_preparer
+        schema_name = preparer.format_schema(schema.get())
+        for index_name in index_names:
+            self.execute(f"DROP INDEX {schema_name}.{preparer.quote(index_name)}")
+        super()._swap_alias_with_table_copy(table, table_copy)
+        self.add_table_primary_key(table, schema)
+        self.add_table_indexes(table, schema)
+
+    def get_estimated_row_count(self, name: str, schema: str) -> int | None:
+        query = sa.text(
+            "SELECT estimated_size FROM duckdb_tables() "
+            "WHERE schema_name = :schema AND table_name = :name"
+        ).bindparams(schema=schema, name=name)
+        with self.engine_connect() as conn:
+            return conn.execute(query).scalar()
+
 
 @DuckDBTableStore.register_table(pd)
 class PandasTableHook(PandasTableHook):
@@ -107,6 +147,74 @@ class PandasTableHook(PandasTableHook):
             table_cols=df.columns,
         )
 
+    @classmethod
+    def _execute_append(
+        cls,
+        df: pd.DataFrame,
+        store: DuckDBTableStore,
+        table: Table[pd.DataFrame],
+        schema: Schema,
+        dtypes: dict[str, DType],
+    ):
+        engine = store.engine
+        table_name = engine.dialect.identifier_preparer.quote(table.name)
+        schema_name = engine.dialect.identifier_preparer.format_schema(schema.get())
+
+        conn = engine.raw_connection()
+        try:
+            # Attention: This sql copies local variable df into database (FROM df)
+            conn.execute(f"INSERT INTO {schema_name}.{table_name} SELECT * FROM df")
+        finally:
+            conn.close()
+
+
+# Errors raised by duckdb if a result can't be converted to arrow
+_ARROW_CONVERSION_ERRORS = (
+    (duckdb.NotImplementedException, duckdb.ConversionException)
+    if duckdb is not None
+    else ()
+)
+
+
+@DuckDBTableStore.register_table(duckdb)
+class ArrowTableHook(ArrowTableHook):
+    @classmethod
+    def download_arrow(cls, store: DuckDBTableStore, query: str) -> pa.Table:
+        # Connectorx doesn't support duckdb, but duckdb can return arrow directly
+        conn = store.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query)
+            return cursor.fetch_arrow_table()
+        except _ARROW_CONVERSION_ERRORS as e:
+            raise ArrowDownloadError(str(e)) from e
+        finally:
+            conn.close()
+
+    @classmethod
+    def download_arrow_batches(
+        cls, store: DuckDBTableStore, query: str, batch_size: int
+    ) -> pa.RecordBatchReader:
+        conn = store.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query)
+            reader = cursor.fetch_record_batch(batch_size)
+        except BaseException as e:
+            conn.close()
+            if isinstance(e, _ARROW_CONVERSION_ERRORS):
+                raise ArrowDownloadError(str(e)) from e
+            raise
+
+        def batches():
+            # The connection stays open until all batches have been read
+            try:
+                yield from reader
+            finally:
+                conn.close()
+
+        return pa.RecordBatchReader.from_batches(reader.schema, batches())
+
 
 try:
     import polars
@@ -115,18 +223,96 @@ except ImportError as e:
     polars = None
 
 
-@DuckDBTableStore.register_table(polars, duckdb)
+@DuckDBTableStore.register_table(polars)
 class PolarsTableHook(PolarsTableHook):
     @classmethod
-    def _execute_query(cls, query: str, connection_uri: str, store: SQLTableStore):
-        # Connectorx doesn't support duckdb.
-        # Instead, we load it like this:  DuckDB -> PyArrow -> Polars
-        connection_uri = connection_uri.replace("duckdb:///", "", 1)
-        with duckdb.connect(connection_uri) as conn:
-            pl_table = conn.sql(query).arrow()
-
-        df = polars.from_arrow(pl_table)
-        return df
+    def materialize(cls, store, table: Table[polars.DataFrame], stage_name: str):
+        # Let DuckDB scan the arrow data instead of converting to pandas first
+        df = table.obj
+        schema = store.get_schema(stage_name)
+        dtypes = dict(zip(df.columns, map(DType.from_polars, df.dtypes)))
+        try:
+            data = df.to_arrow()
+        except pa.ArrowException as e:
+            store.logger.info(
+                "Falling back to upload via pandas, because polars dataframe "
+                "can't be converted to arrow",
+                table=table.name,
+                cause=str(e),
+            )
+            return super().materialize(store, table, stage_name)
+
+        if store.print_materialize:
+            store.logger.info(
+                f"Writing table '{schema.get()}.{table.name}'", table_obj=table.obj
+            )
+
+        cls._execute_materialize_arrow(data, store, table, schema, dtypes)
+
+    @classmethod
+    def _execute_materialize_arrow(
+        cls,
+        data: pa.Table | pa.RecordBatchReader,
+        store: DuckDBTableStore,
+        table: Table,
+        schema: Schema,
+        dtypes: dict[str, DType],
+    ):
+        """Create the table from arrow data with a single CREATE TABLE AS
+
+        Used by the eager and lazy polars hooks. DuckDB scans the arrow data
+        directly; a record batch reader gets consumed batch by batch. The columns
+        get cast to the same types that an upload via pandas would use.
+        """
+        engine = store.engine
+        pandas_hook = store.get_hook_subclass(PandasTableHook)
+        sql_types = pandas_hook._get_dialect_dtypes(dtypes, table)
+        if table.type_map:
+            sql_types.update(table.type_map)
+
+        store.check_materialization_details_supported(
+            resolve_materialization_details_label(table)
+        )
+
+        preparer = engine.dialect.identifier_preparer
+        columns = []
+        for name in data.schema.names:
+            sql_type = sa.types.to_instance(sql_types[name])
+            column = preparer.quote(name)
+            columns.append(
+                f"CAST({column} AS {sql_type.compile(engine.dialect)}) AS {column}"
+            )
+        table_name = preparer.quote(table.name)
+        schema_name = preparer.format_schema(schema.get())
+        view_name = f"pipedag_upload_{uuid.uuid4().hex}"
+
+        conn = engine.raw_connection()
+        try:
+            conn.register(view_name, data)
+            try:
+                conn.execute(
+                    f"CREATE TABLE {schema_name}.{table_name} AS "
+                    f"SELECT {', '.join(columns)} FROM {view_name}"
+                )
+            finally:
+                conn.unregister(view_name)
+        finally:
+            conn.close()
+
+        store.add_indexes_and_set_nullable(table, schema, table_cols=data.schema.names)
+
+
+@DuckDBTableStore.register_table(polars)
+class LazyPolarsTableHook(LazyPolarsTableHook):
+    @classmethod
+    def materialize_batches(cls, store, table, stage_name, reader, dtypes):
+        # DuckDB consumes the whole stream with a single CREATE TABLE AS
+        schema = store.get_schema(stage_name)
+        if store.print_materialize:
+            store.logger.info(f"Writing table '{schema.get()}.{table.name}'")
+
+        polars_hook = store.get_hook_subclass(PolarsTableHook)
+        polars_hook._execute_materialize_arrow(reader, store, table, schema, dtypes)
 
 
 try:
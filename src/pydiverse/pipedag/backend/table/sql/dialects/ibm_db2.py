@@ -146,7 +146,7 @@ class IBMDB2TableStore(SQLTableStore):
             ]
         return nullable_cols, non_nullable_cols
 
-    def add_indexes_and_set_nullable(
+    def _add_indexes_and_set_nullable(
         self,
         table: Table,
         schema: Schema,
@@ -154,7 +154,7 @@ class IBMDB2TableStore(SQLTableStore):
         on_empty_table: bool | None = None,
         table_cols: Iterable[str] | None = None,
     ):
-        super().add_indexes_and_set_nullable(
+        super()._add_indexes_and_set_nullable(
             table, schema, on_empty_table=on_empty_table, table_cols=table_cols
         )
         table_name = self.engine.dialect.identifier_preparer.quote(table.name)
@@ -1,19 +1,30 @@
 from __future__ import annotations
 
 import csv
+import functools
+import warnings
 from dataclasses import dataclass
 from io import StringIO
 from typing import Any
 
 import pandas as pd
+import pyarrow as pa
+import sqlalchemy as sa
 
 from pydiverse.pipedag.backend.table.sql.ddl import (
     ChangeTableLogged,
     LockSourceTable,
     LockTable,
 )
+from pydiverse.pipedag.backend.table.sql.dialects.postgres_copy import (
+    BinaryCopyReader,
+    to_copy_arrow_table,
+)
 from pydiverse.pipedag.backend.table.sql.hooks import (
+    ArrowDownloadError,
+    ArrowTableHook,
     PandasTableHook,
+    PolarsTableHook,
     SQLAlchemyTableHook,
 )
 from pydiverse.pipedag.backend.table.sql.sql import SQLTableStore
@@ -66,6 +77,35 @@ class PostgresTableStore(SQLTableStore):
             self.logger,
         )
 
+    def dialect_supports_move_table(self) -> bool:
+        return True  # ALTER TABLE ... SET SCHEMA
+
+    def dialect_binds_views_to_tables(self) -> bool:
+        return True  # Views reference tables by OID
+
+    def get_estimated_row_count(self, name: str, schema: str) -> int | None:
+        query = sa.text(
+            "SELECT c.reltuples FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = :schema AND c.relname = :name "
+            "AND c.relkind IN ('r', 'p')"
+        ).bindparams(schema=schema, name=name)
+        with self.engine_connect() as conn:
+            reltuples = conn.execute(query).scalar()
+        # reltuples is negative if the table has never been analyzed
+        if reltuples is None or reltuples < 0:
+            return None
+        return int(reltuples)
+
+    def get_table_fingerprint_query(self, table: sa.sql.expression.TableClause):
+        # The first 64 bits of the md5 hash of each row, summed up as numeric
+        return sa.select(
+            sa.text(
+                "sum(('x' || substr(md5(t::text), 1, 16))::bit(64)::bigint::numeric)"
+            ),
+            sa.func.count(),
+        ).select_from(table.alias("t"))
+
     def lock_table(
         self, table: Table | str, schema: Schema | str, conn: Any = None
     ) -> list:
@@ -112,8 +152,82 @@ class SQLAlchemyTableHook(SQLAlchemyTableHook):
     pass  # postges is our reference dialect
 
 
+@functools.cache
+def _import_adbc():
+    try:
+        import adbc_driver_manager
+        import adbc_driver_postgresql.dbapi
+    except ImportError:
+        return None
+    return adbc_driver_postgresql.dbapi, adbc_driver_manager.Error
+
+
+@PostgresTableStore.register_table()
+class ArrowTableHook(ArrowTableHook):
+    @classmethod
+    def download_arrow(cls, store: PostgresTableStore, query: str) -> pa.Table:
+        # Prefer the ADBC driver, which uses postgres' binary COPY protocol
+        adbc = _import_adbc()
+        if adbc is None:
+            return super().download_arrow(store, query)
+        dbapi, adbc_error = adbc
+
+        url = store.engine_url.set(drivername="postgresql")
+        connection_uri = url.render_as_string(hide_password=False)
+        try:
+            with dbapi.connect(connection_uri) as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(query)
+                    return cursor.fetch_arrow_table()
+        except adbc_error as e:
+            raise ArrowDownloadError(str(e)) from e
+
+    @classmethod
+    def download_arrow_batches(
+        cls, store: PostgresTableStore, query: str, batch_size: int
+    ) -> pa.RecordBatchReader:
+        adbc = _import_adbc()
+        if adbc is None:
+            return super().download_arrow_batches(store, query, batch_size)
+        dbapi, adbc_error = adbc
+
+        # The ADBC driver streams the result of COPY ... TO STDOUT (FORMAT BINARY);
+        # the size of record batches is determined by the driver.
+        url = store.engine_url.set(drivername="postgresql")
+        connection_uri = url.render_as_string(hide_password=False)
+        conn = dbapi.connect(connection_uri)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query)
+            reader = cursor.fetch_record_batch()
+        except BaseException as e:
+            conn.close()
+            if isinstance(e, adbc_error):
+                raise ArrowDownloadError(str(e)) from e
+            raise
+
+        def batches():
+            # The connection stays open until all batches have been read
+            try:
+                yield from reader
+            finally:
+                cursor.close()
+                conn.close()
+
+        return pa.RecordBatchReader.from_batches(reader.schema, batches())
+
+
 @PostgresTableStore.register_table(pd)
 class PandasTableHook(PandasTableHook):
+    """
+    Uploads dataframes with ``COPY ... FROM STDIN (FORMAT BINARY)``.
+
+    The dataframe gets converted to Arrow and encoded in record batches of bounded
+    size. If this isn't possible (e.g. because of a ``type_map`` or because of
+    columns that can't be converted to Arrow), the data gets uploaded as CSV
+    instead.
+    """
+
     @classmethod
     def _execute_materialize(
         cls,
@@ -122,6 +236,88 @@ class PandasTableHook(PandasTableHook):
         table: Table[pd.DataFrame],
         schema: Schema,
         dtypes: dict[str, DType],
+    ):
+        data = None
+        if not table.type_map:
+            try:
+                data = to_copy_arrow_table(
+                    pa.Table.from_pandas(df, preserve_index=False), dtypes
+                )
+            except (pa.ArrowException, TypeError) as e:
+                store.logger.info(
+                    "Falling back to CSV upload, because dataframe can't be "
+                    "converted to arrow",
+                    table=table.name,
+                    cause=str(e),
+                )
+
+        if data is not None:
+            cls._execute_materialize_arrow(data, store, table, schema, dtypes)
+        else:
+            cls._execute_materialize_csv(df, store, table, schema, dtypes)
+
+    @classmethod
+    def _execute_append(
+        cls,
+        df: pd.DataFrame,
+        store: PostgresTableStore,
+        table: Table[pd.DataFrame],
+        schema: Schema,
+        dtypes: dict[str, DType],
+    ):
+        data = None
+        if not table.type_map:
+            try:
+                data = to_copy_arrow_table(
+                    pa.Table.from_pandas(df, preserve_index=False), dtypes
+                )
+            except (pa.ArrowException, TypeError):
+                pass
+
+        if data is not None:
+            cls._copy_arrow(store, table.name, schema, data)
+        else:
+            cls._copy_csv(store, table.name, schema, df)
+
+    @classmethod
+    def _execute_materialize_arrow(
+        cls,
+        data: pa.Table,
+        store: PostgresTableStore,
+        table: Table,
+        schema: Schema,
+        dtypes: dict[str, DType],
+    ):
+        """Upload data that has been prepared with `to_copy_arrow_table`"""
+        sa_table = sa.Table(
+            table.name,
+            sa.MetaData(),
+            *(sa.Column(name, dtypes[name].to_sql()) for name in data.column_names),
+            schema=schema.get(),
+        )
+        store.execute(sa.schema.CreateTable(sa_table))
+        store.add_indexes_and_set_nullable(
+            table, schema, on_empty_table=True, table_cols=data.column_names
+        )
+
+        if store.get_unlogged(resolve_materialization_details_label(table)):
+            store.execute(ChangeTableLogged(table.name, schema, False))
+
+        cls._copy_arrow(store, table.name, schema, data)
+        store.add_indexes_and_set_nullable(
+            table,
+            schema,
+            on_empty_table=False,
+        )
+
+    @classmethod
+    def _execute_materialize_csv(
+        cls,
+        df: pd.DataFrame,
+        store: PostgresTableStore,
+        table: Table[pd.DataFrame],
+        schema: Schema,
+        dtypes: dict[str, DType],
     ):
         dtypes = {name: dtype.to_sql() for name, dtype in dtypes.items()}
         if table.type_map:
@@ -136,7 +332,34 @@ class PandasTableHook(PandasTableHook):
         if store.get_unlogged(resolve_materialization_details_label(table)):
             store.execute(ChangeTableLogged(table.name, schema, False))
 
-        # COPY data
+        cls._copy_csv(store, table.name, schema, df)
+        store.add_indexes_and_set_nullable(
+            table,
+            schema,
+            on_empty_table=False,
+        )
+
+    @classmethod
+    def _copy_arrow(
+        cls, store: PostgresTableStore, table_name: str, schema: Schema, data: pa.Table
+    ):
+        """Append data that has been prepared with `to_copy_arrow_table`"""
+        preparer = store.engine.dialect.identifier_preparer
+        columns = ", ".join(preparer.quote(name) for name in data.column_names)
+        sql = (
+            f"COPY {preparer.format_schema(schema.get())}.{preparer.quote(table_name)}"
+            f" ({columns}) FROM STDIN WITH (FORMAT BINARY)"
+        )
+        cls._copy_from_stdin(store, sql, BinaryCopyReader(data))
+
+    @classmethod
+    def _copy_csv(
+        cls,
+        store: PostgresTableStore,
+        table_name: str,
+        schema: Schema,
+        df: pd.DataFrame,
+    ):
         # TODO: For python 3.12, there is csv.QUOTE_STRINGS
         #       This would make everything a bit safer, because then we could represent
         #       the string "\\N" (backslash + capital n).
@@ -151,23 +374,61 @@ class PandasTableHook(PandasTableHook):
         s_buf.seek(0)
 
         engine = store.engine
-        table_name = engine.dialect.identifier_preparer.quote(table.name)
+        table_name = engine.dialect.identifier_preparer.quote(table_name)
         schema_name = engine.dialect.identifier_preparer.format_schema(schema.get())
 
-        dbapi_conn = engine.raw_connection()
+        sql = (
+            f"COPY {schema_name}.{table_name} FROM STDIN"
+            " WITH (FORMAT CSV, NULL '\\N')"
+        )
+        cls._copy_from_stdin(store, sql, s_buf)
+
+    @classmethod
+    def _copy_from_stdin(cls, store: PostgresTableStore, sql: str, file):
+        dbapi_conn = store.engine.raw_connection()
         try:
             with dbapi_conn.cursor() as cur:
-                sql = (
-                    f"COPY {schema_name}.{table_name} FROM STDIN"
-                    " WITH (FORMAT CSV, NULL '\\N')"
-                )
                 store.logger.info("Executing bulk load", query=sql)
-                cur.copy_expert(sql=sql, file=s_buf)
+                cur.copy_expert(sql=sql, file=file)
             dbapi_conn.commit()
         finally:
             dbapi_conn.close()
-        store.add_indexes_and_set_nullable(
-            table,
-            schema,
-            on_empty_table=False,
-        )
+
+
+try:
+    import polars
+except ImportError as e:
+    warnings.warn(str(e), ImportWarning)
+    polars = None
+
+
+@PostgresTableStore.register_table(polars)
+class PolarsTableHook(PolarsTableHook):
+    @classmethod
+    def materialize(cls, store, table: Table[polars.DataFrame], stage_name: str):
+        # Upload arrow data directly instead of converting to pandas first
+        if table.type_map:
+            return super().materialize(store, table, stage_name)
+
+        df = table.obj
+        schema = store.get_schema(stage_name)
+        try:
+            # DType.from_polars raises a KeyError for types without a DType
+            dtypes = dict(zip(df.columns, map(DType.from_polars, df.dtypes)))
+            data = to_copy_arrow_table(df.to_arrow(), dtypes)
+        except (pa.ArrowException, KeyError, TypeError) as e:
+            store.logger.info(
+                "Falling back to upload via pandas, because polars dataframe "
+                "can't be converted to arrow",
+                table=table.name,
+                cause=str(e),
+            )
+            return super().materialize(store, table, stage_name)
+
+        if store.print_materialize:
+            store.logger.info(
+                f"Writing table '{schema.get()}.{table.name}'", table_obj=table.obj
+            )
+
+        pandas_hook = store.get_hook_subclass(PandasTableHook)
+        pandas_hook._execute_materialize_arrow(data, store, table, schema, dtypes)
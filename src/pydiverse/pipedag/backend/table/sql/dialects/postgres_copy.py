@@ -0,0 +1,220 @@
+"""Encoder for PostgreSQL's binary ``COPY`` format based on Arrow record batches.
+
+See https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.4 for a
+description of the format. Every record batch gets encoded with vectorized numpy
+operations, so only one batch is held in its encoded form at a time.
+"""
+
+from __future__ import annotations
+
+import struct
+from collections.abc import Iterator
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from pydiverse.pipedag.backend.table.util import DType
+
+__all__ = [
+    "BinaryCopyReader",
+    "to_copy_arrow_table",
+]
+
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+PGCOPY_TRAILER = struct.pack("!h", -1)
+
+# PostgreSQL counts days and timestamps from 2000-01-01 instead of 1970-01-01
+POSTGRES_EPOCH_DAYS = 10_957
+POSTGRES_EPOCH_US = POSTGRES_EPOCH_DAYS * 86_400 * 1_000_000
+
+# Arrow type that matches the binary representation of the SQL type that
+# `DType.to_sql()` creates for each DType. All of them have a fixed width,
+# except for strings.
+COPY_ARROW_TYPES = {
+    DType.INT8: pa.int16(),
+    DType.INT16: pa.int16(),
+    DType.INT32: pa.int32(),
+    DType.INT64: pa.int64(),
+    DType.UINT8: pa.int16(),
+    DType.UINT16: pa.int32(),
+    DType.UINT32: pa.int64(),
+    DType.UINT64: pa.int64(),
+    DType.FLOAT32: pa.float32(),
+    DType.FLOAT64: pa.float64(),
+    DType.STRING: pa.large_string(),
+    DType.BOOLEAN: pa.bool_(),
+    DType.DATE: pa.date32(),
+    DType.TIME: pa.time64("us"),
+    DType.DATETIME: pa.timestamp("us"),
+}
+
+
+def to_copy_arrow_table(data: pa.Table, dtypes: dict[str, DType]) -> pa.Table:
+    """Cast all columns to the types expected by :py:class:`BinaryCopyReader`.
+
+    Casting happens before the ``COPY`` statement gets started, such that data that
+    can't be represented raises an :py:class:`pyarrow.ArrowException` early.
+
+    :raises TypeError: if a column has no dtype that can be encoded.
+    """
+    unsupported = [
+        name for name in data.column_names if dtypes.get(name) not in COPY_ARROW_TYPES
+    ]
+    if unsupported:
+        raise TypeError(
+            f"Columns {unsupported} can't be encoded in the binary COPY format"
+        )
+
+    columns = []
+    for name, column in zip(data.column_names, data.columns):
+        target = COPY_ARROW_TYPES[dtypes[name]]
+        if pa.types.is_timestamp(column.type) and column.type.tz is not None:
+            # `timestamp without time zone` stores the local time
+            column = pc.local_timestamp(column)
+        # Timestamps get truncated to microseconds, like postgres would do
+        safe = not pa.types.is_temporal(target)
+        columns.append(pc.cast(column, target, safe=safe))
+    return pa.Table.from_arrays(columns, names=data.column_names)
+
+
+class BinaryCopyReader:
+    """File-like object that produces a binary ``COPY`` stream of an Arrow table.
+
+    It can be passed to ``cursor.copy_expert()`` of psycopg2. Record batches get
+    encoded lazily and contain at most ``batch_size`` bytes of Arrow data.
+
+    :param data: The table to encode. It must have been prepared with
+        :py:func:`to_copy_arrow_table`.
+    :param batch_size: Approximate number of bytes of Arrow data per record batch.
+    """
+
+    def __init__(self, data: pa.Table, batch_size: int = 16 * 1024 * 1024):
+        self.data = data
+        self.batch_size = batch_size
+
+        self._chunks = self._iter_chunks()
+        self._buffer = memoryview(b"")
+
+    def read(self, size: int = -1) -> bytes:
+        parts = []
+        remaining = size if size >= 0 else None
+        while remaining is None or remaining > 0:
+            if len(self._buffer) == 0:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._buffer = memoryview(chunk)
+
+            n = len(self._buffer) if remaining is None else remaining
+            parts.append(self._buffer[:n])
+            self._buffer = self._buffer[n:]
+            if remaining is not None:
+                remaining -= len(parts[-1])
+        return b"".join(parts)
+
+    def _iter_chunks(self) -> Iterator[bytes]:
+        yield PGCOPY_HEADER
+
+        num_rows = self.data.num_rows
+        if num_rows > 0:
+            bytes_per_row = max(self.data.nbytes // num_rows, 1)
+            max_chunksize = max(self.batch_size // bytes_per_row, 1)
+            for batch in self.data.to_batches(max_chunksize=max_chunksize):
+                if batch.num_rows > 0:
+                    yield encode_record_batch(batch).data
+
+        yield PGCOPY_TRAILER
+
+
+def encode_record_batch(batch: pa.RecordBatch) -> np.ndarray:
+    """Encode all rows of a record batch as binary ``COPY`` tuples."""
+    n = batch.num_rows
+    fields = [_encode_column(column) for column in batch.columns]
+
+    # Each row: int16 field count, then per field: int32 length + payload
+    row_sizes = np.full(n, 2, dtype=np.int64)
+    for _, sizes, _ in fields:
+        row_sizes += 4 + sizes
+    row_ends = np.cumsum(row_sizes)
+    row_starts = row_ends - row_sizes
+
+    out = np.empty(int(row_ends[-1]), dtype=np.uint8)
+    field_count = np.full(n, len(fields), dtype=">i2")
+    _scatter(out, row_starts, field_count.view(np.uint8).reshape(n, 2))
+
+    position = row_starts + 2
+    for is_null, sizes, write_payload in fields:
+        lengths = np.where(is_null, -1, sizes).astype(">i4")
+        _scatter(out, position, lengths.view(np.uint8).reshape(n, 4))
+        position += 4
+        write_payload(out, position)
+        position += sizes
+    return out
+
+
+def _encode_column(column: pa.Array):
+    """Returns the null mask, the payload size per row and a payload writer"""
+    n = len(column)
+    is_null = column.is_null().to_numpy(zero_copy_only=False)
+
+    if pa.types.is_large_string(column.type):
+        column = pc.fill_null(column, "")
+        offsets = np.frombuffer(column.buffers()[1], dtype=np.int64)
+        offsets = offsets[column.offset : column.offset + n + 1]
+        data_buffer = column.buffers()[2]
+        data = (
+            np.frombuffer(data_buffer, dtype=np.uint8)
+            if data_buffer is not None
+            else np.empty(0, dtype=np.uint8)
+        )
+        sizes = np.diff(offsets)
+
+        def write_payload(out: np.ndarray, position: np.ndarray):
+            start, end = int(offsets[0]), int(offsets[-1])
+            if start == end:
+                return
+            target = np.repeat(position - offsets[:-1], sizes)
+            target += np.arange(start, end, dtype=np.int64)
+            out[target] = data[start:end]
+
+        return is_null, sizes, write_payload
+
+    values = _fixed_width_values(column)
+    width = values.dtype.itemsize
+    payload = values.view(np.uint8).reshape(n, width)
+    sizes = np.where(is_null, 0, width).astype(np.int64)
+    is_valid = ~is_null
+
+    def write_payload(out: np.ndarray, position: np.ndarray):
+        _scatter(out, position[is_valid], payload[is_valid])
+
+    return is_null, sizes, write_payload
+
+
+def _fixed_width_values(column: pa.Array) -> np.ndarray:
+    type_ = column.type
+    if pa.types.is_boolean(type_):
+        values = pc.fill_null(column, False).to_numpy(zero_copy_only=False)
+        return values.astype(">u1")
+    if pa.types.is_date32(type_):
+        values = _integer_values(column.cast(pa.int32()))
+        return (values - POSTGRES_EPOCH_DAYS).astype(">i4")
+    if pa.types.is_timestamp(type_):
+        values = _integer_values(column.cast(pa.int64()))
+        return (values - POSTGRES_EPOCH_US).astype(">i8")
+    if pa.types.is_time64(type_):
+        return _integer_values(column.cast(pa.int64())).astype(">i8")
+
+    values = pc.fill_null(column, 0).to_numpy(zero_copy_only=False)
+    return values.astype(values.dtype.newbyteorder(">"))
+
+
+def _integer_values(column: pa.Array) -> np.ndarray:
+    return pc.fill_null(column, 0).to_numpy(zero_copy_only=False).astype(np.int64)
+
+
+def _scatter(out: np.ndarray, starts: np.ndarray, values: np.ndarray):
+    """Write row ``i`` of the 2d array ``values`` to ``out[starts[i]:]``"""
+    width = values.shape[1]
+    out[starts[:, None] + np.arange(width, dtype=np.int64)] = values
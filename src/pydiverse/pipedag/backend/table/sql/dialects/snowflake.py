@@ -4,6 +4,8 @@ import time
 import warnings
 from typing import Literal
 
+import sqlalchemy as sa
+
 from pydiverse.pipedag.backend.table.sql.hooks import (
     IbisTableHook,
 )
@@ -29,6 +31,16 @@ class SnowflakeTableStore(SQLTableStore):
     def _default_isolation_level(self) -> str | None:
         return None  # "READ UNCOMMITTED" does not exist in Snowflake
 
+    def _get_metadata_indexes(self) -> list[sa.Index]:
+        # Snowflake only supports indexes on hybrid tables
+        return []
+
+    def dialect_supports_move_table(self) -> bool:
+        return True  # ALTER TABLE ... RENAME TO <other schema>.<table>
+
+    def get_table_fingerprint_query(self, table: sa.sql.expression.TableClause):
+        return sa.select(sa.text("hash_agg(*)"), sa.func.count()).select_from(table)
+
     def optional_pause_for_db_transactionality(
         self,
         prev_action: Literal[
@@ -1,12 +1,21 @@
 from __future__ import annotations
 
 import datetime
+import functools
+import itertools
+import json
+import math
+import os
 import re
+import tempfile
 import time
 import warnings
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 import pandas as pd
+import pyarrow as pa
 import sqlalchemy as sa
 import sqlalchemy.exc
 import structlog
@@ -26,10 +35,15 @@ from pydiverse.pipedag.backend.table.util import (
     DType,
     PandasDTypeBackend,
 )
+from pydiverse.pipedag.backend.table.util.filters import (
+    filters_to_sql,
+    normalize_filters,
+)
 from pydiverse.pipedag.container import ExternalTableReference, Schema, Table
 from pydiverse.pipedag.context import TaskContext
 from pydiverse.pipedag.materialize.details import resolve_materialization_details_label
 from pydiverse.pipedag.util.computation_tracing import ComputationTracer
+from pydiverse.pipedag.util.hashing import stable_hash
 
 # region SQLALCHEMY
 
@@ -69,23 +83,18 @@ class SQLAlchemyTableHook(TableHook[SQLTableStore]):
                 )
             ]
         else:
-            try:
-                input_tables = TaskContext.get().input_tables
-            except LookupError:
-                input_tables = []
-            source_tables = [
-                dict(
-                    name=tbl.name,
-                    schema=store.get_schema(tbl.stage.current_name).get()
-                    if tbl.external_schema is None
-                    else tbl.external_schema,
-                    shared_lock_allowed=tbl.shared_lock_allowed,
-                )
-                for tbl in input_tables
-            ]
+            if isinstance(table.obj, sa.sql.expression.Subquery):
+                # An inlined ephemeral table that got returned as is
+                obj = sa.select("*").select_from(table.obj)
+            source_tables = store.get_source_tables(table)
 
         schema = store.get_schema(stage_name)
 
+        if store.materialize_as_view(table, schema):
+            store.create_view(table, schema, obj)
+            store.optional_pause_for_db_transactionality("table_create")
+            return
+
         store.check_materialization_details_supported(
             resolve_materialization_details_label(table)
         )
@@ -143,13 +152,21 @@ class SQLAlchemyTableHook(TableHook[SQLTableStore]):
         stage_name: str | None,
         as_type: type[sa.Table],
     ) -> sa.sql.expression.Selectable:
-        table_name, schema = store.resolve_alias(table, stage_name)
+        query = store.inline_ephemeral_table(table)
+        if query is None:
+            table_name, schema = store.resolve_alias(table, stage_name)
+        else:
+            table_name = table.name
         try:
             alias_name = TaskContext.get().name_disambiguator.get_name(table_name)
         except LookupError:
             # Used for imperative materialization with explicit config_context
             alias_name = table_name
 
+        if query is not None:
+            # The query of an ephemeral lazy table gets inlined as subquery
+            return query.subquery(alias_name)
+
         tbl = store.reflect_table(table_name, schema)
         return tbl.alias(alias_name)
 
@@ -215,6 +232,365 @@ class ExternalTableReferenceHook(TableHook[SQLTableStore]):
         raise RuntimeError("This should never get called.")
 
 
+# endregion
+
+# region ARROW
+
+
+@functools.cache
+def _import_connectorx():
+    try:
+        import connectorx
+    except ImportError:
+        return None
+    return connectorx
+
+
+class ArrowDownloadError(Exception):
+    """
+    Exception raised if an arrow reader can't read the result of a query,
+    for example because of unsupported column types.
+
+    The regular download path can be used instead.
+    """
+
+
+@SQLTableStore.register_table(pa)
+class ArrowTableHook(TableHook[SQLTableStore]):
+    """
+    Reads query results as :py:class:`pyarrow.Table` without creating python
+    objects for every row.
+
+    The pandas and polars hooks build their dataframes from the arrow data returned
+    by :py:meth:`download_arrow`. If no arrow reader is available for a database,
+    they fall back to their regular download path. Dialect specific table stores
+    can provide their own arrow reader by overriding :py:meth:`download_arrow`.
+
+    Large tables can be downloaded in several partitions concurrently. They get
+    split into key ranges of an integer column: either the first column of the
+    table's primary key or the column given by `partition_column`. This can be
+    configured in the `hook_args` section of the table store config::
+
+        hook_args:
+          arrow:
+            download_partitions: 8
+            partition_column: "id"  # optional
+
+    Tasks with ``input_type=pa.RecordBatchReader`` or ``input_type=Iterator[X]``
+    (where X is ``pa.RecordBatch``, ``pa.Table``, ``pd.DataFrame`` or
+    ``polars.DataFrame``) receive their inputs in batches of ``batch_size`` rows
+    (default: 100'000), which are streamed from the database::
+
+        hook_args:
+          arrow:
+            batch_size: 100000
+    """
+
+    default_batch_size = 100_000
+
+    # SQLAlchemy backend names of the databases that connectorx can read from
+    connectorx_backends = frozenset(
+        {
+            "bigquery",
+            "mariadb",
+            "mssql",
+            "mysql",
+            "oracle",
+            "postgresql",
+            "redshift",
+            "sqlite",
+        }
+    )
+
+    # Stores for which a failed arrow download has already been logged
+    _logged_fallbacks: set[tuple[str, str]] = set()
+
+    @classmethod
+    def download_arrow(cls, store: SQLTableStore, query: str) -> pa.Table:
+        """
+        Execute a query and return the result as arrow table.
+
+        The default implementation uses `connectorx
+        <https://github.com/sfu-db/connector-x>`_ if it is installed and
+        supports the database.
+
+        :raises NotImplementedError: if no arrow reader is available.
+        :raises ArrowDownloadError: if the arrow reader can't read the result.
+        """
+        connectorx = _import_connectorx()
+        backend = store.engine_url.get_backend_name()
+        if connectorx is None or backend not in cls.connectorx_backends:
+            raise NotImplementedError(f"connectorx isn't available for {backend}")
+
+        url = store.engine_url.set(drivername=backend)
+        connection_uri = url.render_as_string(hide_password=False)
+        try:
+            return connectorx.read_sql(connection_uri, query, return_type="arrow")
+        except RuntimeError as e:
+            # connectorx reports all of its errors as RuntimeError
+            raise ArrowDownloadError(str(e)) from e
+
+    @classmethod
+    def download_arrow_batches(
+        cls, store: SQLTableStore, query: str, batch_size: int
+    ) -> pa.RecordBatchReader:
+        """
+        Execute a query and stream the result as record batches.
+
+        There is no default implementation. Dialect specific table stores can
+        override this method to read query results incrementally.
+
+        :raises NotImplementedError: if no streaming arrow reader is available.
+        :raises ArrowDownloadError: if the arrow reader can't read the result.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def try_download_arrow(
+        cls,
+        store: SQLTableStore,
+        query: sa.Select | str,
+        table: Table | None = None,
+    ) -> pa.Table | None:
+        """Same as `download_arrow`, but returns None if it fails
+
+        If `table` is provided and partitioned downloads are configured, the query
+        gets split into several partitions which are downloaded concurrently.
+        """
+        try:
+            queries = [query]
+            if table is not None and not isinstance(query, str):
+                queries = cls.partition_query(store, query, table)
+            queries = [
+                q if isinstance(q, str) else cls._compile_query(store, q)
+                for q in queries
+            ]
+            if len(queries) == 1:
+                return cls.download_arrow(store, queries[0])
+
+            with ThreadPoolExecutor(
+                max_workers=len(queries), thread_name_prefix="pipedag-download"
+            ) as executor:
+                partitions = list(
+                    executor.map(lambda q: cls.download_arrow(store, q), queries)
+                )
+            return pa.concat_tables(partitions)
+        except NotImplementedError:
+            return None
+        except ArrowDownloadError as e:
+            cls._log_fallback(
+                store,
+                "Failed to download table as arrow; falling back to default download",
+                e,
+            )
+            return None
+
+    @classmethod
+    def try_download_arrow_batches(
+        cls, store: SQLTableStore, query: sa.Select, batch_size: int
+    ) -> pa.RecordBatchReader | None:
+        """Same as `download_arrow_batches`, but returns None if it fails"""
+        try:
+            return cls.download_arrow_batches(
+                store, cls._compile_query(store, query), batch_size
+            )
+        except NotImplementedError:
+            return None
+        except ArrowDownloadError as e:
+            cls._log_fallback(
+                store,
+                "Failed to stream table as arrow; falling back to default download",
+                e,
+            )
+            return None
+
+    @classmethod
+    def _log_fallback(cls, store: SQLTableStore, msg: str, cause: Exception):
+        """Log a failed arrow download as warning only the first time"""
+        key = (store.engine_url.render_as_string(), msg)
+        if key in cls._logged_fallbacks:
+            store.logger.debug(msg, cause=str(cause))
+        else:
+            cls._logged_fallbacks.add(key)
+            store.logger.warning(msg, cause=str(cause))
+
+    @classmethod
+    def partition_query(
+        cls, store: SQLTableStore, query: sa.Select, table: Table
+    ) -> list[sa.Select]:
+        """Split a query into non-overlapping key ranges of the partition column
+
+        Returns a list containing only the original query if partitioning is
+        disabled, or if the partition column doesn't contain integers.
+        """
+        hook_args = cls._get_hook_args()
+        num_partitions = int(hook_args.get("download_partitions", 1))
+        column = hook_args.get("partition_column")
+        if column is None and table.primary_key:
+            primary_key = table.primary_key
+            column = primary_key if isinstance(primary_key, str) else primary_key[0]
+        if num_partitions <= 1 or column is None:
+            return [query]
+        if table.sample is not None or table.limit is not None:
+            # Each partition would draw its own sample / apply its own limit
+            return [query]
+
+        col = sa.column(column)
+        bounds_query = sa.select(sa.func.min(col), sa.func.max(col)).select_from(
+            query.subquery("partition_bounds")
+        )
+        with store.engine_connect() as conn:
+            low, high = conn.execute(bounds_query).one()
+        if not all(isinstance(v, int) and not isinstance(v, bool) for v in (low, high)):
+            return [query]
+
+        num_partitions = min(num_partitions, high - low + 1)
+        step = -(-(high - low + 1) // num_partitions)  # ceil division
+        queries = []
+        for i in range(num_partitions):
+            start = low + i * step
+            if i == 0:
+                condition = sa.or_(col.is_(None), col < start + step)
+            elif i == num_partitions - 1:
+                condition = col >= start
+            else:
+                condition = sa.and_(col >= start, col < start + step)
+            queries.append(query.where(condition))
+        return queries
+
+    @classmethod
+    def _select_columns(cls, table: Table) -> list[Any]:
+        """Columns to select when retrieving a table (see `Table.columns`)"""
+        if table.columns is None:
+            return ["*"]
+        return [sa.column(name) for name in table.columns]
+
+    @classmethod
+    def _select_rows(
+        cls, store: SQLTableStore, query: sa.Select, table: Table
+    ) -> sa.Select:
+        """Apply the row filters and the row limit of a table to a query
+
+        See `Table.filters` and `Table.limit`. Limited reads are ordered by the
+        primary key (if the table has one), such that they always return the
+        same rows.
+        """
+        if table.filters is not None:
+            query = query.where(filters_to_sql(table.filters))
+        if table.limit is not None:
+            primary_key = table.primary_key
+            if isinstance(primary_key, str):
+                primary_key = [primary_key]
+            if primary_key:
+                query = query.order_by(*(sa.column(col) for col in primary_key))
+            query = query.limit(table.limit)
+        return query
+
+    @classmethod
+    def _build_retrieve_query(
+        cls, store: SQLTableStore, table: Table, stage_name: str | None
+    ) -> sa.Select:
+        """Query that selects the columns and rows of a table that a task loads"""
+        table_name, schema = store.resolve_alias(table, stage_name)
+        from_clause = sa.table(table_name, schema=schema)
+        if table.sample is not None:
+            from_clause = store.get_table_sample(from_clause, table.sample)
+
+        query = sa.select(*cls._select_columns(table)).select_from(from_clause)
+        return cls._select_rows(store, query, table)
+
+    @classmethod
+    def _get_hook_args(cls) -> dict[str, Any]:
+        try:
+            return ConfigContext.get().table_hook_args.get("arrow", None) or {}
+        except LookupError:
+            return {}  # in case dematerialization is called without open ConfigContext
+
+    @classmethod
+    def get_batch_size(cls) -> int:
+        """Number of rows per batch when retrieving tables in batches"""
+        return int(cls._get_hook_args().get("batch_size", cls.default_batch_size))
+
+    @classmethod
+    def _compile_query(cls, store: SQLTableStore, query: sa.Select) -> str:
+        return str(query.compile(store.engine, compile_kwargs={"literal_binds": True}))
+
+    @classmethod
+    def can_materialize(cls, type_) -> bool:
+        return False
+
+    @classmethod
+    def can_retrieve(cls, type_) -> bool:
+        return type_ in (pa.Table, pa.RecordBatch, pa.RecordBatchReader)
+
+    @classmethod
+    def materialize(cls, store, table: Table, stage_name):
+        raise RuntimeError("This should never get called.")
+
+    @classmethod
+    def retrieve(
+        cls,
+        store: SQLTableStore,
+        table: Table,
+        stage_name: str | None,
+        as_type: type[pa.Table],
+    ) -> pa.Table | pa.RecordBatchReader:
+        if as_type == pa.RecordBatchReader:
+            return cls._retrieve_reader(store, table, stage_name)
+        if as_type == pa.RecordBatch:
+            raise TypeError(
+                "Tables can't be retrieved as single pa.RecordBatch, use "
+                "Iterator[pa.RecordBatch] or pa.RecordBatchReader instead"
+            )
+
+        query = cls._build_retrieve_query(store, table, stage_name)
+
+        if (data := cls.try_download_arrow(store, query, table)) is not None:
+            return data
+
+        pandas_hook = store.get_hook_subclass(PandasTableHook)
+        df = pandas_hook.retrieve(store, table, stage_name, (pd.DataFrame, "arrow"))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+    @classmethod
+    def retrieve_batches(
+        cls,
+        store: SQLTableStore,
+        table: Table,
+        stage_name: str | None,
+        as_type: type[pa.Table] | type[pa.RecordBatch],
+    ) -> Iterator[pa.Table] | Iterator[pa.RecordBatch]:
+        reader = cls._retrieve_reader(store, table, stage_name)
+        if as_type == pa.Table:
+            return (pa.Table.from_batches([batch]) for batch in reader)
+        return iter(reader)
+
+    @classmethod
+    def _retrieve_reader(
+        cls, store: SQLTableStore, table: Table, stage_name: str | None
+    ) -> pa.RecordBatchReader:
+        query = cls._build_retrieve_query(store, table, stage_name)
+        batch_size = cls.get_batch_size()
+        if (
+            reader := cls.try_download_arrow_batches(store, query, batch_size)
+        ) is not None:
+            return reader
+
+        # Stream arrow backed pandas dataframes from a server-side cursor
+        pandas_hook = store.get_hook_subclass(PandasTableHook)
+        batches = (
+            pa.RecordBatch.from_pandas(df, preserve_index=False)
+            for df in pandas_hook.retrieve_batches(
+                store, table, stage_name, (pd.DataFrame, "arrow")
+            )
+        )
+        # pandas returns at least one (possibly empty) dataframe
+        first = next(batches)
+        return pa.RecordBatchReader.from_batches(
+            first.schema, itertools.chain([first], batches)
+        )
+
+
 # endregion
 
 # region PANDAS
@@ -290,6 +666,18 @@ class PandasTableHook(TableHook[SQLTableStore]):
             return Table(obj, name)
         return super().auto_table(obj)
 
+    @classmethod
+    def content_fingerprint(cls, store, obj: pd.DataFrame) -> str:
+        # Sum of row hashes doesn't depend on the order of the rows
+        row_hash_sum = pd.util.hash_pandas_object(obj, index=False).sum()
+        return stable_hash(
+            "PANDAS",
+            str(list(obj.columns)),
+            str(list(obj.dtypes.astype(str))),
+            str(len(obj)),
+            str(row_hash_sum),
+        )
+
     @classmethod
     def materialize(
         cls, store: SQLTableStore, table: Table[pd.DataFrame], stage_name: str
@@ -319,14 +707,7 @@ class PandasTableHook(TableHook[SQLTableStore]):
                 name: DType.from_pandas(dtype) for name, dtype in df.dtypes.items()
             }
 
-        for col, dtype in dtypes.items():
-            # Currently, pandas' .to_sql fails for arrow date columns.
-            # -> Temporarily convert all dates to objects
-            # See: https://github.com/pandas-dev/pandas/issues/53854
-            # TODO: Remove this once pandas 2.1 gets released (fixed by #53856)
-            if dtype == DType.DATE:
-                df[col] = df[col].astype(object)
-
+        cls._convert_dates(df, dtypes)
         cls._execute_materialize(
             df,
             store=store,
@@ -335,6 +716,40 @@ class PandasTableHook(TableHook[SQLTableStore]):
             dtypes=dtypes,
         )
 
+    @classmethod
+    def append_(
+        cls,
+        df: pd.DataFrame,
+        dtypes: dict[str, DType],
+        store: SQLTableStore,
+        table: Table[Any],
+        schema: Schema,
+    ):
+        """Append the rows of a dataframe to a table created with `materialize_`
+
+        Helper function to materialize tables in batches. The `dtypes` must be the
+        same as the ones used for creating the table.
+        """
+        df = df.copy(deep=False)
+        cls._convert_dates(df, dtypes)
+        cls._execute_append(
+            df,
+            store=store,
+            table=table,
+            schema=schema,
+            dtypes=dtypes,
+        )
+
+    @classmethod
+    def _convert_dates(cls, df: pd.DataFrame, dtypes: dict[str, DType]):
+        for col, dtype in dtypes.items():
+            # Currently, pandas' .to_sql fails for arrow date columns.
+            # -> Temporarily convert all dates to objects
+            # See: https://github.com/pandas-dev/pandas/issues/53854
+            # TODO: Remove this once pandas 2.1 gets released (fixed by #53856)
+            if dtype == DType.DATE:
+                df[col] = df[col].astype(object)
+
     @classmethod
     def _get_dialect_dtypes(cls, dtypes: dict[str, DType], table: Table[pd.DataFrame]):
         _ = table
@@ -393,6 +808,23 @@ class PandasTableHook(TableHook[SQLTableStore]):
         )
         store.optional_pause_for_db_transactionality("table_create")
 
+    @classmethod
+    def _execute_append(
+        cls,
+        df: pd.DataFrame,
+        store: SQLTableStore,
+        table: Table[pd.DataFrame],
+        schema: Schema,
+        dtypes: dict[str, DType],
+    ):
+        dtypes = cls._get_dialect_dtypes(dtypes, table)
+        if table.type_map:
+            dtypes.update(table.type_map)
+
+        with store.engine_connect() as conn:
+            with conn.begin():
+                cls.upload_table(df, table.name, schema.get(), dtypes, conn, True)
+
     @classmethod
     def retrieve(
         cls,
@@ -401,6 +833,63 @@ class PandasTableHook(TableHook[SQLTableStore]):
         stage_name: str | None,
         as_type: type[pd.DataFrame] | tuple | dict,
     ) -> pd.DataFrame:
+        backend = cls._get_dtype_backend(as_type)
+
+        # Retrieve
+        query, dtypes = cls._build_retrieve_query(store, table, stage_name, backend)
+        dataframe = cls._execute_query_retrieve(store, query, dtypes, backend, table)
+        return dataframe
+
+    @classmethod
+    def retrieve_batches(
+        cls,
+        store: SQLTableStore,
+        table: Table,
+        stage_name: str | None,
+        as_type: type[pd.DataFrame] | tuple | dict,
+    ) -> Iterator[pd.DataFrame]:
+        backend = cls._get_dtype_backend(as_type)
+        query, dtypes = cls._build_retrieve_query(store, table, stage_name, backend)
+        dtypes = {name: dtype.to_pandas(backend) for name, dtype in dtypes.items()}
+        arrow_hook = store.get_hook_subclass(ArrowTableHook)
+        batch_size = arrow_hook.get_batch_size()
+
+        # Stream arrow data unless download_table has been customized
+        download_table = getattr(cls.download_table, "__func__", None)
+        if download_table is PandasTableHook.download_table.__func__:
+            reader = arrow_hook.try_download_arrow_batches(store, query, batch_size)
+            if reader is not None:
+                for batch in reader:
+                    yield cls._arrow_to_pandas(pa.Table.from_batches([batch]), dtypes)
+                return
+
+        # Fetch rows with a server-side cursor
+        with store.engine_connect() as conn:
+            conn = conn.execution_options(stream_results=True)
+            yield from cls.download_table_batches(query, conn, dtypes, batch_size)
+
+    @classmethod
+    def download_table_batches(
+        cls,
+        query: Any,
+        conn: sa.Connection,
+        dtypes: dict[str, Any],
+        batch_size: int,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Same as `download_table`, but yields dataframes of at most `batch_size`
+        rows. At least one (possibly empty) dataframe is returned.
+        """
+        if PandasTableHook.pd_version >= Version("2.0"):
+            yield from pd.read_sql(query, con=conn, dtype=dtypes, chunksize=batch_size)
+        else:
+            for df in pd.read_sql(query, con=conn, chunksize=batch_size):
+                for col, dtype in dtypes.items():
+                    df[col] = df[col].astype(dtype)
+                yield df
+
+    @classmethod
+    def _get_dtype_backend(cls, as_type) -> PandasDTypeBackend:
         # Config
         if PandasTableHook.pd_version >= Version("2.0"):
             # Once arrow is mature enough, we might want to switch to
@@ -421,12 +910,7 @@ class PandasTableHook(TableHook[SQLTableStore]):
         elif isinstance(as_type, dict):
             backend_str = as_type["backend"]
 
-        backend = PandasDTypeBackend(backend_str)
-
-        # Retrieve
-        query, dtypes = cls._build_retrieve_query(store, table, stage_name, backend)
-        dataframe = cls._execute_query_retrieve(store, query, dtypes, backend)
-        return dataframe
+        return PandasDTypeBackend(backend_str)
 
     @classmethod
     def _build_retrieve_query(
@@ -438,14 +922,25 @@ class PandasTableHook(TableHook[SQLTableStore]):
     ) -> tuple[Any, dict[str, DType]]:
         table_name, schema = store.resolve_alias(table, stage_name)
 
-        sql_table = store.reflect_table(table_name, schema).alias("tbl")
+        sql_table = store.reflect_table(table_name, schema)
+        if table.sample is not None:
+            sql_table = store.get_table_sample(sql_table, table.sample, name="tbl")
+        else:
+            sql_table = sql_table.alias("tbl")
 
         cols = {col.name: col for col in sql_table.columns}
+        if table.columns is not None:
+            if missing := [name for name in table.columns if name not in cols]:
+                raise ValueError(
+                    f"Table '{table.name}' doesn't have the columns {missing}"
+                )
+            cols = {name: cols[name] for name in table.columns}
         dtypes = {name: DType.from_sql(col.type) for name, col in cols.items()}
 
         cols, dtypes = cls._adjust_cols_retrieve(cols, dtypes, backend)
 
         query = sa.select(*cols.values()).select_from(sql_table)
+        query = ArrowTableHook._select_rows(store, query, table)
         return query, dtypes
 
     @classmethod
@@ -503,12 +998,54 @@ class PandasTableHook(TableHook[SQLTableStore]):
         query: Any,
         dtypes: dict[str, DType],
         backend: PandasDTypeBackend,
+        table: Table | None = None,
     ) -> pd.DataFrame:
         dtypes = {name: dtype.to_pandas(backend) for name, dtype in dtypes.items()}
 
+        # Read arrow data unless download_table has been customized
+        download_table = getattr(cls.download_table, "__func__", None)
+        if download_table is PandasTableHook.download_table.__func__:
+            arrow_hook = store.get_hook_subclass(ArrowTableHook)
+            data = arrow_hook.try_download_arrow(store, query, table)
+            if data is not None:
+                return cls._arrow_to_pandas(data, dtypes)
+
         with store.engine.connect() as conn:
             return cls.download_table(query, conn, dtypes)
 
+    @classmethod
+    def retrieve_handoff(
+        cls,
+        store: SQLTableStore,
+        table: Table,
+        obj: pd.DataFrame,
+        as_type: type[pd.DataFrame] | tuple | dict,
+    ) -> pd.DataFrame:
+        backend = cls._get_dtype_backend(as_type)
+        dtypes = {name: DType.from_pandas(dtype) for name, dtype in obj.dtypes.items()}
+        dtypes = {
+            name: DType.from_sql(sql_type)
+            for name, sql_type in cls._get_dialect_dtypes(dtypes, table).items()
+        }
+        if backend == PandasDTypeBackend.NUMPY and any(
+            dtype in (DType.DATE, DType.DATETIME) for dtype in dtypes.values()
+        ):
+            # Dates get clamped and get an additional year column when they are
+            # read from the database (see `_adjust_cols_retrieve`)
+            raise TypeError("Can't hand over date columns with the numpy backend")
+
+        df = obj.reset_index(drop=True)
+        return df.astype(
+            {name: dtype.to_pandas(backend) for name, dtype in dtypes.items()},
+            copy=True,
+        )
+
+    @classmethod
+    def _arrow_to_pandas(cls, data: pa.Table, dtypes: dict[str, Any]) -> pd.DataFrame:
+        # Arrow backed columns don't need to be copied
+        df = data.to_pandas(types_mapper=pd.ArrowDtype)
+        return df.astype({name: dtypes[name] for name in df.columns if name in dtypes})
+
     # Auto Version
 
     class ComputationTracer(ComputationTracer):
@@ -608,6 +1145,15 @@ class PolarsTableHook(TableHook[SQLTableStore]):
         as_type: type[polars.DataFrame],
     ) -> polars.DataFrame:
         query = cls._read_db_query(store, table, stage_name)
+
+        # Read arrow data unless download_table has been customized
+        download_table = getattr(cls.download_table, "__func__", None)
+        if download_table is PolarsTableHook.download_table.__func__:
+            arrow_hook = store.get_hook_subclass(ArrowTableHook)
+            data = arrow_hook.try_download_arrow(store, query, table)
+            if data is not None:
+                return polars.from_arrow(data)
+
         query = cls._compile_query(store, query)
         connection_uri = store.engine_url.render_as_string(hide_password=False)
         try:
@@ -625,19 +1171,56 @@ class PolarsTableHook(TableHook[SQLTableStore]):
                 pd_df = pandas_hook.download_table(query, conn)
             return polars.from_pandas(pd_df)
 
+    @classmethod
+    def retrieve_batches(
+        cls,
+        store: SQLTableStore,
+        table: Table,
+        stage_name: str | None,
+        as_type: type[polars.DataFrame],
+    ) -> Iterator[polars.DataFrame]:
+        arrow_hook = store.get_hook_subclass(ArrowTableHook)
+        batches = arrow_hook.retrieve_batches(store, table, stage_name, pa.RecordBatch)
+        return (polars.from_arrow(batch) for batch in batches)
+
+    @classmethod
+    def retrieve_handoff(
+        cls,
+        store: SQLTableStore,
+        table: Table,
+        obj: polars.DataFrame,
+        as_type: type[polars.DataFrame],
+    ) -> polars.DataFrame:
+        # Round trip the dtypes through the SQL types used for materialization
+        dtypes = dict(zip(obj.columns, map(DType.from_polars, obj.dtypes)))
+        pandas_hook = store.get_hook_subclass(PandasTableHook)
+        sql_types = pandas_hook._get_dialect_dtypes(dtypes, table)
+        return obj.cast(
+            {
+                name: DType.from_sql(sql_type).to_polars()
+                for name, sql_type in sql_types.items()
+            }
+        ).clone()
+
     @classmethod
     def auto_table(cls, obj: polars.DataFrame):
         # currently, we don't know how to store a table name inside polars dataframe
         return super().auto_table(obj)
 
     @classmethod
-    def _read_db_query(cls, store: SQLTableStore, table: Table, stage_name: str | None):
-        table_name, schema = store.resolve_alias(table, stage_name)
-
-        t = sa.table(table_name, schema=schema)
-        q = sa.select("*").select_from(t)
+    def content_fingerprint(cls, store, obj: polars.DataFrame) -> str:
+        # Sum of row hashes doesn't depend on the order of the rows
+        row_hash_sum = obj.hash_rows(seed=0).sum()
+        return stable_hash(
+            "POLARS",
+            str(obj.schema),
+            str(len(obj)),
+            str(row_hash_sum),
+        )
 
-        return q
+    @classmethod
+    def _read_db_query(cls, store: SQLTableStore, table: Table, stage_name: str | None):
+        return ArrowTableHook._build_retrieve_query(store, table, stage_name)
 
     @classmethod
     def _compile_query(cls, store: SQLTableStore, query: sa.Select) -> str:
@@ -678,12 +1261,66 @@ class LazyPolarsTableHook(TableHook[SQLTableStore]):
 
     @classmethod
     def materialize(cls, store, table: Table[polars.LazyFrame], stage_name):
+        # The query gets executed by polars' streaming engine, which writes the
+        # result to a temporary arrow file. It then gets uploaded in batches, so
+        # the result never needs to fit into memory at once.
         t = table.obj
         table = table.copy_without_obj()
-        table.obj = t.collect()
 
-        polars_hook = store.get_hook_subclass(PolarsTableHook)
-        return polars_hook.materialize(store, table, stage_name)
+        with tempfile.TemporaryDirectory(prefix="pipedag_") as tmp_dir:
+            path = os.path.join(tmp_dir, f"{table.name}.arrow")
+            try:
+                t.sink_ipc(path, compression=None)
+            except polars.exceptions.InvalidOperationError as e:
+                store.logger.info(
+                    "Collecting lazy frame in memory, because the streaming engine "
+                    "doesn't support it",
+                    table=table.name,
+                    cause=str(e),
+                )
+                table.obj = t.collect()
+                polars_hook = store.get_hook_subclass(PolarsTableHook)
+                return polars_hook.materialize(store, table, stage_name)
+
+            # polars < 1.0 doesn't have `collect_schema`
+            polars_schema = (
+                t.collect_schema() if hasattr(t, "collect_schema") else t.schema
+            )
+            dtypes = {
+                name: DType.from_polars(dtype) for name, dtype in polars_schema.items()
+            }
+            with pa.memory_map(path) as source:
+                file = pa.ipc.open_file(source)
+                reader = pa.RecordBatchReader.from_batches(
+                    file.schema,
+                    (file.get_batch(i) for i in range(file.num_record_batches)),
+                )
+                return cls.materialize_batches(store, table, stage_name, reader, dtypes)
+
+    @classmethod
+    def materialize_batches(
+        cls,
+        store: SQLTableStore,
+        table: Table,
+        stage_name: str,
+        reader: pa.RecordBatchReader,
+        dtypes: dict[str, DType],
+    ):
+        """Materialize the result of a lazy frame from a stream of record batches
+
+        By default, the batches get regrouped into batches of
+        ``hook_args: arrow: batch_size`` rows and appended to the table one after
+        another (see :py:class:`BatchesTableHook`). Dialects can override this to
+        let the database consume `reader` directly.
+        """
+        _ = dtypes
+        batch_size = ArrowTableHook.get_batch_size()
+        table.obj = (
+            polars.from_arrow(batch)
+            for batch in _regroup_record_batches(reader, batch_size)
+        )
+        batches_hook = store.get_hook_subclass(BatchesTableHook)
+        return batches_hook.materialize(store, table, stage_name)
 
     @classmethod
     def retrieve(
@@ -693,6 +1330,9 @@ class LazyPolarsTableHook(TableHook[SQLTableStore]):
         stage_name: str | None,
         as_type: type[polars.DataFrame],
     ) -> polars.LazyFrame:
+        if (lf := cls._scan(store, table, stage_name)) is not None:
+            return lf
+
         polars_hook = store.get_hook_subclass(PolarsTableHook)
         result = polars_hook.retrieve(
             store=store,
@@ -703,6 +1343,101 @@ class LazyPolarsTableHook(TableHook[SQLTableStore]):
 
         return result.lazy()
 
+    @classmethod
+    def _scan(
+        cls, store: SQLTableStore, table: Table, stage_name: str | None
+    ) -> polars.LazyFrame | None:
+        """Lazy frame that reads the table when it gets collected
+
+        The table is scanned with a polars IO plugin. The columns that the query
+        of the task needs, simple filter conditions (comparisons of a column with
+        a literal) and row limits get pushed down into the SQL query. Everything
+        else is computed by polars.
+
+        Returns None if the streaming engine of polars can't execute IO plugins
+        (polars < 1.26; the output of the task couldn't be streamed any more),
+        if the column types can't be determined from the reflected table, or if
+        `PolarsTableHook.download_table` has been customized.
+        """
+        if not _polars_can_stream_io_sources():
+            return None
+
+        from polars.io.plugins import register_io_source
+
+        polars_hook = store.get_hook_subclass(PolarsTableHook)
+        download_table = getattr(polars_hook.download_table, "__func__", None)
+        if download_table is not PolarsTableHook.download_table.__func__:
+            return None
+
+        arrow_hook = store.get_hook_subclass(ArrowTableHook)
+        table_name, schema_name = store.resolve_alias(table, stage_name)
+        cols = store.reflect_table(table_name, schema_name).columns
+        names = table.columns if table.columns is not None else cols.keys()
+        try:
+            schema = {
+                name: DType.from_sql(cols[name].type).to_polars() for name in names
+            }
+        except (TypeError, KeyError):
+            # Unknown type or missing column (reported by the eager download)
+            return None
+
+        def scan(
+            with_columns: list[str] | None,
+            predicate: polars.Expr | None,
+            n_rows: int | None,
+            batch_size: int | None,
+        ) -> Iterator[polars.DataFrame]:
+            scan_table = table.copy_without_obj()
+            filters, exact = [], True
+            if predicate is not None:
+                filters, exact = _polars_predicate_to_filters(predicate)
+            if with_columns is not None:
+                columns = set(with_columns)
+                if predicate is not None:
+                    columns.update(predicate.meta.root_names())
+                # SELECT needs at least one column
+                scan_table.columns = [c for c in schema if c in columns] or [
+                    next(iter(schema))
+                ]
+            if filters:
+                conjunctions = [[]]
+                if table.filters is not None:
+                    conjunctions = normalize_filters(table.filters)
+                scan_table.filters = [c + filters for c in conjunctions]
+            if n_rows is not None and exact:
+                limit = table.limit
+                scan_table.limit = n_rows if limit is None else min(n_rows, limit)
+            scan_schema = {c: schema[c] for c in scan_table.columns or schema}
+
+            query = arrow_hook._build_retrieve_query(store, scan_table, stage_name)
+            batch_size = batch_size or arrow_hook.get_batch_size()
+            reader = arrow_hook.try_download_arrow_batches(store, query, batch_size)
+            if reader is not None:
+                batches = (polars.from_arrow(batch) for batch in reader)
+            else:
+                df = polars_hook.retrieve(
+                    store, scan_table, stage_name, polars.DataFrame
+                )
+                batches = iter([df])
+
+            # Pushed down filters may select more rows than the predicate
+            for df in batches:
+                # Same dtypes as declared for the scan
+                df = df.cast(scan_schema)
+                if predicate is not None:
+                    df = df.filter(predicate)
+                if with_columns is not None:
+                    # The streaming engine expects the order of the schema
+                    df = df.select([c for c in schema if c in with_columns])
+                if n_rows is not None:
+                    df = df.head(n_rows)
+                    n_rows -= len(df)
+                yield df
+                if n_rows == 0:
+                    break
+
+        return register_io_source(scan, schema=schema)
+
     @classmethod
     def retrieve_for_auto_versioning_lazy(
         cls,
@@ -750,6 +1485,133 @@ class LazyPolarsTableHook(TableHook[SQLTableStore]):
         return str(obj.serialize())
 
 
+@functools.cache
+def _polars_can_stream_io_sources() -> bool:
+    """Whether the streaming engine of polars can sink IO plugin scans"""
+    try:
+        from polars.io.plugins import register_io_source
+    except ImportError:
+        return False
+
+    def source(with_columns, predicate, n_rows, batch_size):
+        yield polars.DataFrame({"x": [1]})
+
+    lf = register_io_source(source, schema={"x": polars.Int64})
+    with tempfile.TemporaryDirectory(prefix="pipedag_") as tmp_dir:
+        try:
+            lf.sink_ipc(os.path.join(tmp_dir, "probe.arrow"), compression=None)
+        except (polars.exceptions.InvalidOperationError, ValueError):
+            # polars 1.25 raises a ValueError for uncompressed IPC sinks
+            return False
+    return True
+
+
+_POLARS_COMPARISON_OPERATORS = {
+    "Eq": "==",
+    "NotEq": "!=",
+    "Lt": "<",
+    "LtEq": "<=",
+    "Gt": ">",
+    "GtEq": ">=",
+}
+# Operators after swapping the operands (`1 < col` -> `col > 1`)
+_SWAPPED_OPERATORS = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}
+_INT64_MIN, _INT64_MAX = -(2**63), 2**63 - 1
+# Kinds of typed literals in the optimized plan (polars >= 1.26). Float32
+# literals are rounded, so they are left to polars.
+_POLARS_SCALAR_KINDS = {
+    **{f"{sign}Int{bits}": "Int" for sign in ("", "U") for bits in (8, 16, 32, 64)},
+    "Float64": "Float",
+}
+
+
+def _polars_predicate_to_filters(predicate: polars.Expr) -> tuple[list, bool]:
+    """Translate the simple conditions of a polars predicate to row filters
+
+    Only comparisons of a column with a literal that are combined with ``&``
+    get translated (see :py:mod:`pydiverse.pipedag.backend.table.util.filters`).
+
+    :return: The filters and whether they select exactly the rows of the
+        predicate. Otherwise, they select a superset of the rows.
+    """
+    try:
+        expr = json.loads(predicate.meta.serialize(format="json"))
+    except polars.exceptions.PolarsError:
+        # Expression can't be serialized (e.g. python UDFs)
+        return [], False
+
+    conditions = [expr]
+    filters = []
+    exact = True
+    while conditions:
+        condition = conditions.pop()
+        binary = condition.get("BinaryExpr") if isinstance(condition, dict) else None
+        if binary is not None and binary.get("op") == "And":
+            conditions += [binary["left"], binary["right"]]
+        elif (f := _polars_comparison_to_filter(binary)) is not None:
+            filters.append(f)
+        else:
+            exact = False
+    return filters, exact
+
+
+def _polars_comparison_to_filter(binary: dict | None) -> tuple | None:
+    if binary is None or binary.get("op") not in _POLARS_COMPARISON_OPERATORS:
+        return None
+    op = _POLARS_COMPARISON_OPERATORS[binary["op"]]
+    left, right = binary["left"], binary["right"]
+    if "Literal" in left:
+        left, right = right, left
+        op = _SWAPPED_OPERATORS.get(op, op)
+    if not (isinstance(left.get("Column"), str) and "Literal" in right):
+        return None
+
+    literal = _polars_literal(right["Literal"])
+    if literal is None:
+        return None
+    kind, value = literal
+    if kind == "Int" and isinstance(value, int):
+        # Larger values could overflow in the database
+        if not _INT64_MIN <= value <= _INT64_MAX:
+            return None
+    elif kind == "Float" and isinstance(value, float) and math.isfinite(value):
+        pass
+    elif kind == "Boolean" and op in ("==", "!=") and isinstance(value, bool):
+        pass
+    elif kind == "Date" and isinstance(value, int):
+        value = datetime.date(1970, 1, 1) + datetime.timedelta(days=value)
+    elif kind == "String" and op == "==" and isinstance(value, str):
+        # Only equality, because the database may use a different collation.
+        # Case-insensitive collations just select a superset of the rows.
+        pass
+    else:
+        return None
+    return left["Column"], op, value
+
+
+def _polars_literal(literal) -> tuple[str, Any] | None:
+    """Kind and value of a serialized polars literal
+
+    Up to polars 1.25, literals are serialized as ``{"Int": 1}``. Newer
+    versions serialize them as ``{"Dyn": {"Int": 1}}`` or as
+    ``{"Scalar": {"dtype": "Int64", "value": {"Int64": 1}}}``.
+    """
+    if not isinstance(literal, dict) or len(literal) != 1:
+        return None
+    ((kind, value),) = literal.items()
+    if kind == "Dyn":
+        return _polars_literal(value)
+    if kind == "Scalar":
+        if not isinstance(value, dict) or not isinstance(value.get("dtype"), str):
+            return None
+        kind, scalar = value["dtype"], value.get("value")
+        if not isinstance(scalar, dict) or len(scalar) != 1:
+            return None
+        ((_, value),) = scalar.items()
+        kind = _POLARS_SCALAR_KINDS.get(kind, kind)
+    return kind, value
+
+
 try:
     import tidypolars
 except ImportError as e:
@@ -967,3 +1829,119 @@ class IbisTableHook(TableHook[SQLTableStore]):
 
 
 # endregion
+
+# region BATCHES
+
+
+def _regroup_record_batches(
+    reader: pa.RecordBatchReader, batch_size: int
+) -> Iterator[pa.Table]:
+    """Group record batches into tables with (roughly) `batch_size` rows
+
+    At least one table gets yielded, even if `reader` is empty.
+    """
+    buffer, num_rows, yielded = [], 0, False
+    for batch in reader:
+        buffer.append(batch)
+        num_rows += batch.num_rows
+        if num_rows >= batch_size:
+            yield pa.Table.from_batches(buffer, schema=reader.schema)
+            buffer, num_rows, yielded = [], 0, True
+    if buffer or not yielded:
+        yield pa.Table.from_batches(buffer, schema=reader.schema)
+
+
+@SQLTableStore.register_table()
+class BatchesTableHook(TableHook[SQLTableStore]):
+    """
+    Materializes tables that are given as an iterator of batches, for example
+    a generator returned by a task::
+
+        @materialize(input_type=Iterator[pd.DataFrame])
+        def task(batches: Iterator[pd.DataFrame]):
+            return Table((transform(df) for df in batches), "name")
+
+    The first batch creates the table, all following batches get appended to it
+    as they arrive. This way, only one batch needs to be held in memory at a time.
+    Indexes get created after the last batch has been written.
+
+    Batches can be pandas or polars dataframes, or arrow tables or record batches.
+    A ``pa.RecordBatchReader`` can be materialized as well.
+    """
+
+    @classmethod
+    def can_materialize(cls, type_) -> bool:
+        return issubclass(type_, (Iterator, pa.RecordBatchReader))
+
+    @classmethod
+    def can_retrieve(cls, type_) -> bool:
+        return False
+
+    @classmethod
+    def materialize(cls, store: SQLTableStore, table: Table, stage_name: str):
+        batches = iter(table.obj)
+        first = next(batches, None)
+        if first is None:
+            if not isinstance(table.obj, pa.RecordBatchReader):
+                raise ValueError(
+                    f"Can't materialize table '{table.name}' from an empty iterator, "
+                    "because its columns are unknown."
+                )
+            first = table.obj.schema.empty_table()
+
+        schema = store.get_schema(stage_name)
+        if store.print_materialize:
+            store.logger.info(
+                f"Writing table '{schema.get()}.{table.name}' in batches",
+                table_obj=table.obj,
+            )
+
+        pandas_hook = store.get_hook_subclass(PandasTableHook)
+        df, dtypes = cls._to_pandas(first)
+
+        # Defer creation of indexes until all batches are written. The primary key
+        # gets created with the table, because some dialects need to adjust the
+        # nullability of its columns first.
+        create_table = table.copy_without_obj()
+        create_table.indexes = None
+        pandas_hook.materialize_(df, dtypes, store, create_table, schema)
+
+        num_batches = 1
+        for batch in batches:
+            df, _ = cls._to_pandas(batch)
+            pandas_hook.append_(df, dtypes, store, create_table, schema)
+            num_batches += 1
+
+        store.add_table_indexes(table, schema)
+        store.logger.info(
+            "Materialized table in batches", table=table.name, batches=num_batches
+        )
+
+    @classmethod
+    def retrieve(cls, store, table, stage_name, as_type):
+        raise RuntimeError("This should never get called.")
+
+    @classmethod
+    def _to_pandas(cls, batch) -> tuple[pd.DataFrame, dict[str, DType]]:
+        if isinstance(batch, pd.DataFrame):
+            dtypes = {
+                name: DType.from_pandas(dtype) for name, dtype in batch.dtypes.items()
+            }
+            return batch.copy(deep=False), dtypes
+        if polars is not None and isinstance(batch, polars.DataFrame):
+            dtypes = dict(zip(batch.columns, map(DType.from_polars, batch.dtypes)))
+            df = batch.to_pandas(use_pyarrow_extension_array=True, zero_copy_only=True)
+            return df, dtypes
+        if isinstance(batch, (pa.Table, pa.RecordBatch)):
+            df = batch.to_pandas(types_mapper=pd.ArrowDtype)
+            dtypes = {
+                name: DType.from_pandas(dtype) for name, dtype in df.dtypes.items()
+            }
+            return df, dtypes
+        raise TypeError(
+            f"Can't materialize batch of type {type(batch)}. Batches must be pandas "
+            "or polars dataframes, or arrow tables or record batches."
+        )
+
+
+# endregion
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import dataclasses
+import datetime
 import json
+import os
 import textwrap
+import threading
 import time
 import warnings
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable
 from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
 from typing import Any, Literal
 
 import sqlalchemy as sa
@@ -13,6 +19,7 @@ import sqlalchemy.exc
 
 from pydiverse.pipedag import Stage, Table
 from pydiverse.pipedag.backend.table.base import BaseTableStore
+from pydiverse.pipedag.backend.table.sql.catalog import CatalogCache, get_ddl_schemas
 from pydiverse.pipedag.backend.table.sql.ddl import (
     AddIndex,
     AddPrimaryKey,
@@ -21,16 +28,19 @@ from pydiverse.pipedag.backend.table.sql.ddl import (
     CreateAlias,
     CreateDatabase,
     CreateSchema,
+    CreateViewAsSelect,
     DropAlias,
     DropSchema,
     DropSchemaContent,
     DropTable,
+    DropView,
+    MoveTable,
     RenameSchema,
     RenameTable,
     split_ddl_statement,
 )
-from pydiverse.pipedag.container import RawSql, Schema
-from pydiverse.pipedag.context import RunContext
+from pydiverse.pipedag.container import ExternalTableReference, RawSql, Schema
+from pydiverse.pipedag.context import RunContext, TaskContext
 from pydiverse.pipedag.context.context import (
     CacheValidationMode,
     ConfigContext,
@@ -42,6 +52,7 @@ from pydiverse.pipedag.materialize.core import MaterializingTask
 from pydiverse.pipedag.materialize.metadata import (
     LazyTableMetadata,
     RawSqlMetadata,
+    StageMetadataIndex,
     TaskMetadata,
 )
 from pydiverse.pipedag.util.hashing import stable_hash
@@ -49,6 +60,21 @@ from pydiverse.pipedag.util.hashing import stable_hash
 DISABLE_DIALECT_REGISTRATION = "__DISABLE_DIALECT_REGISTRATION"
 
 
+# DDL postponed by `SQLTableStore.defer_table_ddl`
+_deferred_table_ddl = ContextVar(
+    "deferred_table_ddl", default=None
+)  # type: ContextVar[list[Callable[[], None]] | None]
+
+
+@dataclasses.dataclass
+class _EphemeralTable:
+    """Lazy table whose query gets inlined into its consumer"""
+
+    table: Table
+    source_tables: list[dict[str, Any]]
+    inlined: bool = False
+
+
 class SQLTableStore(BaseTableStore):
     """Table store that materializes tables to a SQL database
 
@@ -174,14 +200,50 @@ class SQLTableStore(BaseTableStore):
         In case of a partially cache-valid stage, we need to copy tables from the
         cache schema to the new transaction schema. This parameter specifies the
         maximum number of workers we use for concurrently copying tables.
+    :param max_concurrent_input_downloads:
+        Maximum number of inputs of a task that get retrieved concurrently.
+        Inputs that are retrieved as references (e.g. ``sa.Table``) are always
+        retrieved one after another.
+    :param max_concurrent_output_uploads:
+        Maximum number of outputs of a task that get stored concurrently.
+        Primary keys, indexes and nullability constraints of the output tables
+        get added once all of them have been written.
     :param sqlalchemy_pool_size:
         The number of connections to keep open inside the connection pool.
         It is recommended to choose a larger number than
-        ``max_concurrent_copy_operations`` to avoid running into pool_timeout.
+        ``max_concurrent_copy_operations``, ``max_concurrent_input_downloads`` and
+        ``max_concurrent_output_uploads`` to avoid running into pool_timeout.
     :param sqlalchemy_pool_timeout:
         The number of seconds to wait before giving up on getting a connection from
         the pool. This may be relevant in case the connection pool is saturated
         with concurrent operations each working with one or more database connections.
+    :param move_cache_valid_tables:
+        If ``True``, cache valid tables of a partially cache-valid stage get moved
+        from the committed schema to the transaction schema when the stage gets
+        committed, instead of being copied. Moving a table only changes the
+        database catalog, so its cost doesn't depend on the size of the table.
+        Until the stage gets committed, the committed schema stays untouched.
+        Afterward, it no longer contains the moved tables.
+        Only used with ``stage_commit_technique: SCHEMA_SWAP`` and by dialects that
+        support moving tables between schemas (PostgreSQL and Snowflake).
+    :param ephemeral_lazy_tables:
+        If ``True``, a SQL query returned by a lazy task doesn't get stored if
+        exactly one other task of the same stage consumes it, and that task is a
+        lazy task with ``input_type=sa.Table``. Instead, the consumer receives
+        the query as a subquery, which gets inlined into its own query.
+        The table only gets created if it is read in any other way, or if the
+        consumer doesn't read it before the stage gets committed. Otherwise, it
+        doesn't exist in the database after the stage has been committed.
+        If the query hasn't changed since the last run, the task is cache valid
+        and the query gets inlined again. Tables with a primary key, indexes or
+        nullability constraints, and the outputs of tasks with ``nout > 1``
+        always get stored.
+    :param auto_view_max_rows:
+        Used for SQL queries with ``materialization="auto"`` (see
+        :py:class:`~pydiverse.pipedag.Table`) that are read by more than one task.
+        Such a query gets stored as view if the estimated number of rows of the
+        tables it reads, multiplied by the number of tasks that read it, doesn't
+        exceed this number. Queries read by at most one task always become views.
     """
 
     METADATA_SCHEMA = "pipedag_metadata"
@@ -221,8 +283,13 @@ class SQLTableStore(BaseTableStore):
         materialization_details: dict[str, dict[str | list[str]]] | None = None,
         default_materialization_details: str | None = None,
         max_concurrent_copy_operations: int = 5,
+        max_concurrent_input_downloads: int = 4,
+        max_concurrent_output_uploads: int = 4,
         sqlalchemy_pool_size: int = 12,
         sqlalchemy_pool_timeout: int = 300,
+        move_cache_valid_tables: bool = False,
+        ephemeral_lazy_tables: bool = False,
+        auto_view_max_rows: int = 1_000_000,
     ):
         super().__init__()
 
@@ -235,8 +302,13 @@ class SQLTableStore(BaseTableStore):
         self.no_db_locking = no_db_locking
         self.strict_materialization_details = strict_materialization_details
         self.max_concurrent_copy_operations = max_concurrent_copy_operations
+        self.max_concurrent_input_downloads = max_concurrent_input_downloads
+        self.max_concurrent_output_uploads = max_concurrent_output_uploads
         self.sqlalchemy_pool_size = sqlalchemy_pool_size
         self.squalchemy_pool_timeout = sqlalchemy_pool_timeout
+        self.move_cache_valid_tables = move_cache_valid_tables
+        self.ephemeral_lazy_tables = ephemeral_lazy_tables
+        self.auto_view_max_rows = auto_view_max_rows
 
         self.metadata_schema = self.get_schema(self.METADATA_SCHEMA)
         self.engine_url = sa.engine.make_url(engine_url)
@@ -251,9 +323,10 @@ class SQLTableStore(BaseTableStore):
         self.sql_metadata = sa.MetaData(schema=self.metadata_schema.get())
 
         # Store version number for metadata table schema evolution.
-        # We disable caching in case of version mismatch.
+        # Older versions get migrated in `setup` (see `_get_metadata_migrations`).
+        # We disable caching in case of a version that can't be migrated.
         self.disable_caching = False
-        self.metadata_version = "0.3.2"  # Increase version if metadata table changes
+        self.metadata_version = "0.3.3"  # Increase version if metadata table changes
         self.version_table = sa.Table(
             "metadata_version",
             self.sql_metadata,
@@ -311,6 +384,49 @@ class SQLTableStore(BaseTableStore):
             sa.Column("in_transaction_schema", sa.Boolean()),
         )
 
+        # Task Durations Table is unique for position_hash. It stores how long
+        # the last execution of a task took and is used for scheduling.
+        self.task_durations_table = sa.Table(
+            "task_durations",
+            self.sql_metadata,
+            self._metadata_pk("id", "task_durations"),
+            sa.Column("name", sa.String(128)),
+            sa.Column("stage", sa.String(64)),
+            sa.Column("position_hash", sa.String(20)),
+            sa.Column("duration", sa.Float()),
+            sa.Column("timestamp", sa.DateTime()),
+        )
+
+        self.metadata_indexes = self._get_metadata_indexes()
+
+        # Committed cache metadata of all stages that got initialized by the
+        # current run. It gets loaded with one query per metadata table in
+        # `init_stage` and dropped again in `commit_stage`.
+        # Keys are stage names, values are (run_id, index) tuples.
+        self._stage_metadata_index = (
+            {}
+        )  # type: dict[str, tuple[str, StageMetadataIndex]]
+
+        # Metadata rows that haven't been written to the database yet.
+        # They get written with one executemany statement per metadata table
+        # right before the stage gets committed (see `flush_metadata`).
+        # Keys are stage names.
+        self._metadata_buffer = {}  # type: dict[str, dict[sa.Table, list[dict]]]
+        self._metadata_buffer_lock = threading.Lock()
+
+        # Table names and reflected tables per schema. They get loaded in bulk
+        # and are only valid during one run (see `_get_catalog`).
+        self._catalog = None  # type: CatalogCache | None
+        self._catalog_lock = threading.Lock()
+
+        # Lazy tables that got inlined into their consumer instead of being
+        # stored (see `ephemeral_lazy_tables`). Keys are (stage name, table name).
+        self._ephemeral_tables = {}  # type: dict[tuple[str, str], _EphemeralTable]
+        self._ephemeral_tables_lock = threading.RLock()
+
+        # Views created by `create_view` as (schema, name)
+        self._created_views = set()  # type: set[tuple[str, str]]
+
         self.default_materialization_details = default_materialization_details
 
         self._set_materialization_details(materialization_details)
@@ -480,6 +596,7 @@ class SQLTableStore(BaseTableStore):
             with transactional():
                 # execute multiple statements in one transaction
                 for cur_query in query:
+                    self._invalidate_catalog_for(cur_query)
                     if isinstance(cur_query, sa.schema.DDLElement):
                         # Some custom DDL statements contain multiple statements.
                         # They are all seperated using a special seperator.
@@ -495,11 +612,97 @@ class SQLTableStore(BaseTableStore):
                         self._execute(cur_query, conn, truncate_printed_select)
             return
 
+        self._invalidate_catalog_for(query)
         return self._execute(query, conn, truncate_printed_select)
 
+    def _get_catalog(self) -> CatalogCache | None:
+        """Catalog cache of the current run
+
+        Returns None outside a flow run. In that case, the catalog must be
+        queried from the database.
+        """
+        try:
+            ctx = RunContext.get()
+            run_id = ctx.run_id
+        except (LookupError, AttributeError):
+            return None
+        with self._catalog_lock:
+            if self._catalog is None or self._catalog.run_id != run_id:
+                # The tables in the schema of a stage change when the stage gets
+                # committed, possibly by another process. Entries loaded before
+                # the commit must not be used afterwards.
+                stages = {
+                    self.get_schema(stage.name).get().lower(): stage
+                    for stage in ctx.flow.stages.values()
+                }
+
+                committed = set()
+
+                def get_state(schema: str):
+                    if schema not in stages or schema in committed:
+                        return schema in committed
+                    if stages[schema].did_commit:
+                        # A stage gets committed only once per run
+                        committed.add(schema)
+                        return True
+                    return False
+
+                self._catalog = CatalogCache(run_id, get_state)
+            return self._catalog
+
+    def invalidate_catalog(self, schema: Schema | str | None = None):
+        """Drop cached catalog information of a schema (or of all schemas)
+
+        Must be called after modifying a schema without going through
+        :py:meth:`execute`.
+        """
+        if (catalog := self._catalog) is not None:
+            catalog.invalidate(schema)
+
+    def _invalidate_catalog_for(self, query):
+        if self._catalog is None:
+            return
+        if isinstance(query, sa.schema.DDLElement):
+            schemas = get_ddl_schemas(query)
+        elif isinstance(query, str) and query.lstrip()[:6].upper() == "SELECT":
+            schemas = []
+        elif isinstance(query, (str, sa.TextClause)):
+            # Arbitrary SQL (e.g. RawSql)
+            schemas = None
+        else:
+            # SELECT, INSERT, UPDATE, ...
+            schemas = []
+
+        if schemas is None:
+            self.invalidate_catalog()
+            return
+        for schema in schemas:
+            self.invalidate_catalog(schema)
+
     def reflect_table(self, table_name: str, schema: str | Schema) -> sa.Table:
         if isinstance(schema, Schema):
             schema = schema.get()
+        if (catalog := self._get_catalog()) is None:
+            return self._reflect_table(table_name, schema)
+        return catalog.get_table(
+            schema,
+            table_name,
+            load_schema=lambda: self._reflect_tables_in_schema(schema),
+            load_table=lambda: self._reflect_table(table_name, schema),
+        )
+
+    def _reflect_tables_in_schema(self, schema: str) -> list[sa.Table]:
+        """Reflect all tables and views of a schema at once"""
+        metadata = sa.MetaData()
+        try:
+            metadata.reflect(self.engine, schema=schema, views=True)
+        except (sa.exc.SQLAlchemyError, NotImplementedError) as e:
+            # Tables get reflected individually instead
+            self.logger.debug("Failed to reflect schema", schema=schema, error=e)
+            return []
+        return list(metadata.tables.values())
+
+    def _reflect_table(self, table_name: str, schema: str) -> sa.Table:
         tbl = None
         for retry_iteration in range(4):
             # retry operation since it might have been terminated as a deadlock victim
@@ -580,6 +783,65 @@ class SQLTableStore(BaseTableStore):
         else:
             return sa.select(sa.text("*")).limit(rows).select_from(query.alias("A"))
 
+    def get_table_sample(
+        self,
+        table: sa.Table | sa.sql.expression.TableClause,
+        fraction: float,
+        name: str | None = None,
+    ) -> sa.sql.expression.TableSample:
+        """
+        FROM clause that reads a random sample of roughly ``fraction`` of all rows.
+
+        A fixed seed is used, such that repeated reads of the same table return the
+        same sample on databases that support it.
+        """
+        percent = sa.literal_column(repr(float(fraction) * 100))
+        return sa.tablesample(
+            table, sa.func.bernoulli(percent), name=name, seed=sa.literal_column("0")
+        )
+
+    def get_table_fingerprint_query(
+        self, table: sa.sql.expression.TableClause
+    ) -> sa.sql.expression.Select | None:
+        """
+        Query that computes a fingerprint of the content of `table` inside the
+        database. It must return a single row that doesn't depend on the order of
+        the rows in the table (e.g. an aggregate hash together with the row count).
+
+        :return: The query, or None if the dialect doesn't support computing table
+            fingerprints.
+        """
+        _ = table
+        return None
+
+    def compute_table_fingerprint(self, table: Table) -> str | None:
+        if (fingerprint := super().compute_table_fingerprint(table)) is not None:
+            return fingerprint
+        if isinstance(table.obj, ExternalTableReference):
+            return None
+
+        schema = self.get_schema(table.stage.transaction_name).get()
+        query = self.get_table_fingerprint_query(sa.table(table.name, schema=schema))
+        if query is None:
+            return None
+
+        tbl = self.reflect_table(table.name, schema)
+        columns = [f"{col.name}:{col.type}" for col in tbl.columns]
+        with self.engine_connect() as conn:
+            row = self.execute(query, conn=conn).one()
+        return stable_hash("SQL", *columns, *(str(value) for value in row))
+
+    def get_estimated_row_count(self, name: str, schema: str) -> int | None:
+        """Number of rows of a table according to the statistics of the database
+
+        Used to decide whether tables with ``materialization="auto"`` get stored
+        as views. The estimate must be cheap to get (no full table scan).
+
+        :return: The estimate, or None if it isn't known.
+        """
+        _ = name, schema
+        return None
+
     def lock_table(
         self, table: Table | str, schema: Schema | str, conn: Any = None
     ) -> list:
@@ -700,6 +962,19 @@ class SQLTableStore(BaseTableStore):
 
         return nullable, non_nullable
 
+    def dialect_supports_move_table(self) -> bool:
+        """Whether :py:class:`MoveTable` is supported by this dialect."""
+        return False
+
+    def dialect_binds_views_to_tables(self) -> bool:
+        """Whether views keep reading the same tables if their schema gets renamed
+
+        If not, the view definition only stores the names of the tables. Such views
+        can't be used with ``stage_commit_technique: SCHEMA_SWAP`` because they
+        would read the tables of the previous transaction after the swap.
+        """
+        return False
+
     def dialect_requests_empty_creation(self, table: Table, is_sql: bool) -> bool:
         _ = is_sql
         return table.nullable is not None or table.non_nullable is not None
@@ -711,6 +986,51 @@ class SQLTableStore(BaseTableStore):
         *,
         on_empty_table: bool | None = None,
         table_cols: Iterable[str] | None = None,
+    ):
+        """Add primary key and indexes, and change nullability of columns
+
+        :param on_empty_table: True if called right after creating the (still
+            empty) table, False if called after filling it, and None if both
+            apply. Dialects decide which DDL gets executed in which case.
+
+        Inside :py:meth:`defer_table_ddl`, the DDL that would get executed after
+        filling the table gets postponed.
+        """
+        fn = partial(
+            self._add_indexes_and_set_nullable,
+            table,
+            schema,
+            on_empty_table=on_empty_table,
+            table_cols=table_cols,
+        )
+        if not on_empty_table and (deferred := _deferred_table_ddl.get()) is not None:
+            deferred.append(fn)
+        else:
+            fn()
+
+    @contextmanager
+    def defer_table_ddl(self):
+        if _deferred_table_ddl.get() is not None:
+            # Already inside `defer_table_ddl`
+            yield
+            return
+
+        deferred = []
+        token = _deferred_table_ddl.set(deferred)
+        try:
+            yield
+        finally:
+            _deferred_table_ddl.reset(token)
+        for fn in deferred:
+            fn()
+
+    def _add_indexes_and_set_nullable(
+        self,
+        table: Table,
+        schema: Schema,
+        *,
+        on_empty_table: bool | None = None,
+        table_cols: Iterable[str] | None = None,
     ):
         if on_empty_table is None or on_empty_table:
             # By default, we set non-nullable on empty table
@@ -855,9 +1175,12 @@ class SQLTableStore(BaseTableStore):
                         version=self.metadata_version,
                     )
                 )
+                version = self.metadata_version
         elif version != self.metadata_version:
+            version = self._migrate_metadata(version)
+
+        if version != self.metadata_version:
             # disable caching due to incompatible metadata table schemas
-            # (in future versions, consider automatic metadata schema upgrade)
             self.disable_caching = True
             self.logger.warning(
                 "Disabled caching due to metadata version mismatch",
@@ -865,18 +1188,147 @@ class SQLTableStore(BaseTableStore):
                 expected_version=self.metadata_version,
             )
 
+    def _get_metadata_indexes(self) -> list[sa.Index]:
+        """Indexes on the metadata tables that match the cache lookup predicates
+
+        Dialects that don't support indexes can return an empty list.
+        """
+        return [
+            sa.Index(
+                "tasks_lookup_idx",
+                self.tasks_table.c.stage,
+                self.tasks_table.c.name,
+                self.tasks_table.c.version,
+                self.tasks_table.c.input_hash,
+                self.tasks_table.c.cache_fn_hash,
+            ),
+            sa.Index(
+                "lazy_tables_lookup_idx",
+                self.lazy_cache_table.c.stage,
+                self.lazy_cache_table.c.query_hash,
+                self.lazy_cache_table.c.task_hash,
+            ),
+            sa.Index(
+                "raw_sql_lookup_idx",
+                self.raw_sql_cache_table.c.stage,
+                self.raw_sql_cache_table.c.query_hash,
+                self.raw_sql_cache_table.c.task_hash,
+            ),
+            sa.Index(
+                "task_durations_lookup_idx",
+                self.task_durations_table.c.stage,
+                self.task_durations_table.c.position_hash,
+            ),
+        ]
+
+    def _get_metadata_migrations(
+        self,
+    ) -> dict[str, tuple[str, Callable[[sa.Connection], None]]]:
+        """Migrations of the metadata tables
+
+        Maps a metadata version to the next version and a function that
+        migrates the metadata tables from the first to the second version.
+        """
+        return {
+            "0.3.2": ("0.3.3", self._migrate_metadata_0_3_2),
+        }
+
+    def _migrate_metadata_0_3_2(self, conn: sa.Connection):
+        # Version 0.3.3 added the task_durations table and the lookup indexes
+        inspector = sa.inspect(conn)
+        schema = self.metadata_schema.get()
+        if inspector.has_table(self.task_durations_table.name, schema=schema):
+            columns = inspector.get_columns(self.task_durations_table.name, schema)
+            if "position_hash" in {c["name"] for c in columns}:
+                new_tables = []
+            else:
+                # Durations are only a scheduling heuristic. Instead of
+                # migrating rows without position hash, they get dropped.
+                self.task_durations_table.drop(conn)
+                new_tables = [self.task_durations_table]
+                self.task_durations_table.create(conn)
+        else:
+            new_tables = [self.task_durations_table]
+            self.task_durations_table.create(conn)
+
+        for index in self.metadata_indexes:
+            if index.table not in new_tables:
+                index.create(conn)
+
+    def _migrate_metadata(self, version: str) -> str:
+        """Migrate the metadata tables from `version` to `self.metadata_version`
+
+        Every migration step runs in its own transaction together with the update
+        of the metadata version. If another process migrates the metadata tables
+        at the same time, one of them fails and rereads the version.
+
+        :return: The metadata version after the migration. If no migration path
+            exists, this is the version that was passed in.
+        """
+        migrations = self._get_metadata_migrations()
+        while version in migrations:
+            next_version, migrate = migrations[version]
+            self.logger.info(
+                "Migrating metadata tables",
+                version=version,
+                next_version=next_version,
+            )
+
+            try:
+                with self.engine_connect() as conn, conn.begin():
+                    current_version = conn.execute(
+                        sa.select(self.version_table.c.version)
+                    ).scalar_one()
+                    if current_version == version:
+                        migrate(conn)
+                        conn.execute(
+                            self.version_table.update().values(version=next_version)
+                        )
+            except sa.exc.DBAPIError as e:
+                self.logger.warning(
+                    "Failed to migrate metadata tables", version=version, cause=str(e)
+                )
+
+            with self.engine_connect() as conn:
+                new_version = conn.execute(
+                    sa.select(self.version_table.c.version)
+                ).scalar_one()
+            if new_version == version:
+                # Migration failed
+                break
+            version = new_version
+
+        return version
+
     def dispose(self):
         self.engine.dispose()
         self.hook_cache = None
+        self._catalog = None
+        self._ephemeral_tables.clear()
         super().dispose()
 
     def init_stage(self, stage: Stage):
         stage_commit_technique = ConfigContext.get().stage_commit_technique
         if stage_commit_technique == StageCommitTechnique.SCHEMA_SWAP:
-            return self._init_stage_schema_swap(stage)
-        if stage_commit_technique == StageCommitTechnique.READ_VIEWS:
-            return self._init_stage_read_views(stage)
-        raise ValueError(f"Invalid stage commit technique: {stage_commit_technique}")
+            self._init_stage_schema_swap(stage)
+        elif stage_commit_technique == StageCommitTechnique.READ_VIEWS:
+            self._init_stage_read_views(stage)
+        else:
+            raise ValueError(
+                f"Invalid stage commit technique: {stage_commit_technique}"
+            )
+
+        # Drop leftovers of a previous run that failed before committing
+        with self._metadata_buffer_lock:
+            self._metadata_buffer.pop(stage.name, None)
+        with self._ephemeral_tables_lock:
+            for key in [k for k in self._ephemeral_tables if k[0] == stage.name]:
+                del self._ephemeral_tables[key]
+        transaction_schema = self.get_schema(stage.transaction_name).get()
+        self._created_views = {
+            view for view in self._created_views if view[0] != transaction_schema
+        }
+        self._prefetch_stage_metadata(stage)
 
     def optional_pause_for_db_transactionality(
         self,
@@ -955,6 +1407,16 @@ class SQLTableStore(BaseTableStore):
         self._init_stage_schema_swap(stage)
 
     def commit_stage(self, stage: Stage):
+        self._commit_ephemeral_tables(stage)
+
+        # Write the buffered metadata rows with in_transaction_schema=True.
+        # If the commit fails afterward, they get removed by the next
+        # `init_stage` call like any other leftovers of an uncommitted stage.
+        self.flush_metadata(stage)
+
+        # Committing changes the metadata of the stage
+        self._stage_metadata_index.pop(stage.name, None)
+
         # If the stage is 100% cache valid, then we just need to update the
         # "in_transaction_schema" column of the metadata tables.
         if not RunContext.get().has_stage_changed(stage):
@@ -985,6 +1447,10 @@ class SQLTableStore(BaseTableStore):
         # but this collides with the inner conn.begin() used to execute
         # statement parts as one transaction. This is solvable via complex code,
         # but we typically don't want to rely on database transactions anyways.
+        moves = RunContext.get().pop_deferred_table_store_ops(
+            stage, DeferredTableStoreOp.Condition.ON_SCHEMA_SWAP
+        )
+
         with self.engine_connect() as conn:
             # TODO: self.avoid_drop_create_schema is currently being ignored...
             self.execute(
@@ -994,6 +1460,10 @@ class SQLTableStore(BaseTableStore):
                 conn=conn,
             )
             self.optional_pause_for_db_transactionality("schema_drop")
+            if moves:
+                self._commit_stage_schema_swap_with_moves(stage, moves, conn)
+                return
+
             self.execute(RenameSchema(schema, tmp_schema, self.engine), conn=conn)
             self.optional_pause_for_db_transactionality("schema_rename")
             self.execute(
@@ -1007,6 +1477,52 @@ class SQLTableStore(BaseTableStore):
 
             self._commit_stage_update_metadata(stage, conn=conn)
 
+    def _commit_stage_schema_swap_with_moves(
+        self,
+        stage: Stage,
+        moves: list[DeferredTableStoreOp],
+        conn: sa.Connection,
+    ):
+        """Swap schemas and move cache-valid tables into the committed schema
+
+        The schema renames and the moves get executed as one transaction. After
+        the swap, the previous version of the stage is the transaction schema and
+        the aliases of moved tables are in the committed schema. Each alias gets
+        replaced by the table it refers to, which is identical in both versions.
+        If anything fails before the transaction commits, the committed schema
+        stays intact (on databases with transactional DDL).
+        """
+        schema = self.get_schema(stage.name)
+        transaction_schema = self.get_schema(stage.transaction_name)
+        tmp_schema = self.get_schema(stage.name + "__swap")
+
+        tables = [op.kwargs["table"] for op in moves]
+        statements = [
+            RenameSchema(schema, tmp_schema, self.engine),
+            RenameSchema(transaction_schema, schema, self.engine),
+            RenameSchema(tmp_schema, transaction_schema, self.engine),
+        ]
+        for table in tables:
+            statements.append(DropAlias(table.name, schema))
+            statements.append(MoveTable(table.name, transaction_schema, schema))
+
+        trace_hook = RunContext.get().trace_hook
+        for table in tables:
+            trace_hook.cache_pre_transfer(table)
+        try:
+            self.execute(statements, conn=conn)
+        except Exception as _e:
+            msg = (
+                f"Failed swapping schemas of stage {stage.name} and moving "
+                f"cache-valid tables {[t.name for t in tables]}."
+            )
+            raise RuntimeError(msg) from _e
+        self.optional_pause_for_db_transactionality("schema_rename")
+        for table in tables:
+            trace_hook.cache_post_transfer(table)
+
+        self._commit_stage_update_metadata(stage, conn=conn)
+
     def _commit_stage_read_views(self, stage: Stage):
         dest_schema = self.get_schema(stage.name)
         src_schema = self.get_schema(stage.transaction_name)
@@ -1016,9 +1532,12 @@ class SQLTableStore(BaseTableStore):
             self.execute(DropSchemaContent(dest_schema, self.engine), conn=conn)
             self.optional_pause_for_db_transactionality("table_drop")
 
-            # Create aliases for all tables in transaction schema
+            # Create aliases for all tables and views in transaction schema
             inspector = sa.inspect(self.engine)
-            for table in inspector.get_table_names(schema=src_schema.get()):
+            for table in [
+                *inspector.get_table_names(schema=src_schema.get()),
+                *inspector.get_view_names(schema=src_schema.get()),
+            ]:
                 self.execute(CreateAlias(table, src_schema, table, dest_schema))
 
             # Update metadata
@@ -1046,7 +1565,21 @@ class SQLTableStore(BaseTableStore):
             self._commit_stage_update_metadata(stage, conn=conn)
 
     def _commit_stage_update_metadata(self, stage: Stage, conn: sa.engine.Connection):
-        if not self.disable_caching:
+        if self.disable_caching:
+            return
+
+        @contextmanager
+        def transactional():
+            if conn.in_transaction():
+                yield
+            else:
+                with conn.begin():
+                    yield
+
+        # Replace the committed metadata with the metadata of the transaction
+        # schema in one transaction. This way, a crash never leaves a stage
+        # without any committed metadata.
+        with transactional():
             for table in [
                 self.tasks_table,
                 self.lazy_cache_table,
@@ -1063,32 +1596,365 @@ class SQLTableStore(BaseTableStore):
                     .values(in_transaction_schema=False)
                 )
 
+    def store_table(self, table: Table, task: MaterializingTask | None):
+        if self._can_inline_table(table, task):
+            RunContext.get().set_stage_has_changed(task.stage)
+            self._register_ephemeral_table(table)
+            return
+
+        try:
+            super().store_table(table, task)
+        finally:
+            # Table hooks may create tables without going through `execute`
+            self.invalidate_catalog(self.get_schema(table.stage.transaction_name))
+
+    def retrieve_table_obj(
+        self,
+        table: Table,
+        as_type: type | None,
+        for_auto_versioning: bool = False,
+    ):
+        if as_type is not sa.Table:
+            # Only references can be inlined
+            self.materialize_ephemeral_table(table)
+        return super().retrieve_table_obj(table, as_type, for_auto_versioning)
+
+    # Ephemeral lazy tables
+
+    def _can_inline_table(self, table: Table, task: MaterializingTask | None) -> bool:
+        """Whether the table gets inlined into its consumer instead of being stored
+
+        See the `ephemeral_lazy_tables` parameter.
+        """
+        if not self.ephemeral_lazy_tables or task is None or not task.lazy:
+            return False
+        if not isinstance(table.obj, sa.sql.expression.Select):
+            return False
+        if (
+            table.primary_key
+            or table.indexes
+            or table.nullable is not None
+            or table.non_nullable is not None
+        ):
+            return False
+        if task.nout not in (None, 1):
+            # The consumer might only receive some of the outputs
+            return False
+        # The query can't be handed over to other processes
+        run_context = RunContext.get()
+        if os.getpid() != run_context.flow_pid:
+            return False
+        # Otherwise, nobody would store the table if it doesn't get consumed
+        commit_task = task.flow.stages[task.stage.name].commit_task
+        if commit_task.id not in run_context.task_ids:
+            return False
+
+        # The task objects that get executed are copies of the nodes in the
+        # flow graph. That's why they are identified by their id.
+        graph = task.flow.graph
+        node = next((t for t in graph if t.id == task.id), None)
+        consumers = list(graph.successors(node)) if node is not None else []
+        if len(consumers) != 1:
+            return False
+        consumer = consumers[0]
+        return (
+            consumer.id in run_context.task_ids
+            and isinstance(consumer, MaterializingTask)
+            and consumer.lazy
+            and consumer.stage == task.stage
+            and consumer.input_type is sa.Table
+        )
+
+    def _register_ephemeral_table(self, table: Table):
+        self.logger.info(
+            "Inlining lazy table into its consumer instead of storing it",
+            table=table.name,
+            stage=table.stage.name,
+        )
+        ephemeral = table.copy_without_obj()
+        ephemeral.obj = table.obj
+        source_tables = self.get_source_tables(table)
+        with self._ephemeral_tables_lock:
+            self._ephemeral_tables[(table.stage.name, table.name)] = _EphemeralTable(
+                ephemeral, source_tables
+            )
+
+    def _get_ephemeral_table(self, table: Table) -> _EphemeralTable | None:
+        if table.stage is None or table.external_schema is not None:
+            return None
+        with self._ephemeral_tables_lock:
+            return self._ephemeral_tables.get((table.stage.name, table.name))
+
+    def inline_ephemeral_table(self, table: Table) -> sa.Select | None:
+        """The query of a table that hasn't been stored because it gets inlined
+
+        Returns None if the table has been stored.
+        """
+        with self._ephemeral_tables_lock:
+            if (ephemeral := self._get_ephemeral_table(table)) is None:
+                return None
+            ephemeral.inlined = True
+            return ephemeral.table.obj
+
+    def materialize_ephemeral_table(self, table: Table):
+        """Store a table that so far only got inlined into its consumer"""
+        with self._ephemeral_tables_lock:
+            if (ephemeral := self._get_ephemeral_table(table)) is not None:
+                self._materialize_ephemeral_table(ephemeral)
+
+    def _materialize_ephemeral_table(self, ephemeral: _EphemeralTable):
+        table = ephemeral.table
+        self.logger.info(
+            "Storing ephemeral lazy table", table=table.name, stage=table.stage.name
+        )
+        # The table might have been inlined because of a lazy cache hit
+        RunContext.get().set_stage_has_changed(table.stage)
+        with self._ephemeral_tables_lock:
+            # The entry is needed for the source tables of the query
+            self.store_table(table, task=None)
+            del self._ephemeral_tables[(table.stage.name, table.name)]
+
+    def _commit_ephemeral_tables(self, stage: Stage):
+        """Store the ephemeral tables of a stage that haven't been inlined"""
+        with self._ephemeral_tables_lock:
+            entries = [
+                (key, ephemeral)
+                for key, ephemeral in self._ephemeral_tables.items()
+                if key[0] == stage.name
+            ]
+            for key, ephemeral in entries:
+                if ephemeral.inlined:
+                    del self._ephemeral_tables[key]
+                else:
+                    self._materialize_ephemeral_table(ephemeral)
+
+    def get_source_tables(self, table: Table) -> list[dict[str, Any]]:
+        """Tables that get read by the query of a lazy table
+
+        These are the input tables of the current task. Ephemeral lazy tables
+        among them get replaced by the tables that their query reads.
+        The result can be passed to :py:meth:`lock_source_tables`.
+        """
+        ephemeral = self._get_ephemeral_table(table)
+        if ephemeral is not None and ephemeral.table is table:
+            return ephemeral.source_tables
+
+        try:
+            input_tables = TaskContext.get().input_tables
+        except LookupError:
+            input_tables = []
+
+        source_tables = []
+        for tbl in input_tables:
+            if (ephemeral := self._get_ephemeral_table(tbl)) is not None:
+                source_tables += ephemeral.source_tables
+                continue
+            source_tables.append(
+                dict(
+                    name=tbl.name,
+                    schema=self.get_schema(tbl.stage.current_name).get()
+                    if tbl.external_schema is None
+                    else tbl.external_schema,
+                    shared_lock_allowed=tbl.shared_lock_allowed,
+                )
+            )
+        return source_tables
+
     def copy_table_to_transaction(self, table: Table):
         from_schema = self.get_schema(table.stage.name)
         from_name = table.name
 
-        if RunContext.get().has_stage_changed(table.stage):
+        if self._can_move_table(table, from_name):
+            self._deferred_move_table(table, from_schema)
+        elif RunContext.get().has_stage_changed(table.stage):
             self._copy_table(table, from_schema, from_name)
         else:
             self._deferred_copy_table(table, from_schema, from_name)
 
+    # Views
+
+    def materialize_as_view(self, table: Table, schema: Schema) -> bool:
+        """Whether a SQL query gets stored as view instead of a table
+
+        See the `materialization` parameter of :py:class:`Table`.
+
+        :param schema: The schema in which the table gets created.
+        """
+        materialization = table.materialization or "table"
+        if materialization == "table":
+            return False
+
+        reason = self._view_unsupported_reason(table, schema)
+        if reason is not None:
+            if materialization == "view":
+                self.logger.warning(
+                    "Storing table instead of view",
+                    table=table.name,
+                    stage=table.stage.name,
+                    reason=reason,
+                )
+            return False
+        if materialization == "view":
+            return True
+        return self._prefer_view(table)
+
+    def _view_unsupported_reason(self, table: Table, schema: Schema) -> str | None:
+        if (
+            table.primary_key
+            or table.indexes
+            or table.nullable is not None
+            or table.non_nullable is not None
+        ):
+            return "views can't have primary keys, indexes or nullability constraints"
+        if (
+            ConfigContext.get().stage_commit_technique
+            == StageCommitTechnique.SCHEMA_SWAP
+            and not self.dialect_binds_views_to_tables()
+        ):
+            return "views would read the previous transaction after the schema swap"
+
+        source_schemas = _query_source_schemas(table.obj)
+        if source_schemas is None:
+            return "the query reads from a textual SQL statement"
+        if source_schemas - {schema.get()}:
+            # Views reading other schemas would break (or get dropped) when
+            # these schemas get committed.
+            return "the query reads tables of other stages"
+        if self.dialect_binds_views_to_tables():
+            # Cache valid tables might only be aliases, which get replaced by the
+            # actual tables when the stage gets committed
+            if any(
+                self.is_view(tbl.name, schema)
+                and (schema.get(), tbl.name) not in self._created_views
+                for tbl in _query_source_tables(table.obj)
+            ):
+                return "the query reads aliases of cache valid tables"
+        return None
+
+    def create_view(self, table: Table, schema: Schema, query: sa.Select):
+        """Store a SQL query as view (see :py:meth:`materialize_as_view`)"""
+        self.execute(CreateViewAsSelect(table.name, schema, query))
+        self._created_views.add((schema.get(), table.name))
+
+    def _prefer_view(self, table: Table) -> bool:
+        """Decision for ``materialization="auto"``"""
+        try:
+            task = TaskContext.get().task
+        except LookupError:
+            task = None
+        consumers = None
+        if task is not None and task.flow is not None:
+            # The task objects that get executed are copies of the nodes in the
+            # flow graph. That's why they are identified by their id.
+            graph = task.flow.graph
+            node = next((t for t in graph if t.id == task.id), None)
+            if node is not None:
+                consumers = graph.out_degree(node)
+        if consumers is not None and consumers <= 1:
+            # Executing the query once is never more expensive than storing it
+            return True
+
+        row_counts = [
+            self.get_estimated_row_count(tbl.name, tbl.schema)
+            for tbl in _query_source_tables(table.obj)
+        ]
+        if consumers is None or None in row_counts:
+            return False
+        return sum(row_counts) * consumers <= self.auto_view_max_rows
+
     def copy_lazy_table_to_transaction(self, metadata: LazyTableMetadata, table: Table):
+        try:
+            task = TaskContext.get().task
+        except LookupError:
+            task = None
+        if self._can_inline_table(table, task):
+            # The query and its inputs haven't changed. Like a copy, inlining it
+            # into its consumer again doesn't change the stage.
+            self._register_ephemeral_table(table)
+            return
+
+        schema = self.get_schema(table.stage.transaction_name)
+        if isinstance(table.obj, sa.sql.expression.Selectable) and (
+            self.materialize_as_view(table, schema)
+        ):
+            # Creating the view is cheaper than copying it, and a copied view
+            # would read the tables of the transaction that created it.
+            # Like a copy, this doesn't change the stage.
+            self.store_table(table, task=None)
+            return
+
         from_schema = self.get_schema(metadata.stage)
         from_name = metadata.name
 
-        if RunContext.get().has_stage_changed(table.stage):
+        if self._can_move_table(table, from_name):
+            self._deferred_move_table(table, from_schema)
+        elif RunContext.get().has_stage_changed(table.stage):
             self._copy_table(table, from_schema, from_name)
         else:
             self._deferred_copy_table(table, from_schema, from_name)
 
+    def _can_move_table(self, table: Table, from_name: str) -> bool:
+        return (
+            self.move_cache_valid_tables
+            and self.dialect_supports_move_table()
+            and ConfigContext.get().stage_commit_technique
+            == StageCommitTechnique.SCHEMA_SWAP
+            # Renaming while moving could collide with other tables in either schema
+            and from_name == table.name
+        )
+
+    def _deferred_move_table(self, table: Table, from_schema: Schema):
+        """Moves the table into the new version of the stage during the commit
+
+        Until then, the table only gets referenced by an alias in the transaction
+        schema. The move happens as part of the schema swap, in the same
+        transaction (see `_commit_stage_schema_swap_with_moves`). This way, the
+        committed schema stays intact if the run fails before or during the
+        commit, and the previous version of the stage is kept by renaming its
+        schema. If the stage turns out to be 100% cache valid, the transaction
+        schema gets discarded and nothing needs to be moved.
+        """
+        assert from_schema == self.get_schema(table.stage.name)
+
+        if not self.has_table_or_view(table.name, from_schema):
+            msg = (
+                f"Can't move table '{table.name}' (schema: '{from_schema}') to "
+                f"transaction because no such table exists."
+            )
+            self.logger.error(msg)
+            raise CacheError(msg)
+
+        try:
+            self.execute(
+                CreateAlias(
+                    table.name,
+                    from_schema,
+                    table.name,
+                    self.get_schema(table.stage.transaction_name),
+                )
+            )
+            RunContext.get().defer_table_store_op(
+                table.stage,
+                DeferredTableStoreOp(
+                    "_commit_stage_schema_swap_with_moves",
+                    DeferredTableStoreOp.Condition.ON_SCHEMA_SWAP,
+                    (),
+                    {"table": table},
+                ),
+            )
+        except Exception as _e:
+            msg = (
+                f"Failed to move table {table.name} (schema: '{from_schema}') "
+                f"to transaction."
+            )
+            self.logger.exception(msg)
+            raise CacheError(msg) from _e
+
     def _copy_table(self, table: Table, from_schema: Schema, from_name: str):
         """Copies the table immediately"""
         has_table = self.has_table_or_view(from_name, schema=from_schema)
         if not has_table:
-            inspector = sa.inspect(self.engine)
-            available_tables = inspector.get_table_names(
-                from_schema.get()
-            ) + inspector.get_view_names(from_schema.get())
+            available_tables = sorted(self.get_table_and_view_names(from_schema))
             msg = (
                 f"Can't copy table '{from_name}' (schema: '{from_schema}') to "
                 f"transaction because no such table exists.\n"
@@ -1105,7 +1971,10 @@ class SQLTableStore(BaseTableStore):
         # Copy table via executing a select statement with respective hook
         RunContext.get().trace_hook.cache_pre_transfer(dest_tbl)
         hook = self.get_m_table_hook(type(dest_tbl.obj))
-        hook.materialize(self, dest_tbl, dest_tbl.stage.transaction_name)
+        try:
+            hook.materialize(self, dest_tbl, dest_tbl.stage.transaction_name)
+        finally:
+            self.invalidate_catalog(self.get_schema(dest_tbl.stage.transaction_name))
         RunContext.get().trace_hook.cache_post_transfer(dest_tbl)
 
     def _deferred_copy_table(
@@ -1131,10 +2000,7 @@ class SQLTableStore(BaseTableStore):
 
         has_table = self.has_table_or_view(from_name, from_schema)
         if not has_table:
-            inspector = sa.inspect(self.engine)
-            available_tables = inspector.get_table_names(
-                from_schema.get()
-            ) + inspector.get_view_names(from_schema.get())
+            available_tables = sorted(self.get_table_and_view_names(from_schema))
             msg = (
                 f"Can't deferred copy table '{from_name}' (schema: '{from_schema}') to "
                 f"transaction because no such table exists.\n"
@@ -1200,6 +2066,19 @@ class SQLTableStore(BaseTableStore):
     def has_table_or_view(self, name, schema: Schema | str):
         if isinstance(schema, Schema):
             schema = schema.get()
+        if (catalog := self._get_catalog()) is not None:
+            if name in self.get_table_and_view_names(schema):
+                return True
+            # Only trust positive answers of the cache. The table might have
+            # been created by a different process. Committed schemas only lose
+            # tables when their stage gets committed, which reloads the names.
+            if self._has_table_or_view(name, schema):
+                catalog.invalidate(schema)
+                return True
+            return False
+        return self._has_table_or_view(name, schema)
+
+    def _has_table_or_view(self, name, schema: str):
         inspector = sa.inspect(self.engine)
         has_table = inspector.has_table(name, schema=schema)
         # workaround for sqlalchemy backends that fail to find views with has_table
@@ -1208,6 +2087,38 @@ class SQLTableStore(BaseTableStore):
             has_table = name in inspector.get_view_names(schema=schema)
         return has_table
 
+    def get_table_and_view_names(self, schema: Schema | str) -> frozenset[str]:
+        """Names of all tables and views in a schema"""
+        if isinstance(schema, Schema):
+            schema = schema.get()
+
+        def load():
+            inspector = sa.inspect(self.engine)
+            return inspector.get_table_names(schema) + inspector.get_view_names(schema)
+
+        if (catalog := self._get_catalog()) is None:
+            return frozenset(load())
+        return catalog.get_names(schema, load)
+
+    def is_view(self, name: str, schema: Schema | str) -> bool:
+        # has_table_or_view reloads the cached names if the view was created
+        # by another process
+        if not self.has_table_or_view(name, schema):
+            return False
+        return name in self.get_view_names(schema)
+
+    def get_view_names(self, schema: Schema | str) -> frozenset[str]:
+        """Names of all views in a schema"""
+        if isinstance(schema, Schema):
+            schema = schema.get()
+
+        def load():
+            return sa.inspect(self.engine).get_view_names(schema)
+
+        if (catalog := self._get_catalog()) is None:
+            return frozenset(load())
+        return catalog.get_view_names(schema, load)
+
     def _swap_alias_with_table_copy(self, table: Table, table_copy: Table):
         assert table_copy.stage.name == table.stage.name
 
@@ -1339,31 +2250,153 @@ class SQLTableStore(BaseTableStore):
         raise NotImplementedError(f"Not implemented for dialect '{dialect}'.")
 
     def delete_table_from_transaction(self, table: Table):
-        self.execute(
-            DropTable(
-                table.name,
-                self.get_schema(table.stage.transaction_name),
-                if_exists=True,
+        schema = self.get_schema(table.stage.transaction_name)
+        if self.is_view(table.name, schema):
+            self.execute(DropView(table.name, schema, if_exists=True))
+            return
+        self.execute(DropTable(table.name, schema, if_exists=True))
+
+    def _prefetch_stage_metadata(self, stage: Stage):
+        """Load all committed cache metadata of a stage into memory
+
+        This replaces one query per cache lookup with one query per
+        metadata table and stage.
+        """
+        self._stage_metadata_index.pop(stage.name, None)
+        if self.disable_caching:
+            return
+
+        def committed_rows(conn: sa.Connection, table: sa.Table):
+            return (
+                conn.execute(
+                    table.select()
+                    .where(table.c.stage == stage.name)
+                    .where(table.c.in_transaction_schema.in_([False]))
+                )
+                .mappings()
+                .all()
             )
+
+        try:
+            with self.engine_connect() as conn:
+                task_rows = committed_rows(conn, self.tasks_table)
+                lazy_table_rows = committed_rows(conn, self.lazy_cache_table)
+                raw_sql_rows = committed_rows(conn, self.raw_sql_cache_table)
+        except sa.exc.ProgrammingError:
+            # metadata tables don't exist yet
+            return
+
+        index = StageMetadataIndex.from_metadata(
+            [self._task_metadata_from_row(row) for row in task_rows],
+            [self._lazy_table_metadata_from_row(row) for row in lazy_table_rows],
+            [self._raw_sql_metadata_from_row(row) for row in raw_sql_rows],
+        )
+        self._stage_metadata_index[stage.name] = (RunContext.get().run_id, index)
+
+    def _get_stage_metadata_index(self, stage: Stage) -> StageMetadataIndex | None:
+        """Get the prefetched metadata of a stage
+
+        Returns None if the stage wasn't initialized by the current run in this
+        process (e.g. when tasks get executed by a different worker process).
+        In that case, the metadata must be queried from the database.
+        """
+        if stage.name not in self._stage_metadata_index:
+            return None
+        run_id, index = self._stage_metadata_index[stage.name]
+        try:
+            current_run_id = RunContext.get().run_id
+        except (LookupError, AttributeError):
+            # not inside a flow run
+            return None
+        return index if run_id == current_run_id else None
+
+    @staticmethod
+    def _task_metadata_from_row(row) -> TaskMetadata:
+        return TaskMetadata(
+            name=row.name,
+            stage=row.stage,
+            version=row.version,
+            timestamp=row.timestamp,
+            run_id=row.run_id,
+            position_hash=row.position_hash,
+            input_hash=row.input_hash,
+            cache_fn_hash=row.cache_fn_hash,
+            output_json=row.output_json,
+        )
+
+    @staticmethod
+    def _lazy_table_metadata_from_row(row) -> LazyTableMetadata:
+        return LazyTableMetadata(
+            name=row.name,
+            stage=row.stage,
+            query_hash=row.query_hash,
+            task_hash=row.task_hash,
         )
 
+    @staticmethod
+    def _raw_sql_metadata_from_row(row) -> RawSqlMetadata:
+        return RawSqlMetadata(
+            prev_objects=json.loads(row.prev_objects),
+            new_objects=json.loads(row.new_objects),
+            stage=row.stage,
+            query_hash=row.query_hash,
+            task_hash=row.task_hash,
+        )
+
+    def _buffer_metadata(self, stage_name: str, table: sa.Table, values: dict):
+        with self._metadata_buffer_lock:
+            stage_buffer = self._metadata_buffer.setdefault(stage_name, {})
+            stage_buffer.setdefault(table, []).append(values)
+
+    def flush_metadata(self, stage: Stage | None = None):
+        with self._metadata_buffer_lock:
+            if stage is None:
+                stage_buffers = list(self._metadata_buffer.values())
+                self._metadata_buffer = {}
+            else:
+                stage_buffers = [self._metadata_buffer.pop(stage.name, {})]
+
+        rows_per_table = {}  # type: dict[sa.Table, list[dict]]
+        for stage_buffer in stage_buffers:
+            for table, rows in stage_buffer.items():
+                rows_per_table.setdefault(table, []).extend(rows)
+        if not rows_per_table:
+            return
+
+        with self.engine_connect() as conn, conn.begin():
+            for table, rows in rows_per_table.items():
+                if table is self.task_durations_table:
+                    # Only the duration of the most recent execution is stored
+                    rows = list({r["position_hash"]: r for r in rows}.values())
+                    conn.execute(
+                        table.delete()
+                        .where(table.c.stage == sa.bindparam("b_stage"))
+                        .where(table.c.position_hash == sa.bindparam("b_hash")),
+                        [
+                            {"b_stage": r["stage"], "b_hash": r["position_hash"]}
+                            for r in rows
+                        ],
+                    )
+                conn.execute(table.insert(), rows)
+
     def store_task_metadata(self, metadata: TaskMetadata, stage: Stage):
         if not self.disable_caching:
-            with self.engine_connect() as conn:
-                conn.execute(
-                    self.tasks_table.insert().values(
-                        name=metadata.name,
-                        stage=metadata.stage,
-                        version=metadata.version,
-                        timestamp=metadata.timestamp,
-                        run_id=metadata.run_id,
-                        position_hash=metadata.position_hash,
-                        input_hash=metadata.input_hash,
-                        cache_fn_hash=metadata.cache_fn_hash,
-                        output_json=metadata.output_json,
-                        in_transaction_schema=True,
-                    )
-                )
+            self._buffer_metadata(
+                metadata.stage,
+                self.tasks_table,
+                dict(
+                    name=metadata.name,
+                    stage=metadata.stage,
+                    version=metadata.version,
+                    timestamp=metadata.timestamp,
+                    run_id=metadata.run_id,
+                    position_hash=metadata.position_hash,
+                    input_hash=metadata.input_hash,
+                    cache_fn_hash=metadata.cache_fn_hash,
+                    output_json=metadata.output_json,
+                    in_transaction_schema=True,
+                ),
+            )
 
     def retrieve_task_metadata(
         self, task: MaterializingTask, input_hash: str, cache_fn_hash: str
@@ -1378,6 +2411,20 @@ class SQLTableStore(BaseTableStore):
             ConfigContext.get().cache_validation.mode
             == CacheValidationMode.IGNORE_FRESH_INPUT
         )
+
+        if (index := self._get_stage_metadata_index(task.stage)) is not None:
+            results = index.get_task_metadata(
+                task.name,
+                task.version,
+                input_hash,
+                cache_fn_hash if not ignore_cache_function else None,
+            )
+            if len(results) > 1:
+                raise CacheError("Multiple results found task metadata")
+            if not results:
+                raise CacheError(f"Couldn't retrieve task from cache: {task}")
+            return results[0]
+
         try:
             with self.engine_connect() as conn:
                 result = (
@@ -1403,17 +2450,7 @@ class SQLTableStore(BaseTableStore):
         if result is None:
             raise CacheError(f"Couldn't retrieve task from cache: {task}")
 
-        return TaskMetadata(
-            name=result.name,
-            stage=result.stage,
-            version=result.version,
-            timestamp=result.timestamp,
-            run_id=result.run_id,
-            position_hash=result.position_hash,
-            input_hash=result.input_hash,
-            cache_fn_hash=result.cache_fn_hash,
-            output_json=result.output_json,
-        )
+        return self._task_metadata_from_row(result)
 
     def retrieve_all_task_metadata(
         self, task: MaterializingTask, ignore_position_hashes: bool = False
@@ -1448,18 +2485,77 @@ class SQLTableStore(BaseTableStore):
             for result in results
         ]
 
-    def store_lazy_table_metadata(self, metadata: LazyTableMetadata):
-        if not self.disable_caching:
+    def retrieve_stage_task_metadata(self, stage: Stage) -> list[TaskMetadata]:
+        if self.disable_caching:
+            return []
+        if (index := self._get_stage_metadata_index(stage)) is not None:
+            return index.task_metadata
+
+        try:
             with self.engine_connect() as conn:
-                conn.execute(
-                    self.lazy_cache_table.insert().values(
-                        name=metadata.name,
-                        stage=metadata.stage,
-                        query_hash=metadata.query_hash,
-                        task_hash=metadata.task_hash,
-                        in_transaction_schema=True,
+                results = (
+                    conn.execute(
+                        self.tasks_table.select()
+                        .where(self.tasks_table.c.stage == stage.name)
+                        .where(self.tasks_table.c.in_transaction_schema.in_([False]))
                     )
+                    .mappings()
+                    .all()
+                )
+        except sa.exc.ProgrammingError:
+            # metadata tables don't exist yet
+            return []
+
+        return [self._task_metadata_from_row(result) for result in results]
+
+    def store_task_duration(self, task: MaterializingTask, duration: float):
+        if self.disable_caching:
+            return
+        self._buffer_metadata(
+            task.stage.name,
+            self.task_durations_table,
+            dict(
+                name=task.name,
+                stage=task.stage.name,
+                position_hash=task.position_hash,
+                duration=duration,
+                timestamp=datetime.datetime.now(),
+            ),
+        )
+
+    def retrieve_task_durations(self, stages: Iterable[Stage]) -> dict[str, float]:
+        if self.disable_caching:
+            return {}
+        stage_names = [stage.name for stage in stages]
+        if not stage_names:
+            return {}
+
+        # Older rows only remain if two runs flushed the same task concurrently.
+        # Ordering by id lets the most recent row win.
+        with self.engine_connect() as conn:
+            rows = conn.execute(
+                sa.select(
+                    self.task_durations_table.c.position_hash,
+                    self.task_durations_table.c.duration,
                 )
+                .where(self.task_durations_table.c.stage.in_(stage_names))
+                .order_by(self.task_durations_table.c.id)
+            ).all()
+        return {row.position_hash: row.duration for row in rows}
+
+    def store_lazy_table_metadata(self, metadata: LazyTableMetadata):
+        if not self.disable_caching:
+            self._buffer_metadata(
+                metadata.stage,
+                self.lazy_cache_table,
+                dict(
+                    name=metadata.name,
+                    stage=metadata.stage,
+                    query_hash=metadata.query_hash,
+                    task_hash=metadata.task_hash,
+                    in_transaction_schema=True,
+                ),
+            )
 
     # noinspection DuplicatedCode
     def retrieve_lazy_table_metadata(
@@ -1471,6 +2567,14 @@ class SQLTableStore(BaseTableStore):
                 " cache"
             )
 
+        if (index := self._get_stage_metadata_index(stage)) is not None:
+            results = index.get_lazy_table_metadata(query_hash, task_hash)
+            if len(results) > 1:
+                raise CacheError("Multiple results found for lazy table cache key")
+            if not results:
+                raise CacheError("No result found for lazy table cache key")
+            return results[0]
+
         try:
             with self.engine_connect() as conn:
                 result = (
@@ -1494,26 +2598,22 @@ class SQLTableStore(BaseTableStore):
         if result is None:
             raise CacheError("No result found for lazy table cache key")
 
-        return LazyTableMetadata(
-            name=result.name,
-            stage=result.stage,
-            query_hash=result.query_hash,
-            task_hash=result.task_hash,
-        )
+        return self._lazy_table_metadata_from_row(result)
 
     def store_raw_sql_metadata(self, metadata: RawSqlMetadata):
         if not self.disable_caching:
-            with self.engine_connect() as conn:
-                conn.execute(
-                    self.raw_sql_cache_table.insert().values(
-                        prev_objects=json.dumps(metadata.prev_objects),
-                        new_objects=json.dumps(metadata.new_objects),
-                        stage=metadata.stage,
-                        query_hash=metadata.query_hash,
-                        task_hash=metadata.task_hash,
-                        in_transaction_schema=True,
-                    )
-                )
+            self._buffer_metadata(
+                metadata.stage,
+                self.raw_sql_cache_table,
+                dict(
+                    prev_objects=json.dumps(metadata.prev_objects),
+                    new_objects=json.dumps(metadata.new_objects),
+                    stage=metadata.stage,
+                    query_hash=metadata.query_hash,
+                    task_hash=metadata.task_hash,
+                    in_transaction_schema=True,
+                ),
+            )
 
     # noinspection DuplicatedCode
     def retrieve_raw_sql_metadata(
@@ -1525,6 +2625,14 @@ class SQLTableStore(BaseTableStore):
                 " cache"
             )
 
+        if (index := self._get_stage_metadata_index(stage)) is not None:
+            results = index.get_raw_sql_metadata(query_hash, task_hash)
+            if len(results) > 1:
+                raise CacheError("Multiple results found for raw sql cache key")
+            if not results:
+                raise CacheError("No result found for raw sql cache key")
+            return results[0]
+
         try:
             with self.engine_connect() as conn:
                 result = (
@@ -1548,13 +2656,7 @@ class SQLTableStore(BaseTableStore):
         if result is None:
             raise CacheError("No result found for raw sql cache key")
 
-        return RawSqlMetadata(
-            prev_objects=json.loads(result.prev_objects),
-            new_objects=json.loads(result.new_objects),
-            stage=result.stage,
-            query_hash=result.query_hash,
-            task_hash=result.task_hash,
-        )
+        return self._raw_sql_metadata_from_row(result)
 
     def resolve_alias(self, table: Table, stage_name: str | None) -> tuple[str, str]:
         """
@@ -1582,6 +2684,10 @@ class SQLTableStore(BaseTableStore):
         schema = self.get_schema(stage.current_name)
         return list(self._get_all_objects_in_schema(schema).keys())
 
+    def has_committed_tables(self, stage: Stage, names: Iterable[str]) -> bool:
+        existing = self.get_table_and_view_names(self.get_schema(stage.name))
+        return all(name in existing for name in names)
+
     def get_table_objects_in_stage(self, stage: Stage, include_views=True):
         schema = self.get_schema(stage.current_name).get()
         inspector = sa.inspect(self.engine)
@@ -1625,3 +2731,31 @@ import pydiverse.pipedag.backend.table.sql.hooks  # noqa
 
 # Load SQLTableStore dialect specific subclasses
 import pydiverse.pipedag.backend.table.sql.dialects  # noqa
+
+
+def _query_source_tables(query) -> list[sa.sql.expression.TableClause]:
+    """Tables read by a SQLAlchemy query (each table only once)"""
+    tables = {}
+    for element in sa.sql.visitors.iterate(query):
+        if isinstance(element, sa.sql.expression.TableClause):
+            tables.setdefault((element.schema, element.name), element)
+    return list(tables.values())
+
+
+def _query_source_schemas(query) -> set[str | None] | None:
+    """Schemas of the tables read by a SQLAlchemy query
+
+    Returns None if the query reads from a textual SQL statement, which might
+    reference any table.
+    """
+    if isinstance(query, sa.sql.expression.TextClause):
+        return None
+    for element in sa.sql.visitors.iterate(query):
+        if isinstance(element, sa.sql.expression.TextualSelect):
+            return None
+        if isinstance(element, sa.sql.expression.Select) and any(
+            isinstance(from_, sa.sql.expression.TextClause)
+            for from_ in element.get_final_froms()
+        ):
+            return None
+    return {tbl.schema for tbl in _query_source_tables(query)}
@@ -0,0 +1,100 @@
+"""Row filters for task inputs.
+
+Filters use the disjunctive normal form of :py:func:`pyarrow.parquet.read_table`:
+A list of ``(column, operator, value)`` predicates that all must hold, or a list
+of such lists, of which at least one must hold.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Any
+
+import sqlalchemy as sa
+
+__all__ = [
+    "FILTER_OPERATORS",
+    "normalize_filters",
+    "filters_to_sql",
+]
+
+FILTER_OPERATORS = ("==", "=", "!=", "<", "<=", ">", ">=", "in", "not in")
+
+Predicate = tuple[str, str, Any]
+
+
+def normalize_filters(filters: Sequence) -> list[list[Predicate]]:
+    """Validate filters and bring them into the form ``[[predicate, ...], ...]``
+
+    :raises ValueError: if the filters are malformed.
+    """
+    if isinstance(filters, (str, tuple)) or not isinstance(filters, Sequence):
+        raise ValueError(
+            f"Filters must be a list of (column, operator, value) tuples, "
+            f"found: {filters!r}"
+        )
+    if len(filters) == 0:
+        raise ValueError("Filters must not be empty")
+
+    if all(isinstance(f, tuple) for f in filters):
+        filters = [filters]
+
+    normalized = []
+    for conjunction in filters:
+        if isinstance(conjunction, tuple) or len(conjunction) == 0:
+            raise ValueError(
+                "Filters must either be a list of predicates or a non-empty list "
+                f"of lists of predicates, found: {filters!r}"
+            )
+        normalized.append([_validate_predicate(p) for p in conjunction])
+    return normalized
+
+
+def _validate_predicate(predicate) -> Predicate:
+    if not isinstance(predicate, (tuple, list)) or len(predicate) != 3:
+        raise ValueError(
+            f"Filter predicates must be (column, operator, value) tuples, "
+            f"found: {predicate!r}"
+        )
+
+    column, op, value = predicate
+    if not isinstance(column, str):
+        raise ValueError(f"Filter column must be a string, found: {column!r}")
+    if op not in FILTER_OPERATORS:
+        raise ValueError(
+            f"Unknown filter operator '{op}'; "
+            f"expected one of: {', '.join(FILTER_OPERATORS)}"
+        )
+    if op in ("in", "not in") and isinstance(value, (str, bytes)):
+        raise ValueError(f"Operator '{op}' requires a collection of values")
+    return column, op, value
+
+
+def filters_to_sql(filters: Sequence) -> sa.ColumnElement[bool]:
+    """Translate filters to a SQL condition on unqualified column names"""
+    conditions = []
+    for conjunction in normalize_filters(filters):
+        predicates = [_predicate_to_sql(*p) for p in conjunction]
+        conditions.append(sa.and_(*predicates))
+    return sa.or_(*conditions)
+
+
+def _predicate_to_sql(column: str, op: str, value: Any) -> sa.ColumnElement[bool]:
+    col = sa.column(column)
+    if op in ("==", "="):
+        return col.is_(None) if value is None else col == value
+    if op == "!=":
+        return col.is_not(None) if value is None else col != value
+    if op == "<":
+        return col < value
+    if op == "<=":
+        return col <= value
+    if op == ">":
+        return col > value
+    if op == ">=":
+        return col >= value
+    if op == "in":
+        return col.in_(list(value))
+    if op == "not in":
+        return col.not_in(list(value))
+    raise AssertionError(op)
@@ -19,6 +19,10 @@ if TYPE_CHECKING:
     from pydiverse.pipedag.materialize.core import MaterializingTask
 
 
+# Valid values of the `materialization` option of tables and tasks
+MATERIALIZATIONS = frozenset({None, "table", "view", "auto"})
+
+
 @total_ordering
 class Table(Generic[T]):
     """Container for storing Tables.
@@ -52,6 +56,16 @@ class Table(Generic[T]):
         is not None, all other columns will be nullable.
     :param materialization_details: The label of the materialization_details to be used.
         Overwrites the label given by the stage.
+    :param materialization: How a SQL query gets stored by SQL table stores.
+        ``"table"`` executes the query and stores the result as table,
+        ``"view"`` creates a view instead, which runs the query whenever the
+        table gets read. With ``"auto"``, the table store picks a view if the
+        query is cheap to run for all tasks that read the table (based on the
+        number of these tasks and the estimated row counts of the tables read by
+        the query). Views are only possible for queries that exclusively read
+        tables of the same stage, and for tables without primary key, indexes or
+        nullability constraints. Otherwise, a table gets created. If None, the
+        `materialization` of the task is used, which defaults to ``"table"``.
 
     .. seealso:: You can specify which types of objects should automatically get
         converted to tables using the :ref:`auto_table` config option.
@@ -68,6 +82,7 @@ class Table(Generic[T]):
         nullable: list[str] | None = None,
         non_nullable: list[str] | None = None,
         materialization_details: str | None = None,
+        materialization: str | None = None,
     ):
         self._name = None
         self.stage: Stage | None = None
@@ -82,6 +97,13 @@ class Table(Generic[T]):
         self.nullable = nullable
         self.non_nullable = non_nullable
         self.materialization_details = materialization_details
+        self.materialization = materialization
+
+        if materialization not in MATERIALIZATIONS:
+            raise ValueError(
+                "Table argument 'materialization' must be one of "
+                f"{sorted(MATERIALIZATIONS - {None})}, found: {materialization!r}"
+            )
 
         # Check that indexes is of type list[list[str]]
         indexes_type_error = TypeError(
@@ -125,9 +147,31 @@ class Table(Generic[T]):
         # that use it to compute their input_hash for cache_invalidation due to input
         # change
         self.cache_key = None
+        # content fingerprint gets set during materialization for tasks with
+        # `fingerprint=True` to allow keeping the cache_key of unchanged tables
+        self.fingerprint: str | None = None
         # assumed dependencies are filled by imperative materialization to ensure
         # correct cache invalidation
         self.assumed_dependencies: list[Table] | None = None
+        # columns to load when dematerializing the table as task input
+        # (see `input_columns` parameter of `@materialize`)
+        self.columns: list[str] | None = None
+        # rows to load when dematerializing the table as task input
+        # (see `input_filter` and `input_sample` parameters of `@materialize`
+        # and the `sample_mode` config option)
+        self.filters: list | None = None
+        self.sample: float | None = None
+        self.limit: int | None = None
+
+    @property
+    def is_partial_read(self) -> bool:
+        """Whether dematerialization only loads some of the rows or columns"""
+        return (
+            self.columns is not None
+            or self.filters is not None
+            or self.sample is not None
+            or self.limit is not None
+        )
 
     def __repr__(self):
         stage_name = self.stage.name if self.stage else None
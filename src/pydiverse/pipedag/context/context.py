@@ -106,6 +106,7 @@ class TaskContext(BaseContext):
     name_disambiguator: NameDisambiguator = field(factory=NameDisambiguator)
     override_version: str | None = None
     imperative_materialize_callback = None
+    pending_outputs = None
 
     _context_var = ContextVar("task_context")
 
@@ -212,6 +213,9 @@ class ConfigContext(BaseAttrsContext):
     instance_id: str  # may be used as database name or locking ID
     stage_commit_technique: StageCommitTechnique
     cache_validation: Box
+    sample_mode: Box
+    write_behind: Box
+    handoff_cache: Box
     visualization: dict[str, VisualizationConfig]
     network_interface: str
     disable_kroki: bool
@@ -400,6 +404,22 @@ class ConfigContext(BaseAttrsContext):
                 "cache_validation.disable_cache_function=True is not allowed in "
                 "combination with cache_validation.mode=NORMAL"
             )
+        fraction = config["sample_mode"].get("fraction")
+        if fraction is not None and not 0 < fraction <= 1:
+            raise ValueError(
+                "sample_mode.fraction must be a fraction between 0 and 1, "
+                f"found: {fraction}"
+            )
+        if config["write_behind"]["max_pending_tasks"] < 1:
+            raise ValueError(
+                "write_behind.max_pending_tasks must be at least 1, "
+                f"found: {config['write_behind']['max_pending_tasks']}"
+            )
+        if config["handoff_cache"]["max_bytes"] < 0:
+            raise ValueError(
+                "handoff_cache.max_bytes must not be negative, "
+                f"found: {config['handoff_cache']['max_bytes']}"
+            )
         # Construct final ConfigContext
         config_context = ConfigContext(
             config_dict=config,
@@ -411,6 +431,9 @@ class ConfigContext(BaseAttrsContext):
             instance_id=config["instance_id"],
             stage_commit_technique=stage_commit_technique,
             cache_validation=Box(cache_validation, frozen_box=True),
+            sample_mode=Box(config["sample_mode"], frozen_box=True),
+            write_behind=Box(config["write_behind"], frozen_box=True),
+            handoff_cache=Box(config["handoff_cache"], frozen_box=True),
             visualization=visualization,
             network_interface=config["network_interface"],
             disable_kroki=config.get("disable_kroki"),
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import dataclasses
 import functools
+import os
 import pickle
 import time
 import traceback
@@ -111,6 +112,12 @@ class RunContextServer(IPCServer):
         self.deferred_ts_ops_futures: dict[int, list[Future]] = {}
         self.changed_stages: set[int] = set()
 
+        # Outputs of tasks in stages that are skipped because they are
+        # 100% cache valid (see `skip_cache_valid_stages`)
+        self.cache_valid_task_outputs: dict[int, str] = {}
+        # Input hash and cache function hash of tasks, computed while planning
+        self.planned_cache_fn_hashes: dict[int, tuple[str, str]] = {}
+
         # STATE LOCKS
         self.ref_count_lock = Lock()
         self.stage_state_lock = Lock()
@@ -323,6 +330,30 @@ class RunContextServer(IPCServer):
             else:
                 raise RuntimeError
 
+    def skip_cache_valid_stages(
+        self, stage_ids: list[int], task_outputs: list[tuple[int, str]]
+    ):
+        with self.stage_state_lock:
+            for stage_id in stage_ids:
+                if self.stage_state[stage_id] != StageState.UNINITIALIZED:
+                    raise RuntimeError
+            for stage_id in stage_ids:
+                self.stage_state[stage_id] = StageState.COMMITTED
+        self.cache_valid_task_outputs.update(task_outputs)
+
+    def get_cache_valid_task_output(self, task_id: int) -> str | None:
+        return self.cache_valid_task_outputs.get(task_id)
+
+    def set_planned_cache_fn_hashes(self, cache_fn_hashes: list[tuple[int, str, str]]):
+        for task_id, input_hash, cache_fn_hash in cache_fn_hashes:
+            self.planned_cache_fn_hashes[task_id] = (input_hash, cache_fn_hash)
+
+    def get_planned_cache_fn_hash(self, task_id: int, input_hash: str) -> str | None:
+        planned = self.planned_cache_fn_hashes.get(task_id)
+        if planned is None or planned[0] != input_hash:
+            return None
+        return planned[1]
+
     # LOCKING
 
     def acquire_stage_lock(self, stage_id: int):
@@ -355,6 +386,18 @@ class RunContextServer(IPCServer):
                 stage_id, DeferredTableStoreOp.Condition.ON_STAGE_CHANGED
             )
 
+    @synchronized("deferred_ops_lock")
+    def pop_deferred_table_store_ops(
+        self, stage_id: int, condition: DeferredTableStoreOp.Condition
+    ) -> list[DeferredTableStoreOp]:
+        deferred_ts_ops = self.deferred_ts_ops.get(stage_id, [])
+        ops = [op for op in deferred_ts_ops if op.condition == condition]
+        if ops:
+            self.deferred_ts_ops[stage_id] = [
+                op for op in deferred_ts_ops if op.condition != condition
+            ]
+        return ops
+
     @synchronized("deferred_ops_lock")
     def has_stage_changed(self, stage_id: int) -> bool:
         return stage_id in self.changed_stages
@@ -552,6 +595,11 @@ class RunContext(BaseContext):
         self.flow = server.flow
         self.run_id = server.run_id
         self.trace_hook = server.trace_hook
+        # Process in which the flow gets orchestrated. Tasks might get executed
+        # in other processes, which receive a pickled copy of this context.
+        self.flow_pid = os.getpid()
+        # Ids of the tasks (including commit tasks) that get executed in this run
+        self.task_ids = frozenset(task.id for task in server.subflow.get_tasks())
         self.trace_hook.run_init_context(self)
 
     def _request(self, op: str, *args):
@@ -604,6 +652,45 @@ class RunContext(BaseContext):
         else:
             self._request("exit_commit_stage", stage.id, True)
 
+    def skip_cache_valid_stages(
+        self, stages: list[Stage], task_outputs: dict[Task, str]
+    ):
+        """Mark stages as committed without initializing or committing them
+
+        Must only be called for stages in which all tasks are known to be cache
+        valid before any task has been executed. The tasks of those stages then
+        return the provided output (json encoded) and all tables get read from
+        the committed schema.
+        """
+        self._request(
+            "skip_cache_valid_stages",
+            [stage.id for stage in stages],
+            [[task.id, output] for task, output in task_outputs.items()],
+        )
+
+    def get_cache_valid_task_output(self, task: Task) -> str | None:
+        """The json encoded output of a task in a skipped stage, else None"""
+        return self._request("get_cache_valid_task_output", task.id)
+
+    def set_planned_cache_fn_hashes(self, cache_fn_hashes: dict[Task, tuple[str, str]]):
+        """Provide the cache function hashes that were computed while planning
+
+        :param cache_fn_hashes: Maps tasks to pairs of input hash and
+            cache function hash.
+        """
+        self._request(
+            "set_planned_cache_fn_hashes",
+            [[task.id, *hashes] for task, hashes in cache_fn_hashes.items()],
+        )
+
+    def get_planned_cache_fn_hash(self, task: Task, input_hash: str) -> str | None:
+        """The cache function hash computed while planning, else None
+
+        Only gets returned if the task was planned with the same input hash.
+        Otherwise, the cache function would have received different arguments.
+        """
+        return self._request("get_planned_cache_fn_hash", task.id, input_hash)
+
     # STAGE: Lock
 
     def acquire_stage_lock(self, stage: Stage):
@@ -621,6 +708,16 @@ class RunContext(BaseContext):
         """Defer running a table store operation until a specific stage event"""
         return self._request("defer_table_store_op", stage.id, op)
 
+    def pop_deferred_table_store_ops(
+        self, stage: Stage, condition: DeferredTableStoreOp.Condition
+    ) -> list[DeferredTableStoreOp]:
+        """Remove and return the deferred ops of a stage with a given condition
+
+        Used by the table store for ops that it executes itself during commit
+        instead of letting the run context trigger them.
+        """
+        return self._request("pop_deferred_table_store_ops", stage.id, condition)
+
     def has_stage_changed(self, stage: Stage) -> bool:
         """Check if a stage has changed and still is 100% cache valid"""
         return self._request("has_stage_changed", stage.id)
@@ -829,6 +926,13 @@ class DeferredTableStoreOp:
         ON_STAGE_COMMIT = 2
         """The stage has finished running and some tables weren't cache valid"""
 
+        ON_SCHEMA_SWAP = 3
+        """The stage gets committed by swapping schemas
+
+        These ops never get triggered by the run context. The table store
+        retrieves them with `pop_deferred_table_store_ops` while committing.
+        """
+
     fn_name: str
     condition: Condition
     args: tuple | list = ()
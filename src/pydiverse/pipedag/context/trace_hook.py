@@ -5,8 +5,9 @@ from typing import TYPE_CHECKING
 import structlog
 
 if TYPE_CHECKING:
-    from pydiverse.pipedag import Result, Table, Task
+    from pydiverse.pipedag import Blob, Result, Table, Task
     from pydiverse.pipedag._typing import Materializable
+    from pydiverse.pipedag.container import RawSql
     from pydiverse.pipedag.context import RunContext, RunContextServer
     from pydiverse.pipedag.materialize.cache import TaskCacheInfo
     from pydiverse.pipedag.materialize.metadata import TaskMetadata
@@ -89,6 +90,23 @@ class TraceHook:
         """
         pass
 
+    def input_pre_dematerialize(self, task: Task, item: Table | RawSql | Blob):
+        """
+        Called before an input of a task gets loaded from the store.
+
+        Inputs may be loaded concurrently. This function may be called in context
+        of another thread.
+        """
+        pass
+
+    def input_post_dematerialize(self, task: Task, item: Table | RawSql | Blob):
+        """
+        Called after an input of a task was loaded from the store.
+
+        This function may be called in context of another thread.
+        """
+        pass
+
     def task_pre_call(self, task: Task):
         """
         Called before call of task function.
@@ -223,6 +241,12 @@ class PrintTraceHook(TraceHook):
             lazy=lazy,
         )
 
+    def input_pre_dematerialize(self, task: Task, item: Table | RawSql | Blob):
+        self.logger.debug("input_pre_dematerialize", task=task, item=item)
+
+    def input_post_dematerialize(self, task: Task, item: Table | RawSql | Blob):
+        self.logger.debug("input_post_dematerialize", task=task, item=item)
+
     def task_pre_call(self, task: Task):
         self.logger.debug("task_pre_call", task=task)
 
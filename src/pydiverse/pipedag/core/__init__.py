@@ -3,6 +3,7 @@ from __future__ import annotations
 from .config import PipedagConfig
 from .flow import Flow, Subflow
 from .group_node import GroupNode, VisualizationStyle
+from .plan import FlowPlan, PlannedTaskState
 from .result import Result
 from .stage import Stage
 from .task import Task, UnboundTask
@@ -12,6 +13,8 @@ __all__ = [
     "Subflow",
     "PipedagConfig",
     "Result",
+    "FlowPlan",
+    "PlannedTaskState",
     "Stage",
     "GroupNode",
     "VisualizationStyle",
@@ -149,6 +149,16 @@ class PipedagConfig:
                     mode="normal",
                     disable_cache_function=False,
                     ignore_task_version=False,
+                    skip_cache_valid_stages=False,
+                ),
+                "sample_mode": {},
+                "write_behind": dict(
+                    enabled=False,
+                    max_pending_tasks=4,
+                ),
+                "handoff_cache": dict(
+                    enabled=False,
+                    max_bytes=1024**3,
                 ),
                 "stage_commit_technique": "SCHEMA_SWAP",
                 "auto_table": [],
@@ -191,6 +201,22 @@ class PipedagConfig:
         # Finally, expand all normal variables
         config = self.__expand_variables(config)
 
+        # Sample runs get their own schemas, blobs and locks, such that they
+        # don't overwrite the results of complete runs
+        if any(v is not None for v in config["sample_mode"].values()):
+            schema_suffix = _get(
+                config, "table_store", "args", "schema_suffix", default=""
+            )
+            _set(
+                config,
+                schema_suffix + "_sample",
+                "table_store",
+                "args",
+                "schema_suffix",
+            )
+            if config.get("instance_id") is not None:
+                config["instance_id"] += "_sample"
+
         config_context = ConfigContext.new(config, self.name, flow, instance)
 
         if "PYDIVERSE_PIPEDAG_PYTEST" not in os.environ:
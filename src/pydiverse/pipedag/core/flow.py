@@ -11,21 +11,26 @@ import pydot
 import structlog
 
 from pydiverse.pipedag import ExternalTableReference
+from pydiverse.pipedag.container import RawSql, Table
 from pydiverse.pipedag.context import (
     ConfigContext,
     DAGContext,
     FinalTaskState,
+    RunContext,
     RunContextServer,
 )
 from pydiverse.pipedag.context.context import CacheValidationMode
+from pydiverse.pipedag.context.run_context import DematerializeRunContext
 from pydiverse.pipedag.context.trace_hook import TraceHook
 from pydiverse.pipedag.core.config import PipedagConfig
 from pydiverse.pipedag.core.group_node import BarrierTask, VisualizationStyle
 from pydiverse.pipedag.core.task import TaskGetItem
 from pydiverse.pipedag.errors import DuplicateNameError, FlowError
+from pydiverse.pipedag.util import deep_map
 
 if TYPE_CHECKING:
     from pydiverse.pipedag.core import GroupNode, Result, Stage, Task
+    from pydiverse.pipedag.core.plan import FlowPlan
     from pydiverse.pipedag.core.stage import CommitStageTask
     from pydiverse.pipedag.engine import OrchestrationEngine
 
@@ -362,7 +367,174 @@ class Flow:
                 "for the chosen subgraph may never be used more than once per stage."
             )
         subflow = self.get_subflow(*components)
+        config = self._get_run_config(
+            subflow,
+            config=config,
+            fail_fast=fail_fast,
+            cache_validation_mode=cache_validation_mode,
+            disable_cache_function=disable_cache_function,
+            ignore_task_version=ignore_task_version,
+        )
+
+        if trace_hook is None:
+            trace_hook = TraceHook()
+
+        with config, RunContextServer(subflow, trace_hook) as run_context:
+            if config.cache_validation.skip_cache_valid_stages and not inputs:
+                self._skip_cache_valid_stages(
+                    subflow, run_context, ignore_position_hashes
+                )
+            if orchestration_engine is None:
+                orchestration_engine = config.create_orchestration_engine()
+            try:
+                result = orchestration_engine.run(
+                    subflow, ignore_position_hashes, inputs, **kwargs
+                )
+            finally:
+                # Outputs written in the background (write-behind) of stages
+                # that didn't get committed must not outlive the run.
+                try:
+                    config.store.wait_for_pending_writes()
+                except Exception as e:
+                    self.logger.error(
+                        "Failed writing task outputs in the background",
+                        exception=str(e),
+                    )
+                config.store.end_run(run_context.run_id)
 
+            visualization_url = result.visualize_url()
+            self.logger.info("Flow visualization", url=visualization_url)
+
+        trace_hook.run_complete(result)
+
+        if not result.successful and config.fail_fast:
+            raise result.exception or Exception("Flow run failed")
+
+        return result
+
+    def plan(
+        self,
+        *components: Task | TaskGetItem | Stage,
+        config: ConfigContext = None,
+        cache_validation_mode: CacheValidationMode | None = None,
+        disable_cache_function: bool | None = None,
+        ignore_task_version: bool | None = None,
+        ignore_position_hashes: bool = False,
+        inputs: dict[Task, ExternalTableReference] | None = None,
+    ) -> FlowPlan:
+        """Predict which tasks and stages will get executed by :py:meth:`run`.
+
+        For every task (in topological order), the ``input_hash``, the
+        ``cache_fn_hash`` and the resulting task cache key get computed without
+        executing the task or dematerializing any of its inputs. These values
+        get checked against the task metadata in the table store which gets
+        retrieved with one query per stage.
+
+        Lazy tasks always get executed. To be able to plan the tasks that depend
+        on them, it is assumed that they produce the same queries as in their
+        previous run.
+
+        The arguments have the same meaning as for :py:meth:`run`.
+
+        :return:
+            A :py:class:`~pydiverse.pipedag.core.plan.FlowPlan` object.
+
+        Examples
+        --------
+        .. code-block:: python
+
+            plan = flow.plan()
+            print([task.name for task in plan.tasks_to_run])
+            print([stage.name for stage in plan.stages_to_run])
+        """
+        from pydiverse.pipedag.core.plan import compute_flow_plan
+
+        subflow = self.get_subflow(*components)
+        config = self._get_run_config(
+            subflow,
+            config=config,
+            fail_fast=None,
+            cache_validation_mode=cache_validation_mode,
+            disable_cache_function=disable_cache_function,
+            ignore_task_version=ignore_task_version,
+        )
+
+        with config, DematerializeRunContext(self):
+            plan = compute_flow_plan(subflow, ignore_position_hashes, inputs)
+
+        self.logger.info(
+            "Flow plan",
+            tasks_to_run=[task.name for task in plan.tasks_to_run],
+            stages_to_run=sorted(stage.name for stage in plan.stages_to_run),
+        )
+        return plan
+
+    def _skip_cache_valid_stages(
+        self,
+        subflow: Subflow,
+        run_context: RunContext,
+        ignore_position_hashes: bool,
+    ):
+        """Don't initialize and commit stages that are known to be cache valid
+
+        Uses the :py:class:`FlowPlan` to find the stages in which all tasks are
+        cache valid and whose output tables exist in the committed schema.
+        Those stages get marked as committed, and their tasks directly return
+        the output of their previous run, which references tables in the
+        committed schema. The cache function results of the plan get reused
+        by all tasks, so cache functions don't get called twice.
+        """
+        from pydiverse.pipedag.core.plan import compute_flow_plan
+
+        plan = compute_flow_plan(subflow, ignore_position_hashes)
+        store = ConfigContext.get().store
+        run_context.set_planned_cache_fn_hashes(plan.cache_fn_hashes)
+
+        def output_table_names(stage: Stage) -> set[str]:
+            names = set()
+
+            def visitor(x):
+                if isinstance(x, Table) and x.external_schema is None:
+                    names.add(x.name)
+                elif isinstance(x, RawSql) and x.table_names is not None:
+                    names.update(x.table_names)
+                return x
+
+            for task in stage.tasks:
+                deep_map(plan.task_values[task], visitor)
+            return names
+
+        stages = [
+            stage
+            for stage in subflow.selected_stages
+            if stage.tasks
+            and all(task in plan.task_states for task in stage.tasks)
+            and plan.is_stage_cache_valid(stage)
+            and store.table_store.has_committed_tables(stage, output_table_names(stage))
+        ]
+        task_outputs = {
+            task: store.json_encode(plan.task_values[task])
+            for stage in stages
+            for task in stage.tasks
+        }
+
+        if stages:
+            self.logger.info(
+                "Skipping initialization and commit of cache valid stages",
+                stages=[stage.name for stage in stages],
+            )
+            run_context.skip_cache_valid_stages(stages, task_outputs)
+
+    def _get_run_config(
+        self,
+        subflow: Subflow,
+        config: ConfigContext | None,
+        fail_fast: bool | None,
+        cache_validation_mode: CacheValidationMode | None,
+        disable_cache_function: bool | None,
+        ignore_task_version: bool | None,
+    ) -> ConfigContext:
+        """Get the ConfigContext with which a subflow should be executed."""
         # Get the ConfigContext to use
         if config is None:
             try:
@@ -400,25 +572,7 @@ class Flow:
                 f"cache_validation_mode=NORMAL: {config.cache_validation}"
             )
 
-        if trace_hook is None:
-            trace_hook = TraceHook()
-
-        with config, RunContextServer(subflow, trace_hook):
-            if orchestration_engine is None:
-                orchestration_engine = config.create_orchestration_engine()
-            result = orchestration_engine.run(
-                subflow, ignore_position_hashes, inputs, **kwargs
-            )
-
-            visualization_url = result.visualize_url()
-            self.logger.info("Flow visualization", url=visualization_url)
-
-        trace_hook.run_complete(result)
-
-        if not result.successful and config.fail_fast:
-            raise result.exception or Exception("Flow run failed")
-
-        return result
+        return config
 
     def get_stage(self, name: str) -> Stage:
         """Retrieves a stage by name.
@@ -538,6 +692,28 @@ class Subflow:
             ):
                 yield parent_task
 
+    def get_critical_path_lengths(
+        self, task_durations: dict[Task, float]
+    ) -> dict[Task, float]:
+        """
+        Returns the length of the longest path from each task to the end of the flow.
+
+        The length of a path is the sum of the durations of all tasks on it
+        (including the task itself). Tasks that don't appear in `task_durations`
+        are assumed to take no time. Starting tasks with the longest remaining
+        path first, reduces the total run time when executing tasks in parallel.
+        """
+        tasks = list(self.get_tasks())
+        graph = self.flow.explicit_graph.subgraph(tasks)  # type: nx.DiGraph
+
+        lengths = {}
+        for task in reversed(list(nx.topological_sort(graph))):
+            lengths[task] = task_durations.get(task, 0.0) + max(
+                (lengths[child] for child in graph.successors(task)),
+                default=0.0,
+            )
+        return lengths
+
     def visualize(
         self, result: Result | None = None, visualization_tag: str | None = None
     ):
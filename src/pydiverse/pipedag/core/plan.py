@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import uuid
+from collections import defaultdict
+from enum import Enum
+from typing import TYPE_CHECKING, Any
+
+from attrs import frozen
+
+from pydiverse.pipedag.container import ExternalTableReference, Table
+from pydiverse.pipedag.context import ConfigContext
+from pydiverse.pipedag.context.context import CacheValidationMode
+from pydiverse.pipedag.core.group_node import BarrierTask
+from pydiverse.pipedag.core.stage import CommitStageTask
+from pydiverse.pipedag.core.task import Task, TaskGetItem
+from pydiverse.pipedag.errors import CacheError
+from pydiverse.pipedag.util import deep_map
+from pydiverse.pipedag.util.hashing import stable_hash
+
+if TYPE_CHECKING:
+    from pydiverse.pipedag.core import Flow, Stage, Subflow
+    from pydiverse.pipedag.materialize.metadata import TaskMetadata
+
+
+class PlannedTaskState(Enum):
+    """Predicted state of a task before running a flow.
+
+    See :py:meth:`Flow.plan() <pydiverse.pipedag.Flow.plan>`.
+    """
+
+    #: The output of the task will be retrieved from the cache.
+    CACHE_VALID = 0
+    #: The task will get executed.
+    CACHE_INVALID = 1
+    #: The task is lazy and will get executed. Whether its outputs are
+    #: cache valid can only be determined after it has produced its queries.
+    LAZY = 2
+    #: The state of the task can't be determined before running the flow.
+    #: This happens for tasks that aren't materializing tasks, tasks that use
+    #: automatic versioning, and tasks whose inputs can't be determined
+    #: in advance (e.g. downstream of executed tasks with ``fingerprint=True``).
+    UNKNOWN = 3
+
+    def will_run(self) -> bool:
+        """Whether the function of the task (potentially) gets called."""
+        return self != PlannedTaskState.CACHE_VALID
+
+
+@frozen
+class FlowPlan:
+    """
+    Prediction of which tasks and stages will get executed when running a flow.
+
+    Instances of this class get created by :py:meth:`Flow.plan()
+    <pydiverse.pipedag.Flow.plan>`.
+
+    Attributes
+    ----------
+    flow :
+        The flow for which this plan was created.
+    subflow :
+        The subflow for which this plan was created.
+    task_states :
+        A dictionary mapping from tasks to their predicted state.
+    task_values :
+        A dictionary mapping from tasks to the output they produced in a previous
+        run. Only contains tasks for which the output is known in advance.
+    cache_keys :
+        A dictionary mapping from tasks to their task cache key. Only contains tasks
+        for which the cache key can be computed without running the flow.
+    cache_fn_hashes :
+        A dictionary mapping from tasks with a cache function to the input hash
+        and the cache function hash that were used to compute their cache key.
+    lazy_dependent_tasks :
+        Set of tasks whose predicted state depends on the assumption that
+        upstream lazy tasks produce the same queries as in the previous run.
+    """
+
+    flow: Flow
+    subflow: Subflow
+
+    task_states: dict[Task, PlannedTaskState]
+    task_values: dict[Task, Any]
+    cache_keys: dict[Task, str]
+    cache_fn_hashes: dict[Task, tuple[str, str]]
+    lazy_dependent_tasks: frozenset[Task]
+
+    @property
+    def tasks_to_run(self) -> list[Task]:
+        """All tasks that (potentially) get executed, in topological order."""
+        return [task for task, state in self.task_states.items() if state.will_run()]
+
+    @property
+    def stages_to_run(self) -> list[Stage]:
+        """All stages that aren't known to be completely cache valid."""
+        return [
+            stage
+            for stage in self.subflow.selected_stages
+            if not self.is_stage_cache_valid(stage)
+        ]
+
+    def is_stage_cache_valid(self, stage: Stage) -> bool:
+        """Whether all tasks of a stage are known to be cache valid.
+
+        This doesn't take substages into account. In contrast to checking
+        :py:attr:`task_states`, tasks in :py:attr:`lazy_dependent_tasks` are
+        not treated as cache valid.
+        """
+        for task in stage.tasks:
+            if task not in self.task_states:
+                continue
+            if self.task_states[task] != PlannedTaskState.CACHE_VALID:
+                return False
+            if task in self.lazy_dependent_tasks:
+                return False
+        return True
+
+
+def compute_flow_plan(
+    subflow: Subflow,
+    ignore_position_hashes: bool = False,
+    inputs: dict[Task, ExternalTableReference] | None = None,
+) -> FlowPlan:
+    """Compute the :py:class:`FlowPlan` for a subflow.
+
+    Must be called with an open :py:class:`ConfigContext` and
+    :py:class:`DematerializeRunContext`.
+    """
+    from pydiverse.pipedag.materialize.cache import task_cache_key, task_input_hash
+    from pydiverse.pipedag.materialize.core import AUTO_VERSION, MaterializingTask
+
+    config_context = ConfigContext.get()
+    store = config_context.store
+    mode = config_context.cache_validation.mode
+    inputs = inputs if inputs is not None else {}
+
+    task_states = {}  # type: dict[Task, PlannedTaskState]
+    task_values = {}  # type: dict[Task, Any]
+    cache_keys = {}  # type: dict[Task, str]
+    cache_fn_hashes = {}  # type: dict[Task, tuple[str, str]]
+    lazy_dependent_tasks = set()  # type: set[Task]
+
+    # Retrieve all committed task metadata with one query per stage
+    stage_metadata = {}  # type: dict[Stage, dict[str, list[TaskMetadata]]]
+
+    def get_task_metadata(task: MaterializingTask) -> list[TaskMetadata]:
+        if task.stage not in stage_metadata:
+            index = defaultdict(list)
+            for metadata in store.table_store.retrieve_stage_task_metadata(task.stage):
+                index[metadata.name].append(metadata)
+            stage_metadata[task.stage] = index
+        return stage_metadata[task.stage][task.name]
+
+    def find_cached_metadata(
+        task: MaterializingTask, input_hash: str, cache_fn_hash: str
+    ) -> TaskMetadata | None:
+        # Same matching logic as `retrieve_task_metadata`
+        ignore_cache_function = mode == CacheValidationMode.IGNORE_FRESH_INPUT
+        matches = [
+            metadata
+            for metadata in get_task_metadata(task)
+            if metadata.version == task.version
+            and metadata.input_hash == input_hash
+            and (ignore_cache_function or metadata.cache_fn_hash == cache_fn_hash)
+        ]
+        return matches[0] if len(matches) == 1 else None
+
+    for task in subflow.get_tasks():
+        if isinstance(task, (CommitStageTask, BarrierTask)):
+            continue
+        if not isinstance(task, MaterializingTask):
+            task_states[task] = PlannedTaskState.UNKNOWN
+            continue
+
+        # Determine the values of all inputs
+        input_values = {}
+        input_states = set()
+        for in_id, in_task in task.input_tasks.items():
+            if in_task in inputs:
+                input_values[in_id] = Table(inputs[in_task])
+            elif in_task in task_values:
+                input_values[in_id] = task_values[in_task]
+                if in_task in lazy_dependent_tasks or (
+                    task_states[in_task] == PlannedTaskState.LAZY
+                ):
+                    lazy_dependent_tasks.add(task)
+            elif in_task in task_states:
+                state = task_states[in_task]
+                if state == PlannedTaskState.CACHE_INVALID and getattr(
+                    in_task, "fingerprint", False
+                ):
+                    # The output might keep its cache key if its content is unchanged
+                    state = PlannedTaskState.UNKNOWN
+                input_states.add(state)
+            else:
+                # Input task isn't part of the subflow -> gets loaded from cache
+                try:
+                    (
+                        cached_output,
+                        _,
+                    ) = store.retrieve_most_recent_task_output_from_cache(
+                        in_task, ignore_position_hashes
+                    )
+                    input_values[in_id] = cached_output
+                except CacheError:
+                    input_states.add(PlannedTaskState.UNKNOWN)
+
+        if PlannedTaskState.CACHE_INVALID in input_states and not task.lazy:
+            # The outputs of the upstream task will have a new cache key
+            task_states[task] = PlannedTaskState.CACHE_INVALID
+            continue
+        if input_states or task.version is AUTO_VERSION:
+            task_states[task] = (
+                PlannedTaskState.LAZY if task.lazy else PlannedTaskState.UNKNOWN
+            )
+            continue
+
+        # Compute input_hash and cache_fn_hash the same way as
+        # MaterializationWrapper does
+        def task_result_mapper(x, input_values=input_values):
+            if isinstance(x, Task):
+                return x.resolve_value(input_values[x.id])
+            if isinstance(x, TaskGetItem):
+                if isinstance(input_values[x.task.id], Table):
+                    return x.task.resolve_value(input_values[x.task.id])
+                else:
+                    return x.resolve_value(input_values[x.task.id])
+            return x
+
+        args = deep_map(task._bound_args.args, task_result_mapper)
+        kwargs = deep_map(task._bound_args.kwargs, task_result_mapper)
+        bound = task.fn.fn_signature.bind(*args, **kwargs)
+
+        input_hash = task_input_hash(task, store.json_encode(bound.arguments))
+        cache_fn_hash = ""
+        if task.cache is not None:
+            if config_context.cache_validation.disable_cache_function:
+                cache_fn_hash = stable_hash("CACHE_FN", uuid.uuid4().hex)
+            else:
+                cache_fn_output = store.json_encode(task.cache(*args, **kwargs))
+                cache_fn_hash = stable_hash("CACHE_FN", cache_fn_output)
+            cache_fn_hashes[task] = (input_hash, cache_fn_hash)
+
+        cache_keys[task] = task_cache_key(task, input_hash, cache_fn_hash)
+
+        if task.lazy:
+            # Lazy tasks always get executed. To be able to plan downstream tasks,
+            # we assume that they produce the same output as in the previous run.
+            task_states[task] = PlannedTaskState.LAZY
+            if metadata := find_cached_metadata(task, input_hash, cache_fn_hash):
+                task_values[task] = store.json_decode(metadata.output_json)
+            continue
+
+        force_task_execution = mode == CacheValidationMode.FORCE_CACHE_INVALID or (
+            mode == CacheValidationMode.FORCE_FRESH_INPUT and task.cache is not None
+        )
+        skip_cache_lookup = (
+            config_context.cache_validation.ignore_task_version or task.version is None
+        )
+        metadata = None
+        if not (force_task_execution or skip_cache_lookup):
+            metadata = find_cached_metadata(task, input_hash, cache_fn_hash)
+
+        if metadata is None:
+            task_states[task] = PlannedTaskState.CACHE_INVALID
+            lazy_dependent_tasks.discard(task)
+        else:
+            task_states[task] = PlannedTaskState.CACHE_VALID
+            task_values[task] = store.json_decode(metadata.output_json)
+
+    return FlowPlan(
+        flow=subflow.flow,
+        subflow=subflow,
+        task_states=task_states,
+        task_values=task_values,
+        cache_keys=cache_keys,
+        cache_fn_hashes=cache_fn_hashes,
+        lazy_dependent_tasks=frozenset(lazy_dependent_tasks),
+    )
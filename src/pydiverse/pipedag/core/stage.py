@@ -272,5 +272,13 @@ class CommitStageTask(Task):
         if self._skip_commit:
             return
 
+        from pydiverse.pipedag.context.run_context import RunContext, StageState
+
+        if RunContext.get().get_stage_state(self.stage) == StageState.COMMITTED:
+            # Stage is 100% cache valid and never got initialized
+            # (see `cache_validation.skip_cache_valid_stages`)
+            self.logger.info("Stage is cache valid; skipping commit")
+            return
+
         self.logger.info("Committing stage")
         ConfigContext.get().store.commit_stage(self.stage)
@@ -189,9 +189,19 @@ class Task:
                 raise e
             else:
                 if task_context.is_cache_valid:
-                    self.did_finish(FinalTaskState.CACHE_VALID)
+                    state = FinalTaskState.CACHE_VALID
                 else:
-                    self.did_finish(FinalTaskState.COMPLETED)
+                    state = FinalTaskState.COMPLETED
+
+                if task_context.pending_outputs is not None:
+                    # Outputs are still being written in the background
+                    task_context.pending_outputs.add_done_callback(
+                        lambda e: self.did_finish(
+                            FinalTaskState.FAILED if e is not None else state
+                        )
+                    )
+                else:
+                    self.did_finish(state)
                 return result
 
     def _run(self, inputs: [int, Any]) -> tuple[Any, TaskContext]:
@@ -7,6 +7,7 @@ from .dask import DaskEngine
 # initialization of logging library
 # from .prefect import PrefectEngine, PrefectOneEngine, PrefectTwoEngine
 from .sequential import SequentialEngine
+from .thread_pool import ThreadPoolEngine
 
 __all__ = [
     "OrchestrationEngine",
@@ -15,4 +16,5 @@ __all__ = [
     # "PrefectTwoEngine",
     "SequentialEngine",
     "DaskEngine",
+    "ThreadPoolEngine",
 ]
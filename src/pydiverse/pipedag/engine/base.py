@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import statistics
 from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING
 
 from pydiverse.pipedag import ExternalTableReference, Task
+from pydiverse.pipedag.context import ConfigContext
+from pydiverse.pipedag.core.group_node import BarrierTask
+from pydiverse.pipedag.core.stage import CommitStageTask
 from pydiverse.pipedag.util import Disposable
 
 if TYPE_CHECKING:
@@ -38,3 +42,29 @@ class OrchestrationEngine(Disposable, ABC):
             engine specific.
         :return: A result instance wrapping the flow execution result.
         """
+
+    def get_task_priorities(self, flow: Subflow) -> dict[Task, float]:
+        """Compute the priority with which each task should get scheduled
+
+        The priority of a task is the length of the longest path from it to the
+        end of the flow (critical path), using the durations of previous
+        executions of each task as weights. Tasks without any recorded duration
+        get weighted with the average duration of all other tasks.
+
+        :param flow: the pipedag flow to execute
+        :return: A dictionary mapping from task to priority. Tasks with a higher
+            priority should be started first.
+        """
+        tasks = list(flow.get_tasks())
+        stages = {task.stage for task in tasks if task.stage is not None}
+        table_store = ConfigContext.get().store.table_store
+        durations = table_store.retrieve_task_durations(stages)
+        default_duration = statistics.mean(durations.values()) if durations else 1.0
+
+        task_durations = {}
+        for task in tasks:
+            if isinstance(task, (CommitStageTask, BarrierTask)):
+                continue
+            task_durations[task] = durations.get(task.position_hash, default_duration)
+
+        return flow.get_critical_path_lengths(task_durations)
@@ -24,6 +24,20 @@ except ImportError as e:
     dask = None
 
 
+# Names of dask's local schedulers, which ignore priority annotations
+_LOCAL_SCHEDULERS = frozenset(
+    {
+        "sync",
+        "synchronous",
+        "single-threaded",
+        "threads",
+        "threading",
+        "processes",
+        "multiprocessing",
+    }
+)
+
+
 @requires(dask, ImportError("DaskEngine requires 'dask' to be installed."))
 class DaskEngine(OrchestrationEngine):
     """
@@ -48,6 +62,15 @@ class DaskEngine(OrchestrationEngine):
 
         self.dask_compute_kwargs.update(dask_compute_kwargs)
 
+    def _uses_priorities(self) -> bool:
+        scheduler = self.dask_compute_kwargs.get("scheduler")
+        if scheduler is None:
+            scheduler = dask.config.get("scheduler", None)
+        # Anything that isn't one of the local schedulers (e.g. a
+        # distributed.Client, which dask also picks by default if one
+        # exists) might respect task priorities.
+        return not isinstance(scheduler, str) or scheduler not in _LOCAL_SCHEDULERS
+
     def run(
         self,
         flow: Subflow,
@@ -62,6 +85,12 @@ class DaskEngine(OrchestrationEngine):
 
         results = {}
         exception = None
+        # Priorities are only respected by the distributed scheduler.
+        # The local schedulers ignore them, so don't bother computing them.
+        if self._uses_priorities():
+            priorities = self.get_task_priorities(flow)
+        else:
+            priorities = None
 
         def bind_run(t: Task):
             structlog_config = structlog.get_config()
@@ -96,14 +125,18 @@ class DaskEngine(OrchestrationEngine):
                 },
             }
 
-            results[task] = bind_run(task)(
-                parent_futures=[
-                    results[parent] for parent in flow.get_parent_tasks(task)
-                ],
-                inputs=task_inputs,
-                run_context=run_context,
-                config_context=config_context,
-            )
+            annotations = {}
+            if priorities is not None:
+                annotations["priority"] = priorities[task]
+            with dask.annotate(**annotations):
+                results[task] = bind_run(task)(
+                    parent_futures=[
+                        results[parent] for parent in flow.get_parent_tasks(task)
+                    ],
+                    inputs=task_inputs,
+                    run_context=run_context,
+                    config_context=config_context,
+                )
 
         try:
             results = dask.compute(results, **self.dask_compute_kwargs)[0]
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import os
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING
+
+from pydiverse.pipedag import ExternalTableReference, Table, Task
+from pydiverse.pipedag.context import ConfigContext, RunContext
+from pydiverse.pipedag.core.result import Result
+from pydiverse.pipedag.engine.base import (
+    OrchestrationEngine,
+)
+
+if TYPE_CHECKING:
+    from pydiverse.pipedag.core import Subflow
+
+
+class ThreadPoolEngine(OrchestrationEngine):
+    """
+    Execute a flow concurrently inside the current process using a thread pool.
+
+    As soon as all parent tasks of a task have finished, the task gets submitted
+    to a :py:class:`~concurrent.futures.ThreadPoolExecutor`. In contrast to the
+    :py:class:`DaskEngine`, no worker processes get spawned. This means that
+    the table store (including its connection pool) is shared by all tasks and
+    that no task inputs or outputs need to be pickled.
+
+    :param max_workers:
+        The maximum number of tasks that get executed at the same time.
+        By default, the default of :py:class:`~concurrent.futures.ThreadPoolExecutor`
+        is used.
+    :param max_tasks_per_stage:
+        The maximum number of tasks of the same stage that get executed
+        at the same time. This can be used to limit the load a single stage
+        puts onto the database. By default, there is no per-stage limit.
+    :param critical_path_priority:
+        If ``True`` (default), tasks that are ready to run get started in order of
+        the longest remaining path through the flow (critical path), using the
+        durations of previous runs as weights.
+        Otherwise, tasks get started in the order in which they were defined.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        max_tasks_per_stage: int | None = None,
+        critical_path_priority: bool = True,
+    ):
+        if max_workers is not None and max_workers < 1:
+            raise ValueError("max_workers must be greater than 0.")
+        if max_tasks_per_stage is not None and max_tasks_per_stage < 1:
+            raise ValueError("max_tasks_per_stage must be greater than 0.")
+
+        self.max_workers = max_workers
+        self.max_tasks_per_stage = max_tasks_per_stage
+        self.critical_path_priority = critical_path_priority
+
+    def run(
+        self,
+        flow: Subflow,
+        ignore_position_hashes: bool = False,
+        inputs: dict[Task, ExternalTableReference] | None = None,
+        **run_kwargs,
+    ):
+        run_context = RunContext.get()
+        config_context = ConfigContext.get()
+
+        tasks = list(flow.get_tasks())
+        if self.critical_path_priority:
+            priorities = self.get_task_priorities(flow)
+        else:
+            priorities = {}
+        # Same default as ThreadPoolExecutor
+        max_workers = self.max_workers or min(32, (os.cpu_count() or 1) + 4)
+        # Only wait for parents that actually get executed as part of this flow
+        parents = {
+            task: set(flow.get_parent_tasks(task)) & set(tasks) for task in tasks
+        }
+
+        failed_tasks = set()  # type: set[Task]
+        done_tasks = set()  # type: set[Task]
+        results = {}
+        exception = None
+        inputs = inputs if inputs is not None else {}
+
+        pending = list(tasks)
+        running = {}  # type: dict[Future, Task]
+        running_per_stage = defaultdict(int)  # type: dict[str, int]
+        stop_scheduling = False
+
+        def stage_name(task: Task) -> str | None:
+            return task.stage.name if task.stage is not None else None
+
+        def is_ready(task: Task) -> bool:
+            return parents[task].issubset(done_tasks)
+
+        def has_capacity(task: Task) -> bool:
+            if len(running) >= max_workers:
+                return False
+            if self.max_tasks_per_stage is None:
+                return True
+            return running_per_stage[stage_name(task)] < self.max_tasks_per_stage
+
+        def submit(executor: ThreadPoolExecutor, task: Task):
+            task_inputs = {
+                **{
+                    in_id: results[in_t]
+                    for in_id, in_t in task.input_tasks.items()
+                    if in_t in results and in_t not in inputs
+                },
+                **{
+                    in_id: Table(inputs[in_t])
+                    for in_id, in_t in task.input_tasks.items()
+                    if in_t in inputs
+                },
+            }
+
+            future = executor.submit(
+                task.run,
+                inputs=task_inputs,
+                run_context=run_context,
+                config_context=config_context,
+                ignore_position_hashes=ignore_position_hashes,
+            )
+            running[future] = task
+            running_per_stage[stage_name(task)] += 1
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="pipedag",
+        ) as executor:
+            try:
+                while running or (pending and not stop_scheduling):
+                    made_progress = False
+                    if not stop_scheduling:
+                        # Tasks only get submitted once a worker is available.
+                        # This way, the priority of ready tasks is respected.
+                        ready_tasks = sorted(
+                            (t for t in pending if is_ready(t)),
+                            key=lambda t: -priorities.get(t, 0.0),
+                        )
+                        for task in ready_tasks:
+                            if not has_capacity(task):
+                                continue
+                            pending.remove(task)
+                            made_progress = True
+                            if set(task.input_tasks.values()) & failed_tasks:
+                                failed_tasks.add(task)
+                                done_tasks.add(task)
+                                continue
+                            submit(executor, task)
+
+                    if not running:
+                        if not made_progress:
+                            raise RuntimeError(
+                                "ThreadPoolEngine couldn't schedule any of the"
+                                " remaining tasks: "
+                                + ", ".join(t.name for t in pending)
+                            )
+                        # All submitted tasks got skipped because of failed inputs
+                        continue
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        task = running.pop(future)
+                        running_per_stage[stage_name(task)] -= 1
+                        done_tasks.add(task)
+
+                        try:
+                            results[task] = future.result()
+                        except Exception as e:
+                            if config_context.fail_fast:
+                                raise e
+                            exception = e
+                            failed_tasks.add(task)
+                            if not config_context._swallow_exceptions:
+                                # Same as the SequentialEngine: don't start any
+                                # new tasks, but let running tasks finish.
+                                stop_scheduling = True
+
+            except Exception as e:
+                for future in running:
+                    future.cancel()
+                if config_context.fail_fast:
+                    raise e
+                exception = e
+
+        return Result.init_from(
+            subflow=flow,
+            underlying=results,
+            successful=(exception is None),
+            task_values=results,
+            exception=exception,
+        )
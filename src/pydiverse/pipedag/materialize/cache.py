@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 import itertools
+import json
 from dataclasses import dataclass
 from functools import cached_property
 from typing import TYPE_CHECKING
 
+from pydiverse.pipedag.context import ConfigContext
 from pydiverse.pipedag.util.hashing import stable_hash
 
 if TYPE_CHECKING:
@@ -45,6 +47,29 @@ class TaskCacheInfo:
         return ImperativeMaterializationState()
 
 
+def task_input_hash(task: MaterializingTask, input_json: str) -> str:
+    """Hash of the json encoded task inputs.
+
+    If the task only loads some columns or rows of its input tables, the column
+    and row selection (including the flow-wide `sample_mode`) is part of the
+    input hash.
+    """
+    parts = []
+    if task.input_columns is not None:
+        parts.append(json.dumps(task.input_columns, sort_keys=True))
+
+    row_selection = {
+        "filter": task.input_filter,
+        "sample": task.input_sample,
+        "sample_mode": dict(ConfigContext.get().sample_mode),
+    }
+    row_selection = {k: v for k, v in row_selection.items() if v}
+    if row_selection:
+        parts.append(json.dumps(row_selection, sort_keys=True, default=str))
+
+    return stable_hash("INPUT", input_json, *parts)
+
+
 def task_cache_key(task: MaterializingTask, input_hash: str, cache_fn_hash: str):
     """Cache key used to judge cache validity of the current task output.
 
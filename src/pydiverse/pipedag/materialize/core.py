@@ -3,6 +3,8 @@ from __future__ import annotations
 import copy
 import functools
 import inspect
+import os
+import time
 import uuid
 from collections.abc import Callable, Iterable
 from contextlib import contextmanager
@@ -12,14 +14,18 @@ from typing import TYPE_CHECKING, Any, overload
 import sqlalchemy as sa
 
 from pydiverse.pipedag._typing import CallableT
-from pydiverse.pipedag.container import Blob, RawSql, Table
+from pydiverse.pipedag.container import MATERIALIZATIONS, Blob, RawSql, Table
 from pydiverse.pipedag.context import ConfigContext, RunContext, TaskContext
 from pydiverse.pipedag.context.context import (
     CacheValidationMode,
 )
 from pydiverse.pipedag.core.task import Task, TaskGetItem, UnboundTask
 from pydiverse.pipedag.errors import CacheError
-from pydiverse.pipedag.materialize.cache import TaskCacheInfo, task_cache_key
+from pydiverse.pipedag.materialize.cache import (
+    TaskCacheInfo,
+    task_cache_key,
+    task_input_hash,
+)
 from pydiverse.pipedag.util import deep_map
 from pydiverse.pipedag.util.computation_tracing import (
     ComputationTraceRef,
@@ -42,6 +48,11 @@ def materialize(
     version: str | None = None,
     cache: Callable[..., Any] | None = None,
     lazy: bool = False,
+    fingerprint: bool = False,
+    materialization: str = "table",
+    input_columns: list[str] | dict[str, list[str]] | None = None,
+    input_filter: list | dict[str, list] | None = None,
+    input_sample: float | dict[str, float] | None = None,
     nout: int = 1,
     add_input_source: bool = False,
     ordering_barrier: bool | dict[str, Any] = False,
@@ -63,6 +74,11 @@ def materialize(
     version: str | None = None,
     cache: Callable[..., Any] | None = None,
     lazy: bool = False,
+    fingerprint: bool = False,
+    materialization: str = "table",
+    input_columns: list[str] | dict[str, list[str]] | None = None,
+    input_filter: list | dict[str, list] | None = None,
+    input_sample: float | dict[str, float] | None = None,
     group_node_tag: str | None = None,
     nout: int = 1,
     add_input_source: bool = False,
@@ -127,6 +143,48 @@ def materialize(
         This behaviour is very useful, because you don't need to manually bump
         the `version` of a lazy task. This only works because for lazy tables
         generating the query is very cheap compared to executing it.
+    :param fingerprint:
+        Whether to compute a content fingerprint for every table produced by
+        this task.
+
+        If the task gets executed again (e.g. because its `version` changed) and
+        a table has the same name and the same content as in the previous run,
+        the table keeps its previous cache key. Downstream tasks then remain
+        cache valid instead of getting invalidated (early cutoff).
+        For SQL tables, the fingerprint gets computed by the database using an
+        aggregate hash, for dataframes it gets computed locally.
+        This only works for tables with an explicit name, because auto-generated
+        table names contain the cache key of the task.
+        Can't be used together with ``lazy=True``.
+    :param materialization:
+        How SQL queries returned by this task get stored: ``"table"``,
+        ``"view"`` or ``"auto"``. Tables returned by the task can override this.
+        See the `materialization` parameter of :py:class:`Table` for details.
+    :param input_columns:
+        The columns to load from the input tables of this task.
+        Either a list of column names, which applies to all input tables, or a
+        dictionary that maps parameter names of `fn` to lists of column names.
+        The pandas, polars and pyarrow table hooks only select these columns in the
+        query sent to the database, and the local table cache only reads these
+        columns. Other input types (e.g. ``sa.Table``) ignore this option.
+        The selected columns are part of the input hash of the task.
+    :param input_filter:
+        Row filters for the input tables of this task.
+        Filters are given in the disjunctive normal form used by
+        :py:func:`pyarrow.parquet.read_table`: a list of
+        ``(column, operator, value)`` tuples that must all hold, or a list of such
+        lists of which at least one must hold. Supported operators are
+        ``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=``, ``in`` and ``not in``.
+        Like `input_columns`, it can also be a dictionary that maps parameter names
+        of `fn` to filters. The pandas, polars and pyarrow table hooks translate the
+        filters to a ``WHERE`` clause, and the local table cache passes them to the
+        parquet reader. The filters are part of the input hash of the task.
+    :param input_sample:
+        Only load a random sample of roughly this fraction (between 0 and 1) of the
+        rows of the input tables. Either a number or a dictionary that maps
+        parameter names of `fn` to numbers. The SQL table store uses
+        ``TABLESAMPLE`` with a fixed seed for this.
+        See also the `sample_mode` config option to sample the inputs of all tasks.
     :param group_node_tag:
         Set a tag that may add this task to a configuration based group node.
     :param nout:
@@ -213,6 +271,11 @@ def materialize(
             version=version,
             cache=cache,
             lazy=lazy,
+            fingerprint=fingerprint,
+            materialization=materialization,
+            input_columns=input_columns,
+            input_filter=input_filter,
+            input_sample=input_sample,
             group_node_tag=group_node_tag,
             nout=nout,
             add_input_source=add_input_source,
@@ -227,6 +290,11 @@ def materialize(
         version=version,
         cache=cache,
         lazy=lazy,
+        fingerprint=fingerprint,
+        materialization=materialization,
+        input_columns=input_columns,
+        input_filter=input_filter,
+        input_sample=input_sample,
         group_node_tag=group_node_tag,
         nout=nout,
         add_input_source=add_input_source,
@@ -290,6 +358,11 @@ class UnboundMaterializingTask(UnboundTask):
         version: str | None = None,
         cache: Callable[..., Any] | None = None,
         lazy: bool = False,
+        fingerprint: bool = False,
+        materialization: str = "table",
+        input_columns: list[str] | dict[str, list[str]] | None = None,
+        input_filter: list | dict[str, list] | None = None,
+        input_sample: float | dict[str, float] | None = None,
         group_node_tag: str | None = None,
         nout: int = 1,
         add_input_source: bool = False,
@@ -309,6 +382,11 @@ class UnboundMaterializingTask(UnboundTask):
         self.version = version
         self.cache = cache
         self.lazy = lazy
+        self.fingerprint = fingerprint
+        self.materialization = materialization
+        self.input_columns = input_columns
+        self.input_filter = input_filter
+        self.input_sample = input_sample
         self.group_node_tag = group_node_tag
         self.add_input_source = add_input_source
         self.call_context = call_context
@@ -343,6 +421,44 @@ class UnboundMaterializingTask(UnboundTask):
                 raise ValueError(
                     "Task can't be lazy and auto-versioning at the same time"
                 )
+        if fingerprint and lazy:
+            raise ValueError("Task can't be lazy and use fingerprints at the same time")
+        if materialization not in MATERIALIZATIONS - {None}:
+            raise ValueError(
+                "materialization must be one of "
+                f"{sorted(MATERIALIZATIONS - {None})}, found: {materialization!r}"
+            )
+        for option_name, option in [
+            ("input_columns", input_columns),
+            ("input_filter", input_filter),
+            ("input_sample", input_sample),
+        ]:
+            if isinstance(option, dict):
+                parameters = inspect.signature(fn).parameters
+                if unknown := set(option) - set(parameters):
+                    raise ValueError(
+                        f"{option_name} contains names that aren't parameters of "
+                        f"the task: {sorted(unknown)}"
+                    )
+        if input_filter is not None:
+            from pydiverse.pipedag.backend.table.util.filters import (
+                normalize_filters,
+            )
+
+            if not isinstance(input_filter, dict):
+                input_filter = {None: input_filter}
+            for filters in input_filter.values():
+                if filters is not None:
+                    normalize_filters(filters)
+        if input_sample is not None:
+            if not isinstance(input_sample, dict):
+                input_sample = {None: input_sample}
+            for fraction in input_sample.values():
+                if fraction is not None and not 0 < fraction <= 1:
+                    raise ValueError(
+                        "input_sample must be a fraction between 0 and 1, found: "
+                        f"{fraction}"
+                    )
 
     def __call__(self, *args, **kwargs) -> MaterializingTask:
         if self.group_node_args["ordering_barrier"]:
@@ -410,6 +526,11 @@ class MaterializingTask(Task):
         self._version = unbound_task.version
         self.cache = unbound_task.cache
         self.lazy = unbound_task.lazy
+        self.fingerprint = unbound_task.fingerprint
+        self.materialization = unbound_task.materialization
+        self.input_columns = unbound_task.input_columns
+        self.input_filter = unbound_task.input_filter
+        self.input_sample = unbound_task.input_sample
 
     @property
     def version(self):
@@ -486,7 +607,18 @@ class MaterializingTask(Task):
             cached_output = deep_map(cached_output, replace_stage_with_pseudo_stage)
             inputs[in_id] = cached_output
 
-        return super().run(inputs, **kwargs)
+        try:
+            return super().run(inputs, **kwargs)
+        finally:
+            run_context = kwargs.get("run_context") or RunContext.get()
+            config_context = kwargs.get("config_context") or ConfigContext.get()
+            # Memoized and cache valid tasks don't retrieve their inputs
+            config_context.store.release_task_inputs(self, run_context)
+            # The table store may buffer metadata until the stage gets committed.
+            # If this task got executed in a different process than the flow
+            # (e.g. by the DaskEngine), the commit doesn't see this buffer.
+            if run_context.flow_pid != os.getpid():
+                config_context.store.table_store.flush_metadata()
 
     def get_output_from_store(
         self, as_type: type = None, ignore_position_hashes: bool = False
@@ -599,18 +731,32 @@ class MaterializationWrapper:
         if task is None:
             raise TypeError("Task can't be None.")
 
+        store = config_context.store
+
+        # Tasks in stages that are known to be 100% cache valid in advance
+        # directly return their previous output (see `Flow.run`).
+        if config_context.cache_validation.skip_cache_valid_stages:
+            if (output := run_context.get_cache_valid_task_output(task)) is not None:
+                task.logger.info("Stage is cache valid. Using cached result.")
+                task_context.is_cache_valid = True
+                return store.json_decode(output)
+
         # If this is the first task in this stage to be executed, ensure that
         # the stage has been initialized and locked.
-        store = config_context.store
         store.ensure_stage_is_ready(task.stage)
 
         # Compute the cache key for the task inputs
         input_json = store.json_encode(bound.arguments)
-        input_hash = stable_hash("INPUT", input_json)
+        input_hash = task_input_hash(task, input_json)
 
         cache_fn_hash = ""
         if task.cache is not None:
-            if config_context.cache_validation.disable_cache_function:
+            if config_context.cache_validation.skip_cache_valid_stages and (
+                planned := run_context.get_planned_cache_fn_hash(task, input_hash)
+            ):
+                # Already computed by `Flow.run` while planning
+                cache_fn_hash = planned
+            elif config_context.cache_validation.disable_cache_function:
                 # choose random cache_fn_hash to ensure downstream tasks are
                 # invalidated for FORCE_FRESH_INPUT
                 cache_fn_hash = stable_hash("CACHE_FN", uuid.uuid4().hex)
@@ -769,6 +915,7 @@ class MaterializationWrapper:
             task_context.input_tables = input_tables
 
             # Not found in cache / lazy -> Evaluate Function
+            start_time = time.perf_counter()
             args, kwargs = store.dematerialize_task_inputs(
                 task, bound.args, bound.kwargs
             )
@@ -848,6 +995,9 @@ class MaterializationWrapper:
 
             result = deep_map(result, result_finalization_mutator)
             result = store.materialize_task(task, task_cache_info, result)
+            store.table_store.store_task_duration(
+                task, time.perf_counter() - start_time
+            )
 
             # Delete underlying objects from result (after materializing them)
             def obj_del_mutator(x):
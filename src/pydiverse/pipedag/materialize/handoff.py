@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
+
+import pandas as pd
+import structlog
+
+from pydiverse.pipedag import Table
+from pydiverse.pipedag.core.task import Task
+
+if TYPE_CHECKING:
+    from pydiverse.pipedag import Flow
+    from pydiverse.pipedag.backend.table.base import BaseTableStore
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+
+class HandoffCache:
+    """Process-local cache of the dataframes most recently produced by tasks
+
+    Downstream tasks that run in the same process and request a table as the
+    same dataframe type that was returned (pandas or polars) get the cached
+    dataframe instead of downloading the table again. It gets converted by the
+    table hook such that it looks as if it had been read from the table store
+    (see `TableHook.retrieve_handoff`).
+
+    An entry is only valid during the flow run that produced it, and for the
+    table name and cache key of the `Table` that was materialized. Every entry
+    is dropped once all tasks that consume the output of its task have
+    retrieved their inputs. Additionally, the least recently used entries get
+    evicted whenever the cache grows beyond its memory budget.
+
+    :param max_bytes: Memory budget of the cache. Dataframes that are larger
+        than this on their own are never cached.
+    :param table_store: The table store from which the tables would be read.
+    """
+
+    def __init__(self, max_bytes: int, table_store: BaseTableStore):
+        self.logger = structlog.get_logger(logger_name=type(self).__name__)
+        self.max_bytes = max_bytes
+        self.table_store = table_store
+
+        self._lock = threading.Lock()
+        # Keys are (run id, stage name, table name, cache key, type)
+        self._entries = OrderedDict()  # type: OrderedDict[tuple, tuple[Any, int]]
+        # Number of consumers of every task in the flow per run
+        self._consumer_counts = {}  # type: dict[str, dict[int, int]]
+        # Remaining consumers and cache keys of the entries per producing task,
+        # keyed by (run id, task id)
+        self._consumers = {}  # type: dict[tuple[str, int], int]
+        self._producer_keys = {}  # type: dict[tuple[str, int], list[tuple]]
+        self._released = set()  # type: set[tuple[str, int]]
+        self._nbytes = 0
+
+    @staticmethod
+    def _key(run_id: str, table: Table, as_type) -> tuple:
+        return run_id, table.stage.name, table.name, table.cache_key, as_type
+
+    def put(self, run_id: str, task: Task, tables: list[Table]):
+        """Cache the dataframes of the tables that got materialized by `task`"""
+        producer = (run_id, task.id)
+        with self._lock:
+            # With write-behind, consumers may already have released the task
+            if self._remaining_consumers(run_id, task.flow, task.id) <= 0:
+                return
+            for table in tables:
+                if table.stage is None or not _is_dataframe(table.obj):
+                    continue
+                nbytes = _memory_usage(table.obj)
+                if nbytes > self.max_bytes:
+                    continue
+
+                key = self._key(run_id, table, type(table.obj))
+                self._pop(key)
+                self._entries[key] = (table.obj, nbytes)
+                self._nbytes += nbytes
+                self._producer_keys.setdefault(producer, []).append(key)
+            self._evict()
+
+    def get(self, run_id: str, table: Table, as_type) -> Any | None:
+        """The cached dataframe as `as_type` or None if it isn't cached"""
+        if table.stage is None or table.is_partial_read:
+            return None
+        try:
+            key = self._key(run_id, table, as_type)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    return None
+                self._entries.move_to_end(key)
+        except TypeError:
+            # as_type isn't hashable (e.g. a dict with dtype backend options)
+            return None
+        return retrieve_handoff(self.table_store, table, entry[0], as_type)
+
+    def release(self, run_id: str, consumer: Task):
+        """`consumer` doesn't need the outputs of its input tasks any more
+
+        Only the first call per consumer and run has an effect.
+        """
+        with self._lock:
+            if (run_id, consumer.id) in self._released:
+                return
+            self._released.add((run_id, consumer.id))
+
+            for task_id in consumer.input_tasks:
+                producer = (run_id, task_id)
+                remaining = self._remaining_consumers(run_id, consumer.flow, task_id)
+                self._consumers[producer] = remaining - 1
+                if remaining <= 1:
+                    for key in self._producer_keys.pop(producer, []):
+                        self._pop(key)
+
+    def clear(self, run_id: str | None = None):
+        """Drop all entries (of a flow run)"""
+        with self._lock:
+            for key in list(self._entries):
+                if run_id is None or key[0] == run_id:
+                    self._pop(key)
+            for producer in list(self._consumers):
+                if run_id is None or producer[0] == run_id:
+                    del self._consumers[producer]
+                    self._producer_keys.pop(producer, None)
+            self._released = {
+                x for x in self._released if run_id is not None and x[0] != run_id
+            }
+            if run_id is None:
+                self._consumer_counts.clear()
+            else:
+                self._consumer_counts.pop(run_id, None)
+
+    def _remaining_consumers(self, run_id: str, flow: Flow, task_id: int) -> int:
+        """Number of consumers of a task that haven't released it yet"""
+        if (run_id, task_id) in self._consumers:
+            return self._consumers[(run_id, task_id)]
+        # The task objects that get executed are copies of the nodes in the
+        # flow graph. That's why they are identified by their id.
+        if run_id not in self._consumer_counts:
+            graph = flow.graph
+            self._consumer_counts[run_id] = {t.id: graph.out_degree(t) for t in graph}
+        return self._consumer_counts[run_id].get(task_id, 0)
+
+    def _pop(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._nbytes -= entry[1]
+
+    def _evict(self):
+        while self._nbytes > self.max_bytes and self._entries:
+            key, (_, nbytes) = self._entries.popitem(last=False)
+            self._nbytes -= nbytes
+            self.logger.debug("Evicted table from handoff cache", table=key[2])
+
+
+def retrieve_handoff(
+    table_store: BaseTableStore, table: Table, obj, as_type
+) -> Any | None:
+    """`obj` as if it had been retrieved from the table store as `as_type`
+
+    :return: None if `obj` can't be handed over as `as_type`.
+    """
+    if obj is None or type(obj) is not as_type:
+        return None
+    try:
+        hook = table_store.get_r_table_hook(as_type)
+        return hook.retrieve_handoff(table_store, table, obj, as_type)
+    except (TypeError, ValueError, KeyError):
+        # Not supported by the hook or the dtypes can't be converted
+        return None
+
+
+def _is_dataframe(obj) -> bool:
+    return type(obj) is pd.DataFrame or (pl is not None and type(obj) is pl.DataFrame)
+
+
+def _memory_usage(obj) -> int:
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    return int(obj.estimated_size())
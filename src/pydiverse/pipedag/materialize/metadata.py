@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import datetime
+from collections import defaultdict
+from collections.abc import Iterable
 from dataclasses import dataclass
 
 
@@ -69,3 +71,95 @@ class RawSqlMetadata:
     stage: str
     query_hash: str
     task_hash: str
+
+
+@dataclass
+class StageMetadataIndex:
+    """In-memory index of the committed cache metadata of a single stage
+
+    Table stores that keep their metadata in a remote database can use this
+    class to retrieve all metadata rows of a stage at once (for example when
+    the stage gets initialized) instead of issuing one query per cache lookup.
+
+    Task metadata is indexed by `(name, version, input_hash, cache_fn_hash)`
+    and lazy table / raw sql metadata is indexed by `query_hash`.
+    Every key maps to a list of all matching metadata objects to allow the
+    caller to detect ambiguous cache entries.
+    """
+
+    tasks: dict[tuple[str, str | None, str, str], list[TaskMetadata]]
+    lazy_tables: dict[str, list[LazyTableMetadata]]
+    raw_sql: dict[str, list[RawSqlMetadata]]
+
+    @classmethod
+    def from_metadata(
+        cls,
+        task_metadata: Iterable[TaskMetadata],
+        lazy_table_metadata: Iterable[LazyTableMetadata],
+        raw_sql_metadata: Iterable[RawSqlMetadata],
+    ) -> StageMetadataIndex:
+        tasks = defaultdict(list)
+        for metadata in task_metadata:
+            key = (
+                metadata.name,
+                metadata.version,
+                metadata.input_hash,
+                metadata.cache_fn_hash,
+            )
+            tasks[key].append(metadata)
+
+        lazy_tables = defaultdict(list)
+        for metadata in lazy_table_metadata:
+            lazy_tables[metadata.query_hash].append(metadata)
+
+        raw_sql = defaultdict(list)
+        for metadata in raw_sql_metadata:
+            raw_sql[metadata.query_hash].append(metadata)
+
+        return cls(dict(tasks), dict(lazy_tables), dict(raw_sql))
+
+    def get_task_metadata(
+        self,
+        name: str,
+        version: str | None,
+        input_hash: str,
+        cache_fn_hash: str | None,
+    ) -> list[TaskMetadata]:
+        """Get all task metadata objects matching the given key
+
+        If `cache_fn_hash` is None, it is ignored for matching.
+        """
+        if cache_fn_hash is not None:
+            return self.tasks.get((name, version, input_hash, cache_fn_hash), [])
+        return [
+            metadata
+            for key, metadata_list in self.tasks.items()
+            if key[:3] == (name, version, input_hash)
+            for metadata in metadata_list
+        ]
+
+    def get_lazy_table_metadata(
+        self, query_hash: str, task_hash: str
+    ) -> list[LazyTableMetadata]:
+        return [
+            metadata
+            for metadata in self.lazy_tables.get(query_hash, [])
+            if metadata.task_hash == task_hash
+        ]
+
+    def get_raw_sql_metadata(
+        self, query_hash: str, task_hash: str
+    ) -> list[RawSqlMetadata]:
+        return [
+            metadata
+            for metadata in self.raw_sql.get(query_hash, [])
+            if metadata.task_hash == task_hash
+        ]
+
+    @property
+    def task_metadata(self) -> list[TaskMetadata]:
+        return [
+            metadata
+            for metadata_list in self.tasks.values()
+            for metadata in metadata_list
+        ]
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import copy
+import os
+import threading
 from datetime import datetime
+from functools import partial
 from typing import Any, Callable
 
 import structlog
@@ -15,8 +19,11 @@ from pydiverse.pipedag.core.task import Task, TaskGetItem
 from pydiverse.pipedag.errors import CacheError, DuplicateNameError, StageError
 from pydiverse.pipedag.materialize.cache import TaskCacheInfo
 from pydiverse.pipedag.materialize.core import MaterializingTask
+from pydiverse.pipedag.materialize.handoff import HandoffCache
 from pydiverse.pipedag.materialize.metadata import TaskMetadata
+from pydiverse.pipedag.materialize.write_behind import WriteBehindQueue
 from pydiverse.pipedag.util import Disposable, deep_map
+from pydiverse.pipedag.util.concurrency import run_concurrently
 
 
 class PipeDAGStore(Disposable):
@@ -48,12 +55,21 @@ class PipeDAGStore(Disposable):
         self.json_encoder = PipedagJSONEncoder()
         self.json_decoder = PipedagJSONDecoder()
 
+        self._write_behind = None  # type: WriteBehindQueue | None
+        self._handoff_cache = None  # type: HandoffCache | None
+        self._write_behind_lock = threading.Lock()
+        self._handoff_cache_lock = threading.Lock()
+
     def dispose(self):
         """
         Clean up and close all open resources.
 
         Don't use the store object any more after disposal!
         """
+        if self._write_behind is not None:
+            self._write_behind.dispose()
+        if self._handoff_cache is not None:
+            self._handoff_cache.clear()
         self.table_store.dispose()
         self.blob_store.dispose()
         if self.local_table_cache:
@@ -98,6 +114,15 @@ class PipeDAGStore(Disposable):
     def commit_stage(self, stage: Stage):
         """Commit the stage"""
         ctx = RunContext.get()
+        if self._write_behind is not None:
+            # Whether the stage has changed is only known once all of its
+            # outputs have been written.
+            try:
+                self._write_behind.wait(stage)
+            except Exception as e:
+                raise StageError(
+                    f"Failed to write the outputs of stage '{stage.name}'"
+                ) from e
         with ctx.commit_stage(stage) as should_continue:
             if not should_continue:
                 raise StageError
@@ -121,6 +146,15 @@ class PipeDAGStore(Disposable):
             # item.stage can be None for ExternalTableReference
             if item.stage is not None:
                 ctx.validate_stage_lock(item.stage)
+            if not for_auto_versioning:
+                if (handoff_cache := self._get_handoff_cache()) is not None:
+                    obj = handoff_cache.get(ctx.run_id, item, as_type)
+                    if obj is not None:
+                        return obj
+                if self._write_behind is not None:
+                    obj = self._write_behind.retrieve(item, as_type)
+                    if obj is not None:
+                        return obj
             obj = self.table_store.retrieve_table_obj(
                 item,
                 as_type=as_type,
@@ -145,6 +179,8 @@ class PipeDAGStore(Disposable):
             return new_raw_sql
         elif isinstance(item, Blob):
             ctx.validate_stage_lock(item.stage)
+            if self._write_behind is not None:
+                self._write_behind.retrieve(item, None)
             return self.blob_store.retrieve_blob(item)
         return item
 
@@ -171,22 +207,131 @@ class PipeDAGStore(Disposable):
 
         ctx = RunContext.get()
 
-        def dematerialize_mapper(x):
-            ret = self.dematerialize_item(
-                x,
-                as_type=task.input_type,
-                ctx=ctx,
-                for_auto_versioning=for_auto_versioning,
-            )
-            if task.add_input_source and isinstance(x, (Table, Blob, RawSql)):
-                return ret, x
-            return ret
+        sample_mode = ConfigContext.get().sample_mode
+        # References (e.g. sa.Table) are cheap to retrieve. They get retrieved
+        # immediately and in order to keep their alias names deterministic.
+        retrieve_now = for_auto_versioning or self._retrieves_reference(task.input_type)
+        # Inputs that get passed several times are only fetched once
+        fetches = {}  # type: dict[tuple, _InputFetch]
+
+        def dematerialize_mapper(
+            x,
+            columns: list[str] | None = None,
+            filters: list | None = None,
+            sample: float | None = None,
+        ):
+            if not isinstance(x, (Table, RawSql, Blob)):
+                return x
+
+            item = x
+            if isinstance(x, Table):
+                if sample is None:
+                    sample = sample_mode.get("fraction")
+                limit = sample_mode.get("max_rows")
+                if any(v is not None for v in (columns, filters, sample, limit)):
+                    item = copy.copy(x)
+                    item.columns = list(columns) if columns is not None else None
+                    item.filters = filters
+                    item.sample = sample
+                    item.limit = limit
+
+            source = x if task.add_input_source else None
+            if retrieve_now and not isinstance(x, Blob):
+                # Every occurrence gets its own reference (e.g. for self joins)
+                fetch = _InputFetch(item)
+                self._fetch_input(task, fetch, ctx, for_auto_versioning)
+                return _InputRef(fetch, source).resolve()
+
+            key = _InputFetch.key(item)
+            if key not in fetches:
+                fetches[key] = _InputFetch(item)
+            return _InputRef(fetches[key], source)
+
+        options = dict(
+            columns=task.input_columns,
+            filters=task.input_filter,
+            sample=task.input_sample,
+        )
+        if any(isinstance(option, dict) for option in options.values()):
+            # Column and row selection per parameter of the task
+            bound = task.fn.fn_signature.bind(*args, **kwargs)
+            for name, value in bound.arguments.items():
+                mapper = partial(
+                    dematerialize_mapper,
+                    **{
+                        key: option.get(name) if isinstance(option, dict) else option
+                        for key, option in options.items()
+                    },
+                )
+                bound.arguments[name] = deep_map(value, mapper)
+            d_args, d_kwargs = bound.args, bound.kwargs
+        else:
+            mapper = partial(dematerialize_mapper, **options)
+            d_args = deep_map(args, mapper)
+            d_kwargs = deep_map(kwargs, mapper)
 
-        d_args = deep_map(args, dematerialize_mapper)
-        d_kwargs = deep_map(kwargs, dematerialize_mapper)
+        if fetches:
+            self._fetch_inputs(task, list(fetches.values()), ctx, for_auto_versioning)
 
+            def resolve_mapper(x):
+                return x.resolve() if isinstance(x, _InputRef) else x
+
+            # Without memo, such that every occurrence of an input gets resolved
+            d_args = deep_map(d_args, resolve_mapper, memo=_NoMemo())
+            d_kwargs = deep_map(d_kwargs, resolve_mapper, memo=_NoMemo())
+
+        if not for_auto_versioning:
+            self.release_task_inputs(task, ctx)
         return d_args, d_kwargs
 
+    def _retrieves_reference(self, as_type) -> bool:
+        if as_type is None:
+            return True
+        try:
+            hook = self.table_store.get_r_table_hook(as_type)
+        except (TypeError, ValueError):
+            # The error gets raised when retrieving the table
+            return False
+        return hook.retrieve_as_reference(as_type)
+
+    def _fetch_inputs(
+        self,
+        task: MaterializingTask,
+        fetches: list[_InputFetch],
+        ctx: RunContext,
+        for_auto_versioning: bool,
+    ):
+        """Dematerializes task inputs concurrently
+
+        The number of inputs that get fetched at the same time is limited by
+        the ``max_concurrent_input_downloads`` attribute of the table store.
+        """
+        run_concurrently(
+            [
+                partial(self._fetch_input, task, fetch, ctx, for_auto_versioning)
+                for fetch in fetches
+            ],
+            max_workers=getattr(self.table_store, "max_concurrent_input_downloads", 1),
+            thread_name_prefix="pipedag-input",
+        )
+
+    def _fetch_input(
+        self,
+        task: MaterializingTask,
+        fetch: _InputFetch,
+        ctx: RunContext,
+        for_auto_versioning: bool,
+    ):
+        ctx.trace_hook.input_pre_dematerialize(task, fetch.item)
+        obj = self.dematerialize_item(
+            fetch.item,
+            as_type=task.input_type,
+            ctx=ctx,
+            for_auto_versioning=for_auto_versioning,
+        )
+        ctx.trace_hook.input_post_dematerialize(task, fetch.item)
+        fetch.result = obj
+
     def materialize_task(
         self,
         task: MaterializingTask,
@@ -247,29 +392,160 @@ class PipeDAGStore(Disposable):
                 )
                 self.table_store.store_task_metadata(metadata, stage)
 
+        previous_tables = None
+        previous_tables_lock = threading.Lock()
+
+        def get_previous_table(name: str) -> Table | None:
+            """Table with the same name in the most recent output of the task"""
+            with previous_tables_lock:
+                return _get_previous_table(name)
+
+        def _get_previous_table(name: str) -> Table | None:
+            nonlocal previous_tables
+            if previous_tables is None:
+                previous_tables = {}
+                try:
+                    output, _ = self.retrieve_most_recent_task_output_from_cache(task)
+                except CacheError:
+                    return None
+
+                def visitor(x):
+                    if isinstance(x, Table):
+                        previous_tables[x.name] = x
+                    return x
+
+                deep_map(output, visitor)
+            return previous_tables.get(name)
+
         def store_table(table: Table):
             if task.lazy:
                 self.table_store.store_table_lazy(table, task, task_cache_info)
             else:
                 self.table_store.store_table(table, task)
+                if task.fingerprint:
+                    self._apply_table_fingerprint(table, get_previous_table)
+                    if self.local_table_cache:
+                        self.local_table_cache.store_table(table, task)
 
         # Materialize
         self._check_names(task, tables, blobs)
-        self._store_task_transaction(
-            task,
-            tables,
-            raw_sqls,
-            blobs,
-            store_table,
-            lambda raw_sql: self.table_store.store_raw_sql(
-                raw_sql, task, task_cache_info
-            ),
-            self.blob_store.store_blob,
-            store_metadata,
-        )
-
+        handoff_cache = self._get_handoff_cache()
+
+        def store_outputs(tables: list[Table], blobs: list[Blob]):
+            self._store_task_transaction(
+                task,
+                tables,
+                raw_sqls,
+                blobs,
+                store_table,
+                lambda raw_sql: self.table_store.store_raw_sql(
+                    raw_sql, task, task_cache_info
+                ),
+                self.blob_store.store_blob,
+                store_metadata,
+            )
+            if handoff_cache is not None and not disable_task_finalization:
+                handoff_cache.put(ctx.run_id, task, tables)
+
+        if self._can_write_behind(task, raw_sqls, disable_task_finalization):
+            # The caller drops the objects of the returned tables and blobs
+            # while they still get written.
+            tables = [_copy_with_obj(t) for t in tables]
+            blobs = [_copy_with_obj(b) for b in blobs]
+            pending_outputs = self._get_write_behind().submit(
+                stage, tables, blobs, partial(store_outputs, tables, blobs)
+            )
+            try:
+                # The task only finishes once its outputs have been written
+                TaskContext.get().pending_outputs = pending_outputs
+            except LookupError:
+                pass
+            return value
+
+        store_outputs(tables, blobs)
         return value
 
+    @staticmethod
+    def _can_write_behind(
+        task: MaterializingTask,
+        raw_sqls: list[RawSql],
+        disable_task_finalization: bool,
+    ) -> bool:
+        if not ConfigContext.get().write_behind.enabled:
+            return False
+        if task.lazy or task.fingerprint or raw_sqls or disable_task_finalization:
+            # Storing these outputs modifies them (cache keys, fingerprints)
+            # or must be completed before the task finishes.
+            return False
+        # Tasks in other processes can't hand over their outputs and don't
+        # wait for pending writes when committing a stage.
+        return os.getpid() == RunContext.get().flow_pid
+
+    def _get_write_behind(self) -> WriteBehindQueue:
+        with self._write_behind_lock:
+            if self._write_behind is None:
+                max_pending_tasks = ConfigContext.get().write_behind.max_pending_tasks
+                self._write_behind = WriteBehindQueue(
+                    max_pending_tasks, self.table_store
+                )
+            return self._write_behind
+
+    def _get_handoff_cache(self) -> HandoffCache | None:
+        config = ConfigContext.get().handoff_cache
+        if not config.enabled or os.getpid() != RunContext.get().flow_pid:
+            # Consumers in other processes wouldn't release the entries
+            return None
+        with self._handoff_cache_lock:
+            if self._handoff_cache is None:
+                self._handoff_cache = HandoffCache(config.max_bytes, self.table_store)
+            return self._handoff_cache
+
+    def release_task_inputs(self, task: Task, ctx: RunContext | None = None):
+        """Signal that a task doesn't need the outputs of its input tasks any more
+
+        Entries of the handoff cache get dropped once all consumers of a task
+        have released them. Releasing the inputs of a task more than once has
+        no effect.
+        """
+        if self._handoff_cache is not None:
+            ctx = ctx or RunContext.get()
+            self._handoff_cache.release(ctx.run_id, task)
+
+    def end_run(self, run_id: str):
+        """Release resources that were used during a flow run"""
+        if self._handoff_cache is not None:
+            self._handoff_cache.clear(run_id)
+
+    def wait_for_pending_writes(self):
+        """Wait until all outputs written in the background have been stored
+
+        :raises Exception: if writing any of them failed.
+        """
+        if self._write_behind is not None:
+            self._write_behind.wait()
+
+    def _apply_table_fingerprint(
+        self, table: Table, get_previous_table: Callable[[str], Table | None]
+    ):
+        """Early cutoff: keep the cache key of tables whose content didn't change
+
+        Downstream tasks compute their input hash from the cache keys of their
+        input tables. By reusing the previous cache key for a table with the same
+        content, they remain cache valid, even though this task got executed.
+        """
+        table.fingerprint = self.table_store.compute_table_fingerprint(table)
+        if table.fingerprint is None:
+            return
+
+        previous = get_previous_table(table.name)
+        if previous is not None and previous.fingerprint == table.fingerprint:
+            self.logger.info(
+                "Table content didn't change; keeping previous cache key",
+                table=table,
+                cache_key=previous.cache_key,
+            )
+            table.cache_key = previous.cache_key
+
     def prepare_task_output_for_materialization(
         self,
         task: MaterializingTask,
@@ -333,6 +609,8 @@ class PipeDAGStore(Disposable):
                 if isinstance(x, Table):
                     if x.obj is None:
                         raise TypeError("Underlying table object can't be None")
+                    if x.materialization is None:
+                        x.materialization = task.materialization
                     tables.append(x)
                 elif isinstance(x, RawSql):
                     if x.sql is None:
@@ -401,21 +679,35 @@ class PipeDAGStore(Disposable):
         store_blob: Callable[[Blob], None],
         store_metadata: Callable[[], None],
     ):
+        """Stores the outputs of a task; either all of them, or none
+
+        Tables and blobs get written concurrently. The number of concurrent
+        writes is limited by the ``max_concurrent_output_uploads`` attribute of
+        the table store. DDL that table stores defer until all tables have been
+        written (e.g. indexes) gets executed before raw SQL and metadata are
+        stored.
+        """
         stage = task.stage
         ctx = RunContext.get()
 
         stored_tables = []
         stored_blobs = []
 
+        def store(obj, store_fn, stored: list):
+            ctx.validate_stage_lock(stage)
+            store_fn(obj)
+            stored.append(obj)
+
         try:
-            for table in tables:
-                ctx.validate_stage_lock(stage)
-                store_table(table)
-                stored_tables.append(table)
-            for blob in blobs:
-                ctx.validate_stage_lock(stage)
-                store_blob(blob)
-                stored_blobs.append(blob)
+            with self.table_store.defer_table_ddl():
+                run_concurrently(
+                    [partial(store, t, store_table, stored_tables) for t in tables]
+                    + [partial(store, b, store_blob, stored_blobs) for b in blobs],
+                    max_workers=getattr(
+                        self.table_store, "max_concurrent_output_uploads", 1
+                    ),
+                    thread_name_prefix="pipedag-output",
+                )
             for raw_sql in raw_sqls:
                 ctx.validate_stage_lock(stage)
                 store_raw_sql(raw_sql)
@@ -605,6 +897,13 @@ def dematerialize_output_from_store(
         )
 
 
+def _copy_with_obj(x: Table | Blob) -> Table | Blob:
+    # `copy.copy` drops `obj` (see `Table.__getstate__`)
+    x_copy = copy.copy(x)
+    x_copy.obj = x.obj
+    return x_copy
+
+
 def mangle_table_name(table_name: str, task_name: str | None, suffix: str):
     if table_name is None:
         if task_name is None:
@@ -613,3 +912,62 @@ def mangle_table_name(table_name: str, task_name: str | None, suffix: str):
     elif table_name.endswith("%%"):
         table_name = table_name[:-2] + suffix
     return table_name
+
+
+class _InputFetch:
+    """Task input that hasn't been dematerialized yet"""
+
+    __slots__ = ("item", "result", "_taken")
+
+    def __init__(self, item: Table | RawSql | Blob):
+        self.item = item
+        self.result = None
+        self._taken = False
+
+    @staticmethod
+    def key(item: Table | RawSql | Blob) -> tuple:
+        """Inputs with the same key are dematerialized only once"""
+        key = (type(item), item.stage.name if item.stage else None, item.name)
+        if isinstance(item, Table):
+            columns = tuple(item.columns) if item.columns is not None else None
+            key += (
+                item.external_schema,
+                columns,
+                repr(item.filters),
+                item.sample,
+                item.limit,
+            )
+        return key
+
+    def take(self) -> Any:
+        """The dematerialized object for one occurrence of the input
+
+        Every occurrence but the first gets a copy, such that modifying one
+        argument in place doesn't change the others.
+        """
+        if not self._taken:
+            self._taken = True
+            return self.result
+        return copy.deepcopy(self.result)
+
+
+class _NoMemo(dict):
+    """Memo for `deep_map` that doesn't remember any results"""
+
+    def __setitem__(self, key, value):
+        pass
+
+
+class _InputRef:
+    """Placeholder for an occurrence of a task input in the task arguments"""
+
+    __slots__ = ("fetch", "source")
+
+    def __init__(self, fetch: _InputFetch, source: Any = None):
+        self.fetch = fetch
+        self.source = source
+
+    def resolve(self):
+        if self.source is not None:
+            return self.fetch.take(), self.source
+        return self.fetch.take()
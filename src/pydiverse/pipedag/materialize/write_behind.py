@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+import structlog
+
+from pydiverse.pipedag import Blob, Stage, Table
+from pydiverse.pipedag.materialize.handoff import retrieve_handoff
+
+if TYPE_CHECKING:
+    from pydiverse.pipedag.backend.table.base import BaseTableStore
+
+
+class WriteBehindQueue:
+    """Stores task outputs in background threads
+
+    With write-behind, a task returns as soon as its outputs have been
+    prepared for materialization. The actual writes happen in the background,
+    which overlaps them with the computation of downstream tasks.
+
+    While a table is being written, tasks in the same process receive the
+    in-memory object if they request it as the same type. It gets converted by
+    the table hook such that it looks as if it had been read from the table
+    store (see `TableHook.retrieve_handoff`). Otherwise, they wait until the
+    table has been written. Stage commits wait for all pending writes of the
+    stage, and raise the exception of the first failed write.
+
+    :param max_pending_tasks: Maximum number of tasks whose outputs get written
+        at the same time. Tasks that finish while the queue is full wait until
+        a slot is free. This bounds the memory used by pending outputs.
+    :param table_store: The table store to which the tables get written.
+    """
+
+    def __init__(self, max_pending_tasks: int, table_store: BaseTableStore):
+        self.logger = structlog.get_logger(logger_name=type(self).__name__)
+        self.max_pending_tasks = max_pending_tasks
+        self.table_store = table_store
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending_tasks)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_pending_tasks, thread_name_prefix="pipedag-write"
+        )
+        # Keys are (stage name, table or blob name)
+        self._pending = {}  # type: dict[tuple[str, str], tuple[Future, Any]]
+        self._futures = {}  # type: dict[str, list[Future]]
+
+    def submit(
+        self,
+        stage: Stage,
+        tables: list[Table],
+        blobs: list[Blob],
+        fn: Callable[[], None],
+    ) -> PendingOutputs:
+        """Call `fn` in the background; it must store the tables and blobs"""
+        pending_outputs = PendingOutputs()
+
+        def write():
+            try:
+                fn()
+            except BaseException as e:
+                pending_outputs.set_done(e)
+                raise
+            pending_outputs.set_done(None)
+
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(contextvars.copy_context().run, write)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        keys = [(stage.name, x.name) for x in [*tables, *blobs]]
+        with self._lock:
+            self._futures.setdefault(stage.name, []).append(future)
+            for table in tables:
+                self._pending[(stage.name, table.name)] = (future, table.obj)
+            for blob in blobs:
+                self._pending[(stage.name, blob.name)] = (future, None)
+
+        def done(future: Future):
+            self._slots.release()
+            with self._lock:
+                for key in keys:
+                    if key in self._pending and self._pending[key][0] is future:
+                        del self._pending[key]
+            if (e := future.exception()) is not None:
+                self.logger.error(
+                    "Failed writing task outputs in the background",
+                    stage=stage,
+                    tables=[t.name for t in tables],
+                    blobs=[b.name for b in blobs],
+                    exception=str(e),
+                )
+
+        future.add_done_callback(done)
+        return pending_outputs
+
+    def retrieve(self, item: Table | Blob, as_type: type | None) -> Any:
+        """Get a pending object or wait until it has been written
+
+        :return: The in-memory object converted to `as_type` if it is still
+            being written and can be handed over, otherwise None.
+        :raises Exception: if writing the object failed.
+        """
+        if item.stage is None:
+            return None
+        with self._lock:
+            pending = self._pending.get((item.stage.name, item.name))
+        if pending is None:
+            return None
+
+        future, obj = pending
+        if isinstance(item, Table) and not item.is_partial_read:
+            handed_over = retrieve_handoff(self.table_store, item, obj, as_type)
+            if handed_over is not None:
+                return handed_over
+
+        future.result()
+        return None
+
+    def wait(self, stage: Stage | None = None):
+        """Wait for all pending writes (of a stage)
+
+        :raises Exception: the exception of the first write that failed.
+        """
+        with self._lock:
+            if stage is None:
+                futures = [f for fs in self._futures.values() for f in fs]
+                self._futures.clear()
+            else:
+                futures = self._futures.pop(stage.name, [])
+
+        exception = None
+        for future in futures:
+            if (e := future.exception()) is not None and exception is None:
+                exception = e
+        if exception is not None:
+            raise exception
+
+    def dispose(self):
+        self._executor.shutdown(wait=True)
+
+
+class PendingOutputs:
+    """Outputs of a task that are being written in the background"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._done = False
+        self._exception = None  # type: BaseException | None
+        self._callbacks = []  # type: list[Callable[[BaseException | None], None]]
+
+    def add_done_callback(self, fn: Callable[[BaseException | None], None]):
+        """Call `fn` with the exception of the write (or None) once it is done
+
+        Unlike the callbacks of a `Future`, `fn` has returned before stage
+        commits and flow runs stop waiting for the write. If the write is
+        already done, `fn` gets called immediately.
+        """
+        with self._lock:
+            if not self._done:
+                self._callbacks.append(fn)
+                return
+        fn(self._exception)
+
+    def set_done(self, exception: BaseException | None):
+        with self._lock:
+            self._done = True
+            self._exception = exception
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn(exception)
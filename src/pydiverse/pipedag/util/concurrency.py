@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import contextvars
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_concurrently(
+    fns: list[Callable[[], None]],
+    max_workers: int,
+    thread_name_prefix: str = "pipedag",
+):
+    """Call functions on a thread pool and wait until all of them are done
+
+    Every function gets called in a copy of the current :py:mod:`contextvars`
+    context. This way, they have access to the config, run and task context.
+    If a function raises an exception, the functions that haven't started yet
+    get cancelled and the exception gets raised once the running ones finished.
+
+    :param fns: The functions to call.
+    :param max_workers: Maximum number of functions that run at the same time.
+        With a value of 1 (or only a single function), the functions get called
+        in the current thread.
+    """
+    max_workers = min(len(fns), max_workers)
+    if max_workers <= 1:
+        for fn in fns:
+            fn()
+        return
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix=thread_name_prefix
+    ) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, fn) for fn in fns]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
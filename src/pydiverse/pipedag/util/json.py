@@ -49,6 +49,10 @@ def json_default(o):
             ] = (
                 o.assumed_dependencies
             )  # [json_default(t) for t in o.assumed_dependencies]
+        if o.fingerprint is not None:
+            kwargs["fingerprint"] = o.fingerprint
+        if o.materialization not in (None, "table"):
+            kwargs["materialization"] = o.materialization
         return {
             TYPE_KEY: Type.TABLE,
             "stage": o.stage.name if o.stage is not None else None,
@@ -136,12 +140,14 @@ def json_object_hook(d: dict):
             primary_key=d["primary_key"],
             indexes=d["indexes"],
             materialization_details=d.get("materialization_details"),
+            materialization=d.get("materialization"),
         )
         tbl.stage = get_stage(d["stage"])
         tbl.cache_key = d["cache_key"]
         tbl.external_schema = d.get("external_schema")
         tbl.shared_lock_allowed = d.get("shared_lock_allowed", True)
         tbl.assumed_dependencies = d.get("assumed_dependencies")
+        tbl.fingerprint = d.get("fingerprint")
         return tbl
     if type_ == Type.RAW_SQL:
         raw_sql = RawSql(name=d["name"])
@@ -34,6 +34,7 @@ INSTANCE_MARKS = {
     "local_table_store": pytest.mark.postgres,
     # Orchestration Instances
     "dask_engine": [pytest.mark.dask, pytest.mark.postgres],
+    "thread_pool_engine": pytest.mark.postgres,
     "prefect_engine": [pytest.mark.prefect, pytest.mark.postgres],
 }
 
@@ -47,6 +48,7 @@ DATABASE_INSTANCES = (
 
 ORCHESTRATION_INSTANCES = (
     "dask_engine",
+    "thread_pool_engine",
     "prefect_engine",
 )
 
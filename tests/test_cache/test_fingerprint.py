@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+import sqlalchemy as sa
+
+from pydiverse.pipedag import ConfigContext, Flow, Stage, Table, materialize
+from pydiverse.pipedag.context import FinalTaskState, StageLockContext
+from pydiverse.pipedag.core import PlannedTaskState
+from tests.fixtures.instances import DATABASE_INSTANCES, skip_instances, with_instances
+from tests.util import tasks_library as m
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+
+def get_flow(version: str, values: list[int], output_type: str):
+    @materialize(version=version, fingerprint=True)
+    def source():
+        df = pd.DataFrame({"x": values})
+        if output_type == "polars":
+            return Table(pl.from_pandas(df), "fingerprint_source")
+        return Table(df, "fingerprint_source")
+
+    @materialize(version=version, input_type=sa.Table, fingerprint=True)
+    def sql_source(tbl: sa.Alias):
+        return Table(sa.select(tbl), "fingerprint_sql_source")
+
+    with Flow("flow") as f:
+        with Stage("fingerprint"):
+            src = source()
+            if output_type == "sql":
+                src = sql_source(m.noop(src))
+            child = m.noop(src)
+
+    return f, src, child
+
+
+@with_instances(DATABASE_INSTANCES)
+@pytest.mark.parametrize(
+    "output_type",
+    [
+        "pandas",
+        pytest.param("polars", marks=pytest.mark.polars),
+        pytest.param("sql", marks=skip_instances("mssql", "ibm_db2")),
+    ],
+)
+def test_fingerprint_early_cutoff(output_type):
+    f, src, child = get_flow("1.0", [1, 2, 3], output_type)
+    result = f.run()
+    assert result.successful
+    cache_key = result.task_values[src].cache_key
+
+    # Same content -> the table keeps its cache key and downstream tasks stay valid
+    f, src, child = get_flow("2.0", [3, 2, 1], output_type)
+    assert f.plan().task_states[child] == PlannedTaskState.UNKNOWN
+    result = f.run()
+    assert result.task_states[src] == FinalTaskState.COMPLETED
+    assert result.task_states[child] == FinalTaskState.CACHE_VALID
+    assert result.task_values[src].cache_key == cache_key
+    assert result.task_values[src].fingerprint is not None
+
+    # Different content -> downstream tasks get invalidated
+    f, src, child = get_flow("3.0", [1, 2, 4], output_type)
+    with StageLockContext():
+        result = f.run()
+        assert result.task_states[child] == FinalTaskState.COMPLETED
+        assert result.task_values[src].cache_key != cache_key
+        df = result.get(child, as_type=pd.DataFrame)
+        assert sorted(df["x"]) == [1, 2, 4]
+
+
+@with_instances("local_table_cache_inout")
+def test_fingerprint_local_table_cache():
+    f, src, _ = get_flow("1.0", [1, 2, 3], "pandas")
+    assert f.run().successful
+
+    # The local table cache must store the table under its final cache key
+    f, src, _ = get_flow("2.0", [3, 2, 1], "pandas")
+    result = f.run()
+    assert result.successful
+    local_table_cache = ConfigContext.get().store.local_table_cache
+    assert local_table_cache._has_table(result.task_values[src], pd.DataFrame)
+
+
+def test_fingerprint_lazy():
+    with pytest.raises(ValueError):
+
+        @materialize(lazy=True, fingerprint=True)
+        def task():
+            return Table(pd.DataFrame({"x": [1]}))
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from pydiverse.pipedag import ConfigContext, Flow, Stage
+from pydiverse.pipedag.context import FinalTaskState
+from pydiverse.pipedag.context.context import CacheValidationMode
+from pydiverse.pipedag.materialize.metadata import (
+    LazyTableMetadata,
+    StageMetadataIndex,
+)
+from tests.fixtures.instances import DATABASE_INSTANCES, with_instances
+from tests.util import tasks_library as m
+
+
+def count_metadata_statements(table_store, metadata_table: sa.Table):
+    """Count all SELECT and INSERT statements on the given metadata table"""
+    counter = {"count": 0}
+
+    def before_execute(conn, clauseelement, multiparams, params, execution_options):
+        if isinstance(clauseelement, sa.Select):
+            if metadata_table in clauseelement.get_final_froms():
+                counter["count"] += 1
+        elif isinstance(clauseelement, sa.Insert):
+            if clauseelement.table is metadata_table:
+                counter["inserts"] = counter.get("inserts", 0) + 1
+
+    sa.event.listen(table_store.engine, "before_execute", before_execute)
+    return counter, lambda: sa.event.remove(
+        table_store.engine, "before_execute", before_execute
+    )
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_metadata_prefetched_per_stage():
+    with Flow("flow") as f:
+        with Stage("metadata_index_1"):
+            x = m.simple_dataframe()
+            tables = [m.noop(x)]
+            for _ in range(4):
+                tables.append(m.noop(tables[-1]))
+            lazy = [m.noop_lazy(t) for t in tables]
+        with Stage("metadata_index_2"):
+            tables_2 = [m.noop_sql(t) for t in lazy]
+
+    assert f.run().successful
+
+    table_store = ConfigContext.get().store.table_store
+    counter, remove = count_metadata_statements(table_store, table_store.tasks_table)
+    lazy_counter, lazy_remove = count_metadata_statements(
+        table_store, table_store.lazy_cache_table
+    )
+    try:
+        result = f.run()
+    finally:
+        remove()
+        lazy_remove()
+
+    assert result.successful
+    for task in [x, *tables, *tables_2]:
+        assert result.task_states[task] == FinalTaskState.CACHE_VALID
+
+    # One query per stage instead of one query per task
+    assert counter["count"] == 2
+    assert lazy_counter["count"] == 2
+
+    # The index gets dropped when the stage gets committed
+    assert table_store._stage_metadata_index == {}
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_metadata_written_in_batches():
+    with Flow("flow") as f:
+        with Stage("metadata_buffer"):
+            tables = [m.simple_dataframe()]
+            for _ in range(9):
+                tables.append(m.noop(tables[-1]))
+
+    table_store = ConfigContext.get().store.table_store
+    counter, remove = count_metadata_statements(table_store, table_store.tasks_table)
+    try:
+        result = f.run(cache_validation_mode=CacheValidationMode.FORCE_CACHE_INVALID)
+    finally:
+        remove()
+
+    assert result.successful
+    assert table_store._metadata_buffer == {}
+
+    # All task metadata of the stage gets written with one statement
+    assert counter["inserts"] == 1
+    for task in tables:
+        assert len(table_store.retrieve_all_task_metadata(task)) >= 1
+
+
+def test_stage_metadata_index():
+    index = StageMetadataIndex.from_metadata(
+        [],
+        [
+            LazyTableMetadata("a", "stage", "query_1", "task_1"),
+            LazyTableMetadata("b", "stage", "query_1", "task_2"),
+        ],
+        [],
+    )
+
+    assert index.get_lazy_table_metadata("query_1", "task_2")[0].name == "b"
+    assert index.get_lazy_table_metadata("query_1", "task_3") == []
+    assert index.get_lazy_table_metadata("query_2", "task_1") == []
+    assert index.get_task_metadata("a", None, "input", "cache_fn") == []
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_metadata_migration():
+    table_store = ConfigContext.get().store.table_store
+    table_store.setup()
+    schema = table_store.metadata_schema.get()
+
+    def set_version(version: str):
+        with table_store.engine_connect() as conn:
+            conn.execute(table_store.version_table.update().values(version=version))
+
+    # Downgrade metadata tables to version 0.3.2
+    with table_store.engine_connect() as conn:
+        for index in table_store.metadata_indexes:
+            if index.table is not table_store.task_durations_table:
+                index.drop(conn)
+        table_store.task_durations_table.drop(conn)
+    set_version("0.3.2")
+
+    table_store.setup()
+    assert not table_store.disable_caching
+    with table_store.engine_connect() as conn:
+        version = conn.execute(sa.select(table_store.version_table.c.version)).scalar()
+        assert version == table_store.metadata_version
+        assert sa.inspect(conn).has_table("task_durations", schema=schema)
+
+    # Caching still works after the migration
+    with Flow("flow") as f:
+        with Stage("metadata_migration"):
+            x = m.simple_dataframe()
+    assert f.run().successful
+    assert f.run().task_states[x] == FinalTaskState.CACHE_VALID
+
+    # Versions without a migration path disable caching
+    set_version("0.0.1")
+    try:
+        table_store.setup()
+        assert table_store.disable_caching
+    finally:
+        set_version(table_store.metadata_version)
+        table_store.disable_caching = False
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import pandas as pd
+
+from pydiverse.pipedag import ConfigContext, Flow, Stage, Table, materialize
+from pydiverse.pipedag.context import FinalTaskState, StageLockContext
+from tests.fixtures.instances import DATABASE_INSTANCES, with_instances
+from tests.util import tasks_library as m
+
+
+def get_flow(source_version: str):
+    @materialize(version=source_version)
+    def source():
+        return Table(pd.DataFrame({"x": [1, 2, 3]}), "source")
+
+    with Flow("flow") as f:
+        with Stage("skip_stage_1") as s1:
+            src = source()
+            a = m.noop(src)
+        with Stage("skip_stage_2") as s2:
+            b = m.noop(a)
+            lazy = m.noop_lazy(b)
+
+    return f, s1, s2, (src, a, b, lazy)
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_skip_cache_valid_stages(mocker):
+    f, s1, s2, (src, a, b, lazy) = get_flow("1.0")
+    assert f.run().successful
+
+    table_store = ConfigContext.get().store.table_store
+    config = ConfigContext.get().evolve(
+        cache_validation={"skip_cache_valid_stages": True}
+    )
+    init_spy = mocker.spy(table_store, "init_stage")
+    commit_spy = mocker.spy(table_store, "commit_stage")
+
+    with config, StageLockContext():
+        result = f.run()
+        assert result.successful
+        for task in (src, a, b):
+            assert result.task_states[task] == FinalTaskState.CACHE_VALID
+
+        # Only the stage with a lazy task gets initialized and committed
+        assert [call.args[0] for call in init_spy.call_args_list] == [s2]
+        assert [call.args[0] for call in commit_spy.call_args_list] == [s2]
+
+        # Tables of skipped stages get read from the committed schema
+        assert result.get(a, as_type=pd.DataFrame)["x"].tolist() == [1, 2, 3]
+        assert result.get(lazy, as_type=pd.DataFrame)["x"].tolist() == [1, 2, 3]
+
+    # Changing a task invalidates the stage again
+    init_spy.reset_mock()
+    f, s1, s2, (src, a, b, lazy) = get_flow("2.0")
+    with config:
+        result = f.run()
+    assert result.task_states[src] == FinalTaskState.COMPLETED
+    assert {call.args[0] for call in init_spy.call_args_list} == {s1, s2}
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_skip_cache_valid_stages_missing_table(mocker):
+    f, s1, s2, (src, a, b, lazy) = get_flow("1.0")
+    assert f.run().successful
+
+    table_store = ConfigContext.get().store.table_store
+    assert table_store.has_committed_tables(s1, ["source"])
+    assert not table_store.has_committed_tables(s1, ["source", "does_not_exist"])
+
+    # Stages with missing tables in the committed schema don't get skipped
+    config = ConfigContext.get().evolve(
+        cache_validation={"skip_cache_valid_stages": True}
+    )
+    mocker.patch.object(table_store, "has_committed_tables", return_value=False)
+    init_spy = mocker.spy(table_store, "init_stage")
+    with config:
+        assert f.run().successful
+    assert {call.args[0] for call in init_spy.call_args_list} == {s1, s2}
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_skip_cache_valid_stages_cache_function_called_once():
+    cache_fn_calls = []
+
+    def cache_fn():
+        cache_fn_calls.append(1)
+        return "cache"
+
+    @materialize(version="1.0", cache=cache_fn)
+    def with_cache_fn():
+        return Table(pd.DataFrame({"x": [1]}), "with_cache_fn")
+
+    with Flow("flow") as f:
+        with Stage("skip_stage_cache_fn"):
+            m.noop_lazy(with_cache_fn())
+
+    config = ConfigContext.get().evolve(
+        cache_validation={"skip_cache_valid_stages": True}
+    )
+    with config:
+        assert f.run().successful
+        cache_fn_calls.clear()
+        assert f.run().successful
+    assert len(cache_fn_calls) == 1
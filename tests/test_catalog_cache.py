@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from pydiverse.pipedag import ConfigContext, Flow, Stage
+from pydiverse.pipedag.backend.table.sql.catalog import CatalogCache, get_ddl_schemas
+from pydiverse.pipedag.backend.table.sql.ddl import (
+    CreateTableAsSelect,
+    DropTable,
+    RenameSchema,
+)
+from pydiverse.pipedag.container import Schema
+from tests.fixtures.instances import DATABASE_INSTANCES, with_instances
+from tests.util import tasks_library as m
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_tables_reflected_once_per_schema(mocker):
+    with Flow("flow") as f:
+        with Stage("catalog_cache_1"):
+            tables = [m.simple_dataframe() for _ in range(4)]
+        with Stage("catalog_cache_2"):
+            for t in tables:
+                m.noop_lazy(t)
+
+    table_store = ConfigContext.get().store.table_store
+    reflect_schema = mocker.spy(table_store, "_reflect_tables_in_schema")
+    reflect_table = mocker.spy(table_store, "_reflect_table")
+
+    for _ in range(2):
+        reflect_schema.reset_mock()
+        reflect_table.reset_mock()
+
+        assert f.run().successful
+        schemas = [call.args[0] for call in reflect_schema.call_args_list]
+        assert schemas == [table_store.get_schema("catalog_cache_1").get()]
+        assert reflect_table.call_count == 0
+
+
+def test_catalog_cache_invalidation():
+    states = {"schema": False}
+    catalog = CatalogCache("run_id", states.get)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return ["a", "b"]
+
+    assert catalog.get_names("Schema", load) == {"a", "b"}
+    assert catalog.get_names("schema", load) == {"a", "b"}
+    assert len(loads) == 1
+
+    catalog.invalidate(Schema("other"))
+    catalog.get_names("schema", load)
+    assert len(loads) == 1
+
+    catalog.invalidate(Schema("schema"))
+    catalog.get_names("schema", load)
+    assert len(loads) == 2
+
+    catalog.invalidate()
+    catalog.get_names("schema", load)
+    assert len(loads) == 3
+
+    # Entries get reloaded when the state of their schema changes, e.g. when
+    # another process committed the stage
+    states["schema"] = True
+    catalog.get_names("schema", load)
+    catalog.get_names("schema", load)
+    assert len(loads) == 4
+
+
+def test_ddl_schemas():
+    a, b = Schema("a"), Schema("b")
+    assert get_ddl_schemas(DropTable("t", a)) == [a]
+    assert get_ddl_schemas(RenameSchema(a, b, None)) == [a, b]
+    assert get_ddl_schemas(CreateTableAsSelect("t", b, sa.select(1))) == [b]
+
+    table = sa.Table("t", sa.MetaData(), sa.Column("x", sa.Integer), schema="c")
+    assert get_ddl_schemas(sa.schema.CreateTable(table)) == ["c"]
+    assert get_ddl_schemas(sa.schema.CreateIndex(sa.Index("i", table.c.x))) == ["c"]
+    assert get_ddl_schemas(sa.DDL("DROP TABLE t")) is None
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_textual_sql_invalidates_catalog():
+    table_store = ConfigContext.get().store.table_store
+    catalog = CatalogCache("run_id", lambda schema: False)
+    catalog.get_names("schema", lambda: ["a"])
+
+    table_store._catalog, previous = catalog, table_store._catalog
+    try:
+        # Textual SQL might modify any schema
+        table_store._invalidate_catalog_for(sa.text("DROP TABLE schema.a"))
+        table_store._invalidate_catalog_for("DROP TABLE schema.a")
+    finally:
+        table_store._catalog = previous
+    assert catalog.get_names("schema", lambda: []) == frozenset()
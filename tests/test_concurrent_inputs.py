@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pandas as pd
+
+from pydiverse.pipedag import Blob, ConfigContext, Flow, Stage, Table, materialize
+from pydiverse.pipedag.backend.table.sql.ddl import (
+    CreateSchema,
+    CreateTableAsSelect,
+    DropTable,
+)
+from pydiverse.pipedag.container import ExternalTableReference, Schema
+from pydiverse.pipedag.context import StageLockContext
+from pydiverse.pipedag.context.trace_hook import TraceHook
+from tests.fixtures.instances import DATABASE_INSTANCES, with_instances
+from tests.util.sql import sql_table_expr
+
+pytestmark = [with_instances(DATABASE_INSTANCES)]
+
+
+class InputTraceHook(TraceHook):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+
+    def input_pre_dematerialize(self, task, item):
+        with self.lock:
+            self.events.append(("pre", task.name, item.name))
+
+    def input_post_dematerialize(self, task, item):
+        with self.lock:
+            self.events.append(("post", task.name, item.name))
+
+
+@materialize(nout=4, version="1.0")
+def tables():
+    return tuple(Table(pd.DataFrame({"x": [i, i + 1]}), f"input_{i}") for i in range(4))
+
+
+@materialize(version="1.0")
+def blob():
+    return Blob({"a": 1}, "blob")
+
+
+def test_inputs_fetched_concurrently(mocker):
+    @materialize(input_type=pd.DataFrame)
+    def combine(a, b, others: dict, blob_):
+        assert blob_ == {"a": 1}
+        # An input passed several times is fetched once, but every
+        # occurrence gets its own object
+        assert a is not others["e"]
+        assert a.equals(others["e"])
+        others["e"]["x"] = -1
+        assert a["x"].tolist() == [0, 1]
+        dfs = [a, b, *others.values()]
+        return [df["x"].tolist() for df in dfs]
+
+    with Flow() as f:
+        with Stage("concurrent_inputs"):
+            t = tables()
+            out = combine(t[0], t[1], {"c": t[2], "d": t[3], "e": t[0]}, blob())
+
+    table_store = ConfigContext.get().store.table_store
+    retrieve = table_store.retrieve_table_obj
+    running = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def slow_retrieve(*args, **kwargs):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.2)
+        try:
+            return retrieve(*args, **kwargs)
+        finally:
+            with lock:
+                running["now"] -= 1
+
+    mocker.patch.object(table_store, "retrieve_table_obj", side_effect=slow_retrieve)
+    trace_hook = InputTraceHook()
+    with StageLockContext():
+        result = f.run(trace_hook=trace_hook)
+        assert result.successful
+        assert result.get(out) == [[0, 1], [1, 2], [2, 3], [3, 4], [-1, -1]]
+    assert running["max"] > 1
+
+    # Each input gets fetched once, even if it is passed more than once
+    events = [e for e in trace_hook.events if e[1] == "combine"]
+    for kind in ("pre", "post"):
+        names = sorted(name for k, _, name in events if k == kind)
+        assert names == ["blob", "input_0", "input_1", "input_2", "input_3"]
+
+
+def test_external_tables_in_different_schemas():
+    @materialize
+    def external_table(schema_name: str, value: int):
+        table_store = ConfigContext.get().store.table_store
+        schema = Schema(schema_name, prefix="", suffix="")
+        table_store.execute(CreateSchema(schema, if_not_exists=True))
+        table_store.execute(DropTable("x", schema, if_exists=True))
+        query = sql_table_expr({"x": [value]})
+        table_store.execute(CreateTableAsSelect("x", schema, query))
+        return Table(ExternalTableReference("x", schema=schema.get()))
+
+    @materialize(input_type=pd.DataFrame)
+    def combine(a, b):
+        return [a["x"].tolist(), b["x"].tolist()]
+
+    with Flow() as f:
+        with Stage("external_inputs"):
+            a = external_table("ext_input_a", 1)
+            b = external_table("ext_input_b", 2)
+            out = combine(a, b)
+
+    with StageLockContext():
+        result = f.run()
+        assert result.successful
+        assert result.get(out) == [[1], [2]]
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import threading
+
+import pandas as pd
+import sqlalchemy as sa
+
+from pydiverse.pipedag import Blob, ConfigContext, Flow, Stage, Table, materialize
+from pydiverse.pipedag.context import StageLockContext
+from tests.fixtures.instances import DATABASE_INSTANCES, with_instances
+
+pytestmark = [with_instances(DATABASE_INSTANCES)]
+
+
+def make_tables(n: int):
+    return [
+        Table(
+            pd.DataFrame({"id": [i, i + 1], "x": ["a", "b"]}),
+            f"output_{i}",
+            primary_key="id",
+            indexes=[["x"]],
+        )
+        for i in range(n)
+    ]
+
+
+def record_events(mocker, table_store):
+    events = []
+    threads = set()
+    lock = threading.Lock()
+    store_table = table_store.store_table
+    add_indexes = table_store._add_indexes_and_set_nullable
+
+    def record_store_table(table, task):
+        store_table(table, task)
+        with lock:
+            events.append(("store", table.name))
+            threads.add(threading.current_thread().name)
+
+    def record_add_indexes(table, *args, **kwargs):
+        add_indexes(table, *args, **kwargs)
+        if not kwargs.get("on_empty_table"):
+            with lock:
+                events.append(("ddl", table.name))
+
+    mocker.patch.object(table_store, "store_table", side_effect=record_store_table)
+    mocker.patch.object(
+        table_store,
+        "_add_indexes_and_set_nullable",
+        side_effect=record_add_indexes,
+    )
+    return events, threads
+
+
+def test_outputs_stored_concurrently(mocker):
+    @materialize(nout=2)
+    def outputs():
+        return make_tables(8), Blob({"a": 1}, "blob")
+
+    @materialize(input_type=sa.Table, lazy=True)
+    def first(tables):
+        return Table(sa.select(tables[0].c.id).select_from(tables[0]), "first")
+
+    with Flow() as f:
+        with Stage("concurrent_outputs"):
+            tables, blob = outputs()
+            out = first(tables)
+
+    table_store = ConfigContext.get().store.table_store
+    events, threads = record_events(mocker, table_store)
+
+    with StageLockContext():
+        result = f.run()
+        assert result.successful
+        assert result.get(blob) == {"a": 1}
+        for i, df in enumerate(result.get(tables, as_type=pd.DataFrame)):
+            assert df["id"].tolist() == [i, i + 1]
+        assert result.get(out, as_type=pd.DataFrame)["id"].tolist() == [0, 1]
+
+    output_events = [e for e in events if e[1].startswith("output_")]
+    kinds = [kind for kind, _ in output_events]
+    assert kinds == ["store"] * 8 + ["ddl"] * 8
+    assert len(threads) > 1
+
+
+def test_failed_output_rolls_back(mocker):
+    @materialize()
+    def outputs():
+        # Adding the primary key fails after all tables have been written
+        bad = Table(pd.DataFrame({"id": [1, 1]}), "output_bad", primary_key="id")
+        return [*make_tables(3), bad]
+
+    with Flow() as f:
+        with Stage("concurrent_outputs_fail"):
+            outputs()
+
+    table_store = ConfigContext.get().store.table_store
+    delete = mocker.spy(table_store, "delete_table_from_transaction")
+
+    assert not f.run(fail_fast=False).successful
+
+    deleted = sorted(call.args[0].name for call in delete.call_args_list)
+    assert deleted == ["output_0", "output_1", "output_2", "output_bad"]
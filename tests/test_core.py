@@ -291,6 +291,27 @@ class TestDAGConstruction:
         assert set(sf.get_parent_tasks(t10)) == set()
         assert set(sf.get_parent_tasks(t12)) == {t10}
 
+    def test_critical_path_lengths(self):
+        with Flow("f") as f:
+            with Stage("stage_0") as s0:
+                t00 = t("00")(0)
+                t01 = t("01")(t00)
+                t02 = t("02")(t00)
+                t03 = t("03")(t01, t02)
+
+        durations = {t00: 1.0, t01: 5.0, t02: 2.0, t03: 3.0}
+        lengths = f.get_subflow().get_critical_path_lengths(durations)
+
+        assert lengths[s0.commit_task] == 0.0
+        assert lengths[t03] == 3.0
+        assert lengths[t01] == 8.0
+        assert lengths[t02] == 5.0
+        assert lengths[t00] == 9.0
+
+        # Only tasks in the subflow are considered
+        lengths = f.get_subflow(t01, t02).get_critical_path_lengths(durations)
+        assert lengths == {t01: 5.0, t02: 2.0}
+
 
 class TestDAGConstructionExceptions:
     def test_duplicate_stage_name(self):
@@ -53,3 +53,11 @@ def test_dask_structlog_configuration_does_not_prevent_pickling():
     }
 
     dask.compute(results, **kw)
+
+
+def test_dask_engine_only_uses_priorities_with_distributed_scheduler():
+    from pydiverse.pipedag.engine.dask import DaskEngine
+
+    assert not DaskEngine()._uses_priorities()
+    assert not DaskEngine(scheduler="threads")._uses_priorities()
+    assert DaskEngine(scheduler=object())._uses_priorities()
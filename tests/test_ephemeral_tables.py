@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+import sqlalchemy as sa
+
+from pydiverse.pipedag import ConfigContext, Flow, Stage, Table, materialize
+from pydiverse.pipedag.context import FinalTaskState, StageLockContext
+from pydiverse.pipedag.context.context import CacheValidationMode
+from tests.fixtures.instances import DATABASE_INSTANCES, with_instances
+
+pytestmark = [with_instances(DATABASE_INSTANCES)]
+
+
+@pytest.fixture
+def table_store():
+    table_store = ConfigContext.get().store.table_store
+    table_store.ephemeral_lazy_tables = True
+    try:
+        yield table_store
+    finally:
+        table_store.ephemeral_lazy_tables = False
+
+
+@materialize(version="1.0")
+def numbers():
+    return Table(pd.DataFrame({"x": [1, 2, 3]}), "numbers")
+
+
+@materialize(lazy=True, input_type=sa.Table)
+def doubled(tbl: sa.Alias, name: str):
+    return Table(sa.select((tbl.c.x * 2).label("x")).select_from(tbl), name)
+
+
+@materialize(lazy=True, input_type=sa.Table)
+def total(tbl: sa.Alias):
+    return sa.select(sa.func.sum(tbl.c.x).label("x")).select_from(tbl)
+
+
+def has_table(table_store, stage: str, name: str) -> bool:
+    schema = table_store.get_schema(stage).get()
+    return name in sa.inspect(table_store.engine).get_view_names(schema) or sa.inspect(
+        table_store.engine
+    ).has_table(name, schema=schema)
+
+
+def test_inline_single_consumer(table_store, mocker):
+    @materialize(input_type=pd.DataFrame, version="1.0")
+    def download(df: pd.DataFrame):
+        return df["x"].tolist()
+
+    with Flow() as f:
+        with Stage("ephemeral"):
+            n = numbers()
+            # Single lazy consumer -> inlined (also when chained)
+            first = doubled(n, "inlined_1")
+            inlined = doubled(first, "inlined_2")
+            out = total(inlined)
+            # Two consumers -> stored
+            shared = doubled(n, "shared")
+            out_shared = total(shared)
+            downloaded = download(shared)
+
+    register = mocker.spy(table_store, "_register_ephemeral_table")
+    commits = [
+        mocker.spy(table_store, "_commit_stage_schema_swap"),
+        mocker.spy(table_store, "_commit_stage_read_views"),
+    ]
+    # With an unchanged query, inlined tables are cache valid. They are inlined
+    # again in the second run instead of being copied from the cache.
+    for mode in [CacheValidationMode.FORCE_CACHE_INVALID, None]:
+        with StageLockContext():
+            result = f.run(cache_validation_mode=mode)
+            assert result.successful
+            assert result.get(out, as_type=pd.DataFrame)["x"].tolist() == [24]
+            assert result.get(out_shared, as_type=pd.DataFrame)["x"].tolist() == [12]
+            assert result.get(downloaded) == [2, 4, 6]
+
+    for task in [n, first, inlined, out, shared, out_shared, downloaded]:
+        assert result.task_states[task] == FinalTaskState.CACHE_VALID, task
+    # The stage only changed in the first run
+    assert sum(commit.call_count for commit in commits) == 1
+
+    registered = [c.args[0].name for c in register.call_args_list]
+    assert registered == ["inlined_1", "inlined_2"] * 2
+    assert not has_table(table_store, "ephemeral", "inlined_1")
+    assert not has_table(table_store, "ephemeral", "inlined_2")
+    assert has_table(table_store, "ephemeral", "shared")
+    assert not table_store._ephemeral_tables
+
+
+def test_stored_if_consumer_not_run(table_store, mocker):
+    with Flow() as f:
+        with Stage("ephemeral_subflow"):
+            n = numbers()
+            tbl = doubled(n, "not_consumed")
+            total(tbl)
+
+    register = mocker.spy(table_store, "_register_ephemeral_table")
+    store = mocker.spy(table_store, "store_table")
+    with StageLockContext():
+        result = f.run(n, tbl)
+        assert result.successful
+
+    # Neither the consumer nor the stage commit run
+    assert register.call_count == 0
+    assert "not_consumed" in [c.args[0].name for c in store.call_args_list]
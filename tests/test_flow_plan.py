@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import pandas as pd
+
+from pydiverse.pipedag import ConfigContext, Flow, Stage, Table, materialize
+from pydiverse.pipedag.backend.table.base import BaseTableStore
+from pydiverse.pipedag.context import FinalTaskState
+from pydiverse.pipedag.context.context import CacheValidationMode
+from pydiverse.pipedag.core import PlannedTaskState
+from tests.fixtures.instances import DATABASE_INSTANCES, with_instances
+from tests.util import tasks_library as m
+
+
+def get_flow(source_version: str):
+    @materialize(version=source_version)
+    def source():
+        return Table(pd.DataFrame({"x": [1, 2, 3]}))
+
+    with Flow("flow") as f:
+        with Stage("plan_stage_1") as s1:
+            src = source()
+            a = m.noop(src)
+        with Stage("plan_stage_2") as s2:
+            b = m.noop(a)
+            lazy = m.noop_lazy(a)
+            c = m.noop_sql(lazy)
+
+    return f, s1, s2, (src, a, b, lazy, c)
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_plan_cache_valid():
+    f, s1, s2, (src, a, b, lazy, c) = get_flow("1.0")
+    assert f.run().successful
+
+    plan = f.plan()
+    assert plan.task_states == {
+        src: PlannedTaskState.CACHE_VALID,
+        a: PlannedTaskState.CACHE_VALID,
+        b: PlannedTaskState.CACHE_VALID,
+        lazy: PlannedTaskState.LAZY,
+        c: PlannedTaskState.CACHE_VALID,
+    }
+    assert plan.lazy_dependent_tasks == {c}
+    assert plan.tasks_to_run == [lazy]
+    assert plan.is_stage_cache_valid(s1)
+    assert not plan.is_stage_cache_valid(s2)
+    assert plan.stages_to_run == [s2]
+
+    # The plan must agree with what actually happens
+    result = f.run()
+    for task, state in plan.task_states.items():
+        if state == PlannedTaskState.CACHE_VALID:
+            assert result.task_states[task] == FinalTaskState.CACHE_VALID
+
+    # The cached outputs are available before running the flow
+    assert plan.task_values[a].cache_key == result.task_values[a].cache_key
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_plan_cache_invalid():
+    f, s1, s2, _ = get_flow("1.0")
+    assert f.run().successful
+
+    f, s1, s2, (src, a, b, lazy, c) = get_flow("2.0")
+    plan = f.plan()
+    assert plan.task_states == {
+        src: PlannedTaskState.CACHE_INVALID,
+        a: PlannedTaskState.CACHE_INVALID,
+        b: PlannedTaskState.CACHE_INVALID,
+        lazy: PlannedTaskState.LAZY,
+        c: PlannedTaskState.UNKNOWN,
+    }
+    assert set(plan.stages_to_run) == {s1, s2}
+
+    result = f.run()
+    for task in (src, a, b):
+        assert result.task_states[task] == FinalTaskState.COMPLETED
+
+    # Forcing execution invalidates all tasks
+    plan = f.plan(cache_validation_mode=CacheValidationMode.FORCE_CACHE_INVALID)
+    assert plan.task_states[src] == PlannedTaskState.CACHE_INVALID
+
+    plan = f.plan()
+    assert plan.task_states[src] == PlannedTaskState.CACHE_VALID
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_plan_subflow():
+    f, s1, s2, (src, a, b, lazy, c) = get_flow("1.0")
+    assert f.run().successful
+
+    # Inputs from outside the subflow get loaded from the cache
+    plan = f.plan(s2)
+    assert set(plan.task_states) == {b, lazy, c}
+    assert plan.task_states[b] == PlannedTaskState.CACHE_VALID
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_plan_without_stage_metadata(mocker):
+    f, s1, s2, (src, a, b, lazy, c) = get_flow("1.0")
+    assert f.run().successful
+
+    # Table stores that don't implement the lookup predict all tasks to run
+    table_store = ConfigContext.get().store.table_store
+    mocker.patch.object(
+        type(table_store),
+        "retrieve_stage_task_metadata",
+        BaseTableStore.retrieve_stage_task_metadata,
+    )
+    plan = f.plan()
+    for task in (src, a, b):
+        assert plan.task_states[task] == PlannedTaskState.CACHE_INVALID
+    assert set(plan.stages_to_run) == {s1, s2}
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import pandas as pd
+
+from pydiverse.pipedag import ConfigContext, Flow, Stage, Table, materialize
+from pydiverse.pipedag.backend.table.sql.hooks import PandasTableHook
+from pydiverse.pipedag.backend.table.util import DType
+from pydiverse.pipedag.context import StageLockContext
+from pydiverse.pipedag.materialize.handoff import HandoffCache
+from tests.fixtures.instances import DATABASE_INSTANCES, with_instances
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+
+@materialize()
+def numbers():
+    return Table(pd.DataFrame({"x": [1, 2, 3]}), "numbers")
+
+
+@materialize(input_type=pd.DataFrame)
+def total(df):
+    df["x"] = df["x"] * 2  # Consumers get their own copy
+    return int(df["x"].sum())
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_handoff_to_consumers(mocker):
+    @materialize(input_type=pd.DataFrame)
+    def check_released(*totals):
+        handoff_cache = ConfigContext.get().store._handoff_cache
+        assert not any(key[2] == "numbers" for key in handoff_cache._entries)
+        return list(totals)
+
+    with Flow() as f:
+        with Stage("handoff_cache"):
+            n = numbers()
+            out = check_released(total(n), total(n))
+
+    table_store = ConfigContext.get().store.table_store
+    retrieve = mocker.spy(table_store, "retrieve_table_obj")
+
+    with ConfigContext.get().evolve(handoff_cache={"enabled": True}):
+        with StageLockContext():
+            result = f.run()
+            assert result.successful
+            assert result.get(out) == [12, 12]
+
+    assert retrieve.call_count == 0
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_handoff_cache_eviction():
+    with Flow():
+        with Stage("handoff_cache") as stage:
+            producers = [numbers() for _ in range(3)]
+            consumers = [total(producer) for producer in producers]
+
+    def table(name):
+        t = Table(pd.DataFrame({"x": range(100)}), name)
+        t.stage = stage
+        t.cache_key = "cache_key"
+        return t
+
+    tables = [table(f"t{i}") for i in range(3)]
+    nbytes = int(tables[0].obj.memory_usage(deep=True).sum())
+    table_store = ConfigContext.get().store.table_store
+    cache = HandoffCache(max_bytes=2 * nbytes, table_store=table_store)
+    for producer, t in zip(producers, tables):
+        cache.put("run", producer, [t])
+
+    # The least recently used table gets evicted
+    assert cache.get("run", tables[0], pd.DataFrame) is None
+    handed_over = cache.get("run", tables[1], pd.DataFrame)
+    assert handed_over["x"].tolist() == list(range(100))
+    # Same dtypes as when reading the table from the database
+    backend = PandasTableHook._get_dtype_backend(pd.DataFrame)
+    assert handed_over["x"].dtype == DType.INT64.to_pandas(backend)
+    assert handed_over is not cache.get("run", tables[1], pd.DataFrame)
+    assert cache.get("run", tables[2], pd.DataFrame) is not None
+
+    # Entries are only valid for the same run, type and cache key
+    assert cache.get("other_run", tables[1], pd.DataFrame) is None
+    if pl is not None:
+        assert cache.get("run", tables[1], pl.DataFrame) is None
+    tables[1].cache_key = "other_cache_key"
+    assert cache.get("run", tables[1], pd.DataFrame) is None
+
+    # Entries are dropped after their last consumer
+    cache.release("run", consumers[2])
+    assert cache.get("run", tables[2], pd.DataFrame) is None
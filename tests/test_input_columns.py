@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from pydiverse.pipedag import Flow, Stage, Table, materialize
+from pydiverse.pipedag.context import FinalTaskState, StageLockContext
+
+# Parameterize all tests in this file with several instance_id configurations
+from tests.fixtures.instances import (
+    DATABASE_INSTANCES,
+    with_instances,
+)
+
+pytestmark = [with_instances(DATABASE_INSTANCES, "local_table_cache_inout")]
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+
+@materialize(version="1.0")
+def wide_table():
+    return Table(
+        pd.DataFrame({"a": [1, 2], "b": [3, 4], "c": ["x", "y"], "d": [0.5, 1.5]}),
+        "wide_table",
+    )
+
+
+def test_input_columns_pandas():
+    @materialize(input_type=pd.DataFrame, input_columns=["c", "a"])
+    def projected(df: pd.DataFrame):
+        assert list(df.columns) == ["c", "a"]
+        assert df["a"].tolist() == [1, 2]
+        return len(df)
+
+    @materialize(input_type=pd.DataFrame)
+    def complete(df: pd.DataFrame):
+        assert list(df.columns) == ["a", "b", "c", "d"]
+
+    with Flow() as f:
+        with Stage("input_columns"):
+            t = wide_table()
+            projected(t)
+            complete(t)
+
+    # Second run reads the inputs from the local table cache (if configured)
+    for _ in range(2):
+        assert f.run().successful
+
+
+@pytest.mark.polars
+def test_input_columns_polars():
+    @materialize(input_type=pl.DataFrame, input_columns=["b"])
+    def projected(df: pl.DataFrame):
+        assert df.columns == ["b"]
+
+    with Flow() as f:
+        with Stage("input_columns"):
+            projected(wide_table())
+
+    assert f.run().successful
+
+
+def test_input_columns_per_parameter():
+    @materialize(input_type=pd.DataFrame, input_columns={"x": ["a"]})
+    def projected(x: pd.DataFrame, y: pd.DataFrame):
+        assert list(x.columns) == ["a"]
+        assert list(y.columns) == ["a", "b", "c", "d"]
+
+    with Flow() as f:
+        with Stage("input_columns"):
+            t = wide_table()
+            projected(t, y=t)
+
+    assert f.run().successful
+
+
+def test_input_columns_cache_invalidation():
+    def get_flow(columns):
+        @materialize(version="1.0", input_type=pd.DataFrame, input_columns=columns)
+        def projected(df: pd.DataFrame):
+            return Table(df, "projected")
+
+        with Flow() as f:
+            with Stage("input_columns"):
+                out = projected(wide_table())
+        return f, out
+
+    f, out = get_flow(["a"])
+    assert f.run().successful
+    assert f.run().task_states[out] == FinalTaskState.CACHE_VALID
+
+    # Selecting different columns changes the input hash
+    f, out = get_flow(["a", "b"])
+    with StageLockContext():
+        result = f.run()
+        assert result.task_states[out] == FinalTaskState.COMPLETED
+        assert list(result.get(out, as_type=pd.DataFrame).columns) == ["a", "b"]
+
+
+def test_input_columns_unknown_parameter():
+    with pytest.raises(ValueError, match="parameters of the task"):
+
+        @materialize(input_columns={"y": ["a"]})
+        def task(x):
+            return x
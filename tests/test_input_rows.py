@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import copy
+
+import pandas as pd
+import pytest
+
+from pydiverse.pipedag import Flow, PipedagConfig, Stage, Table, materialize
+from pydiverse.pipedag.backend.table.util.filters import normalize_filters
+from pydiverse.pipedag.context import FinalTaskState, StageLockContext
+
+# Parameterize all tests in this file with several instance_id configurations
+from tests.fixtures.instances import (
+    DATABASE_INSTANCES,
+    with_instances,
+)
+
+pytestmark = [with_instances(DATABASE_INSTANCES, "local_table_cache_inout")]
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+
+@materialize(version="1.0")
+def long_table():
+    return Table(
+        pd.DataFrame({"id": range(1000), "group": [i % 4 for i in range(1000)]}),
+        "long_table",
+        primary_key="id",
+    )
+
+
+def test_input_filter_pandas():
+    @materialize(input_type=pd.DataFrame, input_filter=[("id", "<", 10)])
+    def filtered(df: pd.DataFrame):
+        assert sorted(df["id"].tolist()) == list(range(10))
+
+    @materialize(
+        input_type=pd.DataFrame,
+        input_filter=[[("id", "==", 5)], [("id", ">=", 998), ("group", "in", [3])]],
+    )
+    def disjunction(df: pd.DataFrame):
+        assert sorted(df["id"].tolist()) == [5, 999]
+
+    with Flow() as f:
+        with Stage("input_rows"):
+            t = long_table()
+            filtered(t)
+            disjunction(t)
+
+    # Second run reads the inputs from the local table cache (if configured)
+    for _ in range(2):
+        assert f.run().successful
+
+
+@pytest.mark.polars
+def test_input_filter_and_sample_polars():
+    @materialize(
+        input_type=pl.DataFrame,
+        input_filter={"x": [("group", "!=", 0)]},
+        input_sample={"y": 0.1},
+    )
+    def subset(x: pl.DataFrame, y: pl.DataFrame):
+        assert len(x) == 750
+        assert 0 < len(y) < 500
+
+    with Flow() as f:
+        with Stage("input_rows"):
+            t = long_table()
+            subset(t, t)
+
+    assert f.run().successful
+
+
+def test_input_sample_pandas():
+    @materialize(input_type=pd.DataFrame, input_sample=0.1)
+    def sampled(df: pd.DataFrame):
+        assert 0 < len(df) < 500
+        return df["id"].tolist()
+
+    with Flow() as f:
+        with Stage("input_rows"):
+            out = sampled(long_table())
+
+    with StageLockContext():
+        result = f.run()
+        assert result.successful
+        # The sample is drawn with a fixed seed
+        assert result.get(out) == f.run().get(out)
+
+
+def test_sample_mode(run_with_instance):
+    @materialize(version="1.0", input_type=pd.DataFrame)
+    def count(df: pd.DataFrame):
+        return Table(pd.DataFrame({"n": [len(df)]}), "count")
+
+    @materialize(version="1.0", input_type=pd.DataFrame)
+    def ids(df: pd.DataFrame):
+        return sorted(df["id"].tolist())
+
+    with Flow() as f:
+        with Stage("input_rows"):
+            t = long_table()
+            out = count(t)
+            out_ids = ids(t)
+
+    def get_count(result):
+        return result.get(out, as_type=pd.DataFrame)["n"][0]
+
+    raw_config = copy.deepcopy(PipedagConfig.default.raw_config)
+    raw_config["instances"][run_with_instance]["sample_mode"] = {"max_rows": 5}
+    sample_config = PipedagConfig(raw_config).get(instance=run_with_instance)
+    table_store = sample_config.store.table_store
+    assert table_store.schema_suffix.endswith("_sample")
+
+    with StageLockContext():
+        result = f.run()
+        assert get_count(result) == 1000
+
+    for _ in range(2):
+        with sample_config, StageLockContext():
+            result = f.run()
+            assert get_count(result) == 5
+            # Limited reads are ordered by primary key
+            assert result.get(out_ids) == [0, 1, 2, 3, 4]
+    assert result.task_states[out] == FinalTaskState.CACHE_VALID
+
+    # Sampled runs are written to their own schemas and don't overwrite the
+    # outputs of complete runs
+    with StageLockContext():
+        result = f.run()
+        assert result.task_states[out] == FinalTaskState.CACHE_VALID
+        assert get_count(result) == 1000
+
+
+def test_invalid_input_filter():
+    with pytest.raises(ValueError, match="Unknown filter operator"):
+
+        @materialize(input_filter=[("id", "~", 1)])
+        def task_1(x):
+            return x
+
+    with pytest.raises(ValueError, match="fraction between 0 and 1"):
+
+        @materialize(input_sample=10)
+        def task_2(x):
+            return x
+
+
+def test_normalize_filters():
+    assert normalize_filters([("a", "==", 1)]) == [[("a", "==", 1)]]
+    assert normalize_filters([[("a", "==", 1)], [("b", "in", [1, 2])]]) == [
+        [("a", "==", 1)],
+        [("b", "in", [1, 2])],
+    ]
+    with pytest.raises(ValueError):
+        normalize_filters(("a", "==", 1))
+    with pytest.raises(ValueError):
+        normalize_filters([])
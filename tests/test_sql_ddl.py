@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from pydiverse.pipedag.backend.table.sql.ddl import insert_into_in_query
+from sqlalchemy.dialects import postgresql
+
+from pydiverse.pipedag import Schema
+from pydiverse.pipedag.backend.table.sql.ddl import MoveTable, insert_into_in_query
 
 
 def test_insert_into():
@@ -24,3 +27,9 @@ def test_insert_into():
     for raw_query, expected_query in test_pairs.items():
         res = insert_into_in_query(raw_query, "a", "b")
         assert res == expected_query
+
+
+def test_move_table():
+    move = MoveTable("tbl", Schema("stage"), Schema("stage__tmp"))
+    query = str(move.compile(dialect=postgresql.dialect()))
+    assert query == "ALTER TABLE stage.tbl SET SCHEMA stage__tmp"
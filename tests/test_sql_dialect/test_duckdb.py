@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import datetime as dt
+
+import pandas as pd
+import pytest
+import sqlalchemy as sa
+
+from pydiverse.pipedag import Flow, Stage, Table, materialize
+from pydiverse.pipedag.backend.table.sql.dialects.duckdb import PandasTableHook
+from pydiverse.pipedag.context import ConfigContext, StageLockContext
+from tests.fixtures.instances import with_instances
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+
+@with_instances("duckdb")
+@pytest.mark.skipif(pl is None, reason="polars is not installed")
+def test_duckdb_polars_upload(mocker):
+    df = pl.DataFrame(
+        {
+            "id": [1, 2, 3],
+            "int8": pl.Series([1, None, 3], dtype=pl.Int8),
+            "str": ["a", None, "c"],
+            "date": [dt.date(2000, 1, 1), None, dt.date(1900, 1, 1)],
+            "datetime": [dt.datetime(2024, 1, 1, 12), None, dt.datetime(1950, 6, 1)],
+        }
+    )
+
+    @materialize()
+    def upload():
+        return Table(df, "polars_upload", primary_key="id", indexes=[["str"]])
+
+    @materialize(input_type=pl.DataFrame)
+    def check(tbl: pl.DataFrame):
+        assert tbl.sort("id").equals(df)
+
+    with Flow() as f:
+        with Stage("duckdb_polars_upload"):
+            tbl = upload()
+            check(tbl)
+
+    store = ConfigContext.get().store.table_store
+    materialize_ = mocker.spy(PandasTableHook, "materialize_")
+    add_primary_key = mocker.spy(store, "add_primary_key")
+    add_index = mocker.spy(store, "add_index")
+
+    with StageLockContext():
+        result = f.run()
+        assert result.successful
+        assert materialize_.call_count == 0
+
+        schema = store.get_schema("duckdb_polars_upload").get()
+        columns = sa.inspect(store.engine).get_columns("polars_upload", schema=schema)
+        types = {c["name"]: str(c["type"]) for c in columns}
+        assert types == {
+            "id": "BIGINT",
+            "int8": "SMALLINT",
+            "str": "VARCHAR",
+            "date": "DATE",
+            "datetime": "TIMESTAMP",
+        }
+        assert add_primary_key.call_args.args[0] == "polars_upload"
+        assert add_index.call_args.args[0] == "polars_upload"
+        assert result.get(tbl, as_type=pd.DataFrame)["id"].tolist() == [1, 2, 3]
@@ -1,15 +1,31 @@
 from __future__ import annotations
 
+import datetime as dt
+import struct
 import uuid
 
 import pandas as pd
+import pyarrow as pa
+import pytest
 import sqlalchemy as sa
 import structlog
 
-from pydiverse.pipedag import Flow, Stage, materialize
-from pydiverse.pipedag.context import ConfigContext
+from pydiverse.pipedag import Flow, Stage, Table, materialize
+from pydiverse.pipedag.backend.table.sql.ddl import MoveTable
+from pydiverse.pipedag.backend.table.sql.dialects.postgres_copy import (
+    PGCOPY_HEADER,
+    BinaryCopyReader,
+    to_copy_arrow_table,
+)
+from pydiverse.pipedag.backend.table.util import DType
+from pydiverse.pipedag.context import ConfigContext, FinalTaskState, StageLockContext
 from tests.fixtures.instances import with_instances
 
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
 
 @with_instances("postgres", "postgres_unlogged")
 def test_postgres_unlogged():
@@ -78,3 +94,187 @@ def test_postgres_unlogged():
     partial_invalidate = str(uuid.uuid4())
     f = get_flow(manual_invalidate, partial_invalidate)
     f.run()
+
+
+@with_instances("postgres")
+def test_postgres_move_cache_valid_tables(mocker):
+    @materialize(version="1.0.0")
+    def cache_valid():
+        return Table(pd.DataFrame({"x": [1, 2, 3]}), "cache_valid")
+
+    @materialize(lazy=True)
+    def cache_valid_lazy():
+        return Table(sa.select(sa.literal(1).label("x")), "cache_valid_lazy")
+
+    @materialize(version=None)
+    def cache_invalid():
+        # version=None: always gets executed
+        return Table(pd.DataFrame({"x": [1]}), "cache_invalid")
+
+    with Flow() as f:
+        with Stage("move_stage"):
+            tbl = cache_valid()
+            lazy_tbl = cache_valid_lazy()
+            cache_invalid()
+
+    table_store = ConfigContext.get().store.table_store
+    schema = table_store.get_schema("move_stage").get()
+
+    def get_oid(name: str):
+        with table_store.engine_connect() as conn:
+            return conn.execute(
+                sa.text("SELECT to_regclass(:name)::oid"),
+                {"name": f"{schema}.{name}"},
+            ).scalar()
+
+    assert f.run().successful
+    oids = {name: get_oid(name) for name in ("cache_valid", "cache_valid_lazy")}
+
+    table_store.move_cache_valid_tables = True
+    try:
+        with StageLockContext():
+            result = f.run()
+            assert result.task_states[tbl] == FinalTaskState.CACHE_VALID
+            assert result.get(tbl, as_type=pd.DataFrame)["x"].tolist() == [1, 2, 3]
+            assert result.get(lazy_tbl, as_type=pd.DataFrame)["x"].tolist() == [1]
+    finally:
+        table_store.move_cache_valid_tables = False
+
+    # The committed tables are the same database objects as before (not copies)
+    for name, oid in oids.items():
+        assert get_oid(name) == oid
+
+    # If the commit fails, the committed schema keeps all of its tables
+    table_store.move_cache_valid_tables = True
+    execute = table_store.execute
+
+    def failing_execute(query, **kwargs):
+        if isinstance(query, list) and any(isinstance(q, MoveTable) for q in query):
+            query = [*query, sa.text("SELECT * FROM does_not_exist")]
+        return execute(query, **kwargs)
+
+    mocker.patch.object(table_store, "execute", side_effect=failing_execute)
+    try:
+        assert not f.run(fail_fast=False).successful
+    finally:
+        table_store.move_cache_valid_tables = False
+    for name, oid in oids.items():
+        assert get_oid(name) == oid
+
+
+def decode_binary_copy(data: bytes) -> list[list[bytes | None]]:
+    assert data.startswith(PGCOPY_HEADER)
+    pos = len(PGCOPY_HEADER)
+    rows = []
+    while True:
+        (num_fields,) = struct.unpack_from("!h", data, pos)
+        pos += 2
+        if num_fields == -1:
+            break
+        row = []
+        for _ in range(num_fields):
+            (length,) = struct.unpack_from("!i", data, pos)
+            pos += 4
+            if length == -1:
+                row.append(None)
+            else:
+                row.append(data[pos : pos + length])
+                pos += length
+        rows.append(row)
+    assert pos == len(data)
+    return rows
+
+
+@pytest.mark.postgres
+def test_binary_copy_encoding():
+    data = pa.table(
+        {
+            "int": pa.array([1, None, -3], pa.int64()),
+            "uint": pa.array([255, 0, None], pa.uint8()),
+            "float": pa.array([1.5, None, -2.0], pa.float32()),
+            "str": pa.array(["a", None, "\\N"], pa.string()),
+            "bool": pa.array([True, None, False]),
+            "date": pa.array([dt.date(2000, 1, 2), None, dt.date(1969, 12, 31)]),
+            "datetime": pa.array(
+                [dt.datetime(2000, 1, 1, 0, 0, 1), None, dt.datetime(1970, 1, 1)],
+                pa.timestamp("ns"),
+            ),
+        }
+    )
+    dtypes = {name: DType.from_arrow(data[name].type) for name in data.column_names}
+    data = to_copy_arrow_table(data, dtypes)
+
+    # Tiny batches and reads to cover row and chunk boundaries
+    reader = BinaryCopyReader(data, batch_size=1)
+    encoded = b""
+    while chunk := reader.read(7):
+        encoded += chunk
+
+    assert decode_binary_copy(encoded) == [
+        [
+            struct.pack("!q", 1),
+            struct.pack("!h", 255),
+            struct.pack("!f", 1.5),
+            b"a",
+            b"\x01",
+            struct.pack("!i", 1),
+            struct.pack("!q", 1_000_000),
+        ],
+        [None, struct.pack("!h", 0), None, None, None, None, None],
+        [
+            struct.pack("!q", -3),
+            None,
+            struct.pack("!f", -2.0),
+            b"\\N",
+            b"\x00",
+            struct.pack("!i", -10_958),
+            struct.pack("!q", -946_684_800_000_000),
+        ],
+    ]
+
+
+@pytest.mark.postgres
+def test_binary_copy_unsupported_dtype():
+    data = pa.table({"x": [1, 2], "y": [[1], [2]]})
+    with pytest.raises(TypeError, match="'y'"):
+        to_copy_arrow_table(data, {"x": DType.INT64})
+
+
+@with_instances("postgres")
+@pytest.mark.parametrize("kind", ["numpy", "arrow", "polars"])
+def test_postgres_binary_copy(kind):
+    if kind == "polars" and pl is None:
+        pytest.skip("polars is not installed")
+
+    df = pd.DataFrame(
+        {
+            "int": pd.array([1, None, 3], dtype="Int64"),
+            "str": ["a", None, "\\N"],
+            "date": [dt.date(2000, 1, 1), None, dt.date(1900, 1, 1)],
+            "datetime": pd.to_datetime(["2024-01-01 12:00", None, "1950-06-01 00:00"]),
+        }
+    )
+    if kind == "arrow":
+        df = df.convert_dtypes(dtype_backend="pyarrow")
+
+    @materialize(version="1.0")
+    def upload():
+        if kind == "polars":
+            return Table(pl.from_pandas(df), "binary_copy")
+        return Table(df, "binary_copy")
+
+    @materialize(input_type=pd.DataFrame)
+    def check(tbl: pd.DataFrame):
+        assert tbl["int"].tolist()[::2] == [1, 3]
+        assert pd.isna(tbl["int"][1])
+        # The string "\\N" is not confused with NULL
+        assert tbl["str"].tolist()[::2] == ["a", "\\N"]
+        assert pd.isna(tbl["str"][1])
+        assert pd.isna(tbl["date"][1]) and pd.isna(tbl["datetime"][1])
+        assert pd.Timestamp(tbl["datetime"][0]) == pd.Timestamp("2024-01-01 12:00")
+
+    with Flow() as f:
+        with Stage("binary_copy"):
+            check(upload())
+
+    assert f.run().successful
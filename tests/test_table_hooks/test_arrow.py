@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import pandas as pd
+import pyarrow as pa
+
+from pydiverse.pipedag import ConfigContext, Flow, Stage, Table, materialize
+from pydiverse.pipedag.backend.table.sql.hooks import (
+    ArrowDownloadError,
+    ArrowTableHook,
+)
+
+# Parameterize all tests in this file with several instance_id configurations
+from tests.fixtures.instances import DATABASE_INSTANCES, with_instances
+
+pytestmark = [with_instances(DATABASE_INSTANCES)]
+
+
+def test_table_store():
+    @materialize()
+    def in_table():
+        return Table(
+            pd.DataFrame(
+                {
+                    "int": pd.array([1, None, 3], dtype="Int64"),
+                    "str": pd.array(["a", "b", None], dtype="string"),
+                }
+            ),
+            "arrow_table",
+        )
+
+    @materialize(input_type=pa.Table)
+    def check_arrow(t: pa.Table):
+        assert t.column_names == ["int", "str"]
+        assert t["int"].to_pylist() == [1, None, 3]
+        assert t["str"].to_pylist() == ["a", "b", None]
+
+    @materialize(input_type=(pd.DataFrame, "numpy"))
+    def check_pandas(df: pd.DataFrame):
+        assert str(df["int"].dtype) == "Int64"
+        assert df["int"].tolist()[::2] == [1, 3]
+        assert pd.isna(df["int"][1])
+
+    @materialize(input_type=(pd.DataFrame, "arrow"))
+    def check_pandas_arrow(df: pd.DataFrame):
+        assert isinstance(df["int"].dtype, pd.ArrowDtype)
+        assert df["str"].tolist()[:2] == ["a", "b"]
+
+    with Flow() as f:
+        with Stage("arrow"):
+            t = in_table()
+            check_arrow(t)
+            check_pandas(t)
+            check_pandas_arrow(t)
+
+    assert f.run().successful
+
+
+def test_download_arrow_fallback(mocker):
+    store = ConfigContext.get().store.table_store
+    arrow_hook = store.get_hook_subclass(ArrowTableHook)
+
+    @materialize()
+    def in_table():
+        return pd.DataFrame({"x": [1, 2, 3]})
+
+    @materialize(input_type=pd.DataFrame)
+    def check(df: pd.DataFrame):
+        assert df["x"].tolist() == [1, 2, 3]
+
+    with Flow() as f:
+        with Stage("arrow_fallback"):
+            check(in_table())
+
+    # Without arrow reader, the regular download path gets used
+    download_arrow = mocker.patch.object(
+        arrow_hook, "download_arrow", side_effect=NotImplementedError
+    )
+    assert f.run().successful
+    download_arrow.assert_called()
+
+    # The same applies if the arrow reader can't read the result
+    download_arrow = mocker.patch.object(
+        arrow_hook, "download_arrow", side_effect=ArrowDownloadError("unsupported")
+    )
+    assert f.run().successful
+    download_arrow.assert_called()
+
+
+def test_partitioned_download(mocker):
+    store = ConfigContext.get().store.table_store
+    arrow_hook = store.get_hook_subclass(ArrowTableHook)
+
+    @materialize()
+    def in_table():
+        df = pd.DataFrame({"id": range(100), "x": [str(i) for i in range(100)]})
+        return Table(df, primary_key="id")
+
+    @materialize(input_type=pd.DataFrame)
+    def check(df: pd.DataFrame):
+        assert sorted(df["id"].tolist()) == list(range(100))
+        assert len(df) == 100
+
+    with Flow() as f:
+        with Stage("arrow_partitions"):
+            check(in_table())
+
+    config = ConfigContext.get().evolve(
+        table_hook_args={"arrow": {"download_partitions": 4}}
+    )
+    download_arrow = mocker.spy(arrow_hook, "download_arrow")
+    with config:
+        assert f.run().successful
+
+    # The table of `check` got downloaded in 4 partitions
+    partition_queries = [
+        call.args[1]
+        for call in download_arrow.call_args_list
+        if "WHERE" in call.args[1]
+    ]
+    assert len(partition_queries) == 4
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from pydiverse.pipedag import ConfigContext, Flow, Stage, Table, materialize
+from pydiverse.pipedag.backend.table.sql.hooks import (
+    ArrowTableHook,
+    BatchesTableHook,
+    LazyPolarsTableHook,
+    PolarsTableHook,
+    _regroup_record_batches,
+)
+from pydiverse.pipedag.context import StageLockContext
+
+# Parameterize all tests in this file with several instance_id configurations
+from tests.fixtures.instances import DATABASE_INSTANCES, with_instances
+
+pytestmark = [with_instances(DATABASE_INSTANCES)]
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+
+@materialize(version="1.1")
+def numbers():
+    df = pd.DataFrame({"id": range(25), "x": [str(i) for i in range(25)]})
+    return Table(df, "numbers")
+
+
+def batch_size_config(batch_size: int):
+    return ConfigContext.get().evolve(
+        table_hook_args={"arrow": {"batch_size": batch_size}}
+    )
+
+
+def test_iterator_input_and_output():
+    @materialize(input_type=Iterator[pd.DataFrame])
+    def double(batches: Iterator[pd.DataFrame]):
+        def transform():
+            sizes = []
+            for df in batches:
+                sizes.append(len(df))
+                yield df.assign(y=df["id"] * 2)
+            assert sizes == [10, 10, 5]
+
+        return Table(transform(), "doubled", indexes=[["y"]])
+
+    with Flow() as f:
+        with Stage("batches"):
+            out = double(numbers())
+
+    with batch_size_config(10), StageLockContext():
+        result = f.run()
+        assert result.successful
+
+        df = result.get(out, as_type=pd.DataFrame).sort_values("id")
+        assert df["y"].tolist() == [2 * i for i in range(25)]
+
+
+def test_record_batch_reader():
+    @materialize(input_type=pa.RecordBatchReader)
+    def passthrough(reader: pa.RecordBatchReader):
+        assert reader.schema.names == ["id", "x"]
+        return Table(reader, "passthrough")
+
+    @materialize(input_type=Iterator[pa.Table])
+    def count(tables: Iterator[pa.Table]):
+        return sum(t.num_rows for t in tables)
+
+    with Flow() as f:
+        with Stage("batches"):
+            n = count(passthrough(numbers()))
+
+    with batch_size_config(7), StageLockContext():
+        result = f.run()
+        assert result.successful
+        assert result.get(n) == 25
+
+
+@pytest.mark.polars
+def test_polars_batches():
+    @materialize(input_type=Iterator[pl.DataFrame])
+    def filtered(batches: Iterator[pl.DataFrame]):
+        return Table((df.filter(pl.col("id") % 2 == 0) for df in batches), "even")
+
+    with Flow() as f:
+        with Stage("batches"):
+            out = filtered(numbers())
+
+    with batch_size_config(4), StageLockContext():
+        result = f.run()
+        assert result.successful
+        assert len(result.get(out, as_type=pl.DataFrame)) == 13
+
+
+@pytest.mark.polars
+@pytest.mark.parametrize("native", [True, False])
+def test_lazy_polars_streamed(mocker, native):
+    store = ConfigContext.get().store.table_store
+    batches_hook = store.get_hook_subclass(BatchesTableHook)
+    if not native:
+        # Upload in batches instead of letting the database consume the stream
+        lazy_hook = store.get_hook_subclass(LazyPolarsTableHook)
+        mocker.patch.object(
+            lazy_hook, "materialize_batches", LazyPolarsTableHook.materialize_batches
+        )
+
+    @materialize(input_type=pl.LazyFrame)
+    def filtered(lf: pl.LazyFrame, min_id: int):
+        return Table(lf.filter(pl.col("id") >= min_id), f"filtered_{min_id}")
+
+    @materialize(input_type=pl.LazyFrame)
+    def cumulative(lf: pl.LazyFrame):
+        # Not supported by the streaming engine of older polars versions
+        return Table(lf.with_columns(pl.col("id").cum_sum()), "cumulative")
+
+    with Flow() as f:
+        with Stage("batches"):
+            tbl = numbers()
+            out = filtered(tbl, 5)
+            empty = filtered(tbl, 100)
+            cum = cumulative(tbl)
+
+    # Lazy frames that can't be streamed get collected and stored as data frames.
+    # (Newer polars versions also call `LazyFrame.collect` when sinking.)
+    polars_materialize = mocker.spy(
+        store.get_hook_subclass(PolarsTableHook), "materialize"
+    )
+    materialize_batches = mocker.spy(batches_hook, "materialize")
+    with batch_size_config(7), StageLockContext():
+        result = f.run()
+        assert result.successful
+        assert result.get(out, as_type=pd.DataFrame)["id"].tolist() == list(
+            range(5, 25)
+        )
+        assert len(result.get(empty, as_type=pd.DataFrame)) == 0
+        assert result.get(cum, as_type=pd.DataFrame)["id"].iloc[-1] == 300
+
+    # `cumulative` can be streamed by newer polars versions
+    collected = {c.args[1].name for c in polars_materialize.call_args_list}
+    assert collected <= {"cumulative"}
+    streamed = {"filtered_5", "filtered_100", "cumulative"} - collected
+    assert materialize_batches.call_count == (0 if native else len(streamed))
+
+
+def test_regroup_record_batches():
+    schema = pa.schema([("x", pa.int64())])
+    batches = [pa.record_batch([list(range(n))], schema=schema) for n in (3, 3, 5, 1)]
+    reader = pa.RecordBatchReader.from_batches(schema, batches)
+    sizes = [t.num_rows for t in _regroup_record_batches(reader, 5)]
+    assert sizes == [6, 5, 1]
+
+    empty = pa.RecordBatchReader.from_batches(schema, [])
+    tables = list(_regroup_record_batches(empty, 5))
+    assert len(tables) == 1 and tables[0].schema == schema
+
+
+def test_server_side_cursor_fallback(mocker):
+    store = ConfigContext.get().store.table_store
+    arrow_hook = store.get_hook_subclass(ArrowTableHook)
+
+    @materialize(input_type=Iterator[pd.DataFrame])
+    def sizes(batches: Iterator[pd.DataFrame]):
+        return [len(df) for df in batches]
+
+    with Flow() as f:
+        with Stage("batches"):
+            out = sizes(numbers())
+
+    mocker.patch.object(
+        arrow_hook, "download_arrow_batches", side_effect=NotImplementedError
+    )
+    with batch_size_config(10), StageLockContext():
+        result = f.run()
+        assert result.successful
+        assert result.get(out) == [10, 10, 5]
+
+
+def test_empty_iterator():
+    @materialize()
+    def empty():
+        return Table(iter([]), "empty")
+
+    with Flow() as f:
+        with Stage("batches"):
+            empty()
+
+    with pytest.raises(ValueError, match="empty iterator"):
+        f.run()
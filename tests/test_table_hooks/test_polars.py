@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import datetime as dt
 from typing import Any
 
 import pytest
 
 from pydiverse.pipedag import *
-from pydiverse.pipedag.backend.table.sql.hooks import PolarsTableHook
+from pydiverse.pipedag.backend.table.sql.hooks import (
+    ArrowTableHook,
+    PolarsTableHook,
+    _polars_can_stream_io_sources,
+    _polars_predicate_to_filters,
+)
 from pydiverse.pipedag.backend.table.sql.sql import DISABLE_DIALECT_REGISTRATION
 
 # Parameterize all tests in this file with several instance_id configurations
@@ -168,6 +174,81 @@ def test_auto_version_2(mocker):
     in_tables_spy.assert_called(2)
 
 
+def test_lazy_polars_scan(mocker):
+    if not _polars_can_stream_io_sources():
+        pytest.skip("Lazy frame inputs are only scanned with polars >= 1.26")
+
+    @materialize()
+    def in_table():
+        return Table(
+            pl.DataFrame({"id": [1, 2, 3, 4], "x": ["a", "b", "c", "d"], "y": 0.0}),
+            "lazy_in",
+        )
+
+    @materialize(input_type=pl.LazyFrame)
+    def filter_select(tbl: pl.LazyFrame):
+        return Table(tbl.filter(pl.col("id") >= 2).select("x"))
+
+    @materialize(input_type=pl.LazyFrame)
+    def head(tbl: pl.LazyFrame):
+        return Table(tbl.head(2))
+
+    with Flow() as f:
+        with Stage("lazy_polars_pushdown"):
+            t = in_table()
+            filtered = filter_select(t)
+            first = head(t)
+
+    build_query = mocker.spy(ArrowTableHook, "_build_retrieve_query")
+    with StageLockContext():
+        result = f.run()
+        assert result.successful
+        assert result.get(filtered, as_type=pl.DataFrame)["x"].sort().to_list() == [
+            "b",
+            "c",
+            "d",
+        ]
+        assert len(result.get(first, as_type=pl.DataFrame)) == 2
+
+    scans = [c.args[1] for c in build_query.call_args_list if c.args[1].is_partial_read]
+    # Only the columns needed by the query get selected
+    assert [t.columns for t in scans if t.limit is None] == [["id", "x"]]
+    # Simple predicates become a WHERE clause
+    assert [t.filters for t in scans if t.limit is None] == [[[("id", ">=", 2)]]]
+    # `head()` becomes a LIMIT
+    assert [t.limit for t in scans if t.columns is None] == [2]
+
+
+def test_polars_predicate_to_filters():
+    col = pl.col
+
+    filters, exact = _polars_predicate_to_filters((col("a") >= 1) & (col("b") == "x"))
+    assert exact
+    assert sorted(filters) == [("a", ">=", 1), ("b", "==", "x")]
+
+    filters, exact = _polars_predicate_to_filters(
+        (2.5 > col("a"))
+        & (col("d") != dt.date(2000, 1, 1))
+        & (col("c") == True)  # noqa: E712
+    )
+    assert exact
+    assert sorted(filters) == [
+        ("a", "<", 2.5),
+        ("c", "==", True),
+        ("d", "!=", dt.date(2000, 1, 1)),
+    ]
+
+    # Other conditions are evaluated by polars
+    filters, exact = _polars_predicate_to_filters(
+        (col("a") > 1) & ((col("b") < "x") | col("c").is_null())
+    )
+    assert not exact
+    assert filters == [("a", ">", 1)]
+
+    assert _polars_predicate_to_filters(col("a") > col("b")) == ([], False)
+    assert _polars_predicate_to_filters(col("a") == 2**64) == ([], False)
+
+
 def test_custom_download():
     class TestTableStore(ConfigContext.get().store.table_store.__class__):
         _dialect_name = DISABLE_DIALECT_REGISTRATION
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from pydiverse.pipedag import ConfigContext, Flow, Stage, Table, materialize
+from pydiverse.pipedag.context import FinalTaskState, StageLockContext
+from pydiverse.pipedag.context.context import CacheValidationMode
+from pydiverse.pipedag.engine import ThreadPoolEngine
+from tests.fixtures.instances import DATABASE_INSTANCES, with_instances
+from tests.util import tasks_library as m
+
+_lock = threading.Lock()
+_running = {}
+_max_running = {}
+
+
+def _reset_counters():
+    _running.clear()
+    _max_running.clear()
+
+
+@materialize(input_type=pd.DataFrame)
+def slow_table(x: int, stage: str):
+    with _lock:
+        _running[stage] = _running.get(stage, 0) + 1
+        _max_running[stage] = max(_max_running.get(stage, 0), _running[stage])
+    try:
+        time.sleep(0.2)
+        return Table(pd.DataFrame({"x": [x]}))
+    finally:
+        with _lock:
+            _running[stage] -= 1
+
+
+@materialize(input_type=pd.DataFrame)
+def concat(*dfs: pd.DataFrame):
+    return Table(pd.concat(dfs, ignore_index=True))
+
+
+@materialize(version="1.0")
+def fail():
+    raise ValueError("THIS EXCEPTION IS EXPECTED")
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_thread_pool_engine():
+    _reset_counters()
+
+    with Flow() as f:
+        with Stage("thread_pool_1") as s1:
+            tables_1 = [slow_table(i, s1.name) for i in range(4)]
+            out_1 = concat(*tables_1)
+        with Stage("thread_pool_2") as s2:
+            tables_2 = [slow_table(i, s2.name) for i in range(4)]
+            out_2 = concat(out_1, *tables_2)
+
+    engine = ThreadPoolEngine(max_workers=4, max_tasks_per_stage=2)
+    with StageLockContext():
+        result = f.run(orchestration_engine=engine)
+        assert result.successful
+
+        assert sorted(result.get(out_1, as_type=pd.DataFrame)["x"]) == [0, 1, 2, 3]
+        assert len(result.get(out_2, as_type=pd.DataFrame)) == 8
+    assert 1 < _max_running[s1.name] <= 2
+    assert 1 < _max_running[s2.name] <= 2
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_thread_pool_engine_swallowed_exception():
+    with Flow() as f:
+        with Stage("thread_pool_fail"):
+            failed = fail()
+            one = m.one()
+            noop = m.noop(failed)
+
+    with ConfigContext.get().evolve(swallow_exceptions=True):
+        result = f.run(orchestration_engine=ThreadPoolEngine(), fail_fast=False)
+
+    assert not result.successful
+    assert result.task_states[failed] == FinalTaskState.FAILED
+    assert result.task_states[one] in (
+        FinalTaskState.COMPLETED,
+        FinalTaskState.CACHE_VALID,
+    )
+    assert noop not in result.task_values
+
+
+@with_instances(DATABASE_INSTANCES)
+def test_task_durations_priorities():
+    with Flow() as f:
+        with Stage("thread_pool_durations") as s:
+            short = m.one()
+            long = slow_table(1, s.name)
+            after_long = m.noop(long)
+            # Same name as after_long but a different position in the flow
+            after_short = m.noop(short)
+
+    # Durations only get stored for tasks that actually get executed
+    assert f.run(
+        orchestration_engine=ThreadPoolEngine(),
+        cache_validation_mode=CacheValidationMode.FORCE_CACHE_INVALID,
+    ).successful
+
+    table_store = ConfigContext.get().store.table_store
+    durations = table_store.retrieve_task_durations([s])
+    assert durations[long.position_hash] >= 0.2
+    assert short.position_hash in durations
+    assert after_long.position_hash in durations
+    assert after_short.position_hash in durations
+
+    priorities = ThreadPoolEngine().get_task_priorities(f.get_subflow())
+    assert priorities[long] > priorities[after_long] > priorities[s.commit_task]
+    assert priorities[long] > priorities[short]
+
+    # Without caching (e.g. incompatible metadata), default durations get used
+    table_store.disable_caching = True
+    try:
+        assert table_store.retrieve_task_durations([s]) == {}
+        assert long in ThreadPoolEngine().get_task_priorities(f.get_subflow())
+    finally:
+        table_store.disable_caching = False
+
+
+def test_thread_pool_engine_invalid_args():
+    with pytest.raises(ValueError):
+        ThreadPoolEngine(max_workers=0)
+    with pytest.raises(ValueError):
+        ThreadPoolEngine(max_tasks_per_stage=0)
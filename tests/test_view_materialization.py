@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+import sqlalchemy as sa
+
+from pydiverse.pipedag import ConfigContext, Flow, Stage, Table, materialize
+from pydiverse.pipedag.backend.table.sql.sql import _query_source_schemas
+from pydiverse.pipedag.context import StageLockContext
+from tests.fixtures.instances import with_instances
+
+
+@materialize(version="1.0")
+def numbers():
+    return Table(pd.DataFrame({"x": [1, 2, 3]}), "numbers")
+
+
+@materialize(lazy=True, input_type=sa.Table, materialization="view")
+def renamed(tbl: sa.Alias, name: str):
+    return Table(sa.select(tbl.c.x.label("y")).select_from(tbl), name)
+
+
+@materialize(input_type=pd.DataFrame)
+def download(df: pd.DataFrame):
+    return df.iloc[:, 0].tolist()
+
+
+def created_views(create_view) -> list[str]:
+    return [c.args[0].name for c in create_view.call_args_list]
+
+
+@with_instances("postgres", "duckdb")
+def test_view_materialization(mocker):
+    @materialize(lazy=True, input_type=sa.Table)
+    def with_pk(tbl: sa.Alias):
+        query = sa.select(tbl.c.x).select_from(tbl)
+        return Table(query, "with_pk", primary_key="x", materialization="view")
+
+    with Flow() as f:
+        with Stage("view_materialization_1"):
+            n = numbers()
+            view = renamed(n, "renamed")
+            # Views can't have a primary key
+            pk = with_pk(n)
+            out = download(view)
+        with Stage("view_materialization_2"):
+            # Views can't read tables of other stages
+            other_stage = renamed(n, "other_stage")
+
+    store = ConfigContext.get().store.table_store
+    create_view = mocker.spy(store, "create_view")
+
+    with StageLockContext():
+        result = f.run()
+        assert result.successful
+        assert list(result.get(out)) == [1, 2, 3]
+        assert result.get(pk, as_type=pd.DataFrame)["x"].tolist() == [1, 2, 3]
+        assert result.get(other_stage, as_type=pd.DataFrame)["y"].tolist() == [1, 2, 3]
+    assert created_views(create_view) == ["renamed"]
+
+    # Cache valid views get created again instead of being copied
+    with StageLockContext():
+        result = f.run()
+        assert result.successful
+        assert list(result.get(out)) == [1, 2, 3]
+        assert result.get(view, as_type=pd.DataFrame)["y"].tolist() == [1, 2, 3]
+
+
+@with_instances("postgres", "duckdb")
+def test_auto_materialization(mocker):
+    @materialize(lazy=True, input_type=sa.Table, materialization="auto")
+    def doubled(tbl: sa.Alias, name: str):
+        return Table(sa.select((tbl.c.x * 2).label("x")).select_from(tbl), name)
+
+    with Flow() as f:
+        with Stage("auto_materialization"):
+            n = numbers()
+            # One consumer -> view
+            single = doubled(n, "single")
+            download(single)
+            # Several consumers with too many rows -> table
+            shared = doubled(n, "shared")
+            outs = [download(shared) for _ in range(3)]
+
+    store = ConfigContext.get().store.table_store
+    create_view = mocker.spy(store, "create_view")
+    auto_view_max_rows = store.auto_view_max_rows
+    store.auto_view_max_rows = 5
+    try:
+        with StageLockContext():
+            result = f.run()
+            assert result.successful
+            assert all(list(result.get(out)) == [2, 4, 6] for out in outs)
+    finally:
+        store.auto_view_max_rows = auto_view_max_rows
+
+    assert created_views(create_view) == ["single"]
+
+
+def test_materialization_option():
+    with pytest.raises(ValueError, match="materialization"):
+        Table(sa.select(sa.literal(1)), materialization="materialized_view")
+    with pytest.raises(ValueError, match="materialization"):
+        materialize(lambda: None, materialization="auto_view")
+
+
+def test_query_source_schemas():
+    tbl = sa.Table("tbl", sa.MetaData(), sa.Column("x", sa.Integer), schema="s")
+    other = sa.Table("other", sa.MetaData(), sa.Column("x", sa.Integer), schema="t")
+
+    query = sa.select(tbl.c.x).where(tbl.c.x.in_(sa.select(other.c.x)))
+    assert _query_source_schemas(query) == {"s", "t"}
+    assert _query_source_schemas(sa.select(sa.text("x")).select_from(tbl)) == {"s"}
+    # Textual SQL might read any table
+    assert _query_source_schemas(sa.text("SELECT * FROM s.tbl")) is None
+    query = sa.select(sa.text("*")).select_from(sa.text("t"))
+    assert _query_source_schemas(query) is None
+    text_query = sa.text("SELECT 1 AS x").columns(sa.column("x")).subquery()
+    assert _query_source_schemas(sa.select(text_query.c.x)) is None
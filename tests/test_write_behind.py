@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import threading
+
+import pandas as pd
+import pytest
+import sqlalchemy as sa
+
+from pydiverse.pipedag import Blob, ConfigContext, Flow, Stage, Table, materialize
+from pydiverse.pipedag.context import FinalTaskState, StageLockContext
+from pydiverse.pipedag.materialize.write_behind import WriteBehindQueue
+from tests.fixtures.instances import DATABASE_INSTANCES, with_instances
+
+pytestmark = [with_instances(DATABASE_INSTANCES)]
+
+
+@pytest.fixture
+def write_behind():
+    with ConfigContext.get().evolve(write_behind={"enabled": True}):
+        yield
+
+
+@materialize()
+def numbers():
+    return Table(pd.DataFrame({"x": [1, 2, 3]}), "numbers")
+
+
+@pytest.mark.usefixtures("write_behind")
+def test_outputs_handed_over(mocker):
+    @materialize(input_type=pd.DataFrame, nout=2)
+    def double(df):
+        return Table(df * 2, "doubled"), Blob(df["x"].tolist(), "blob")
+
+    @materialize(input_type=sa.Table, lazy=True)
+    def total(tbl):
+        return sa.select(sa.func.sum(tbl.c.x).label("x")).select_from(tbl)
+
+    with Flow() as f:
+        with Stage("write_behind"):
+            doubled, blob = double(numbers())
+            out = total(doubled)
+
+    store = ConfigContext.get().store
+    written = threading.Event()
+    threads = set()
+    store_table = store.table_store.store_table
+
+    def slow_store_table(table, task):
+        is_main_thread = threading.current_thread() is threading.main_thread()
+        threads.add((table.name, is_main_thread))
+        if table.name == "numbers":
+            # `double` must receive the dataframe before it has been written
+            assert written.wait(10)
+        store_table(table, task)
+
+    handed_over = []
+    retrieve = WriteBehindQueue.retrieve
+
+    def record_retrieve(self, item, as_type):
+        obj = retrieve(self, item, as_type)
+        if item.name == "numbers":
+            handed_over.append(obj is not None)
+            written.set()
+        return obj
+
+    mocker.patch.object(store.table_store, "store_table", side_effect=slow_store_table)
+    mocker.patch.object(WriteBehindQueue, "retrieve", record_retrieve)
+
+    with StageLockContext():
+        result = f.run()
+        assert result.successful
+        assert result.get(doubled, as_type=pd.DataFrame)["x"].tolist() == [2, 4, 6]
+        assert result.get(blob) == [1, 2, 3]
+        assert result.get(out, as_type=pd.DataFrame)["x"].tolist() == [12]
+    assert handed_over == [True]
+    # Lazy tasks are always stored synchronously
+    for table_name, is_main_thread in threads:
+        assert is_main_thread == table_name.startswith("total"), table_name
+
+
+@pytest.mark.usefixtures("write_behind")
+def test_handed_over_like_retrieved(mocker):
+    @materialize()
+    def indexed():
+        df = pd.DataFrame({"x": [1, 2, 3], "s": ["a", "b", None]}, index=[7, 8, 9])
+        return Table(df, "indexed")
+
+    @materialize(input_type=pd.DataFrame)
+    def describe(df):
+        consumed.set()
+        return str(df.index), {col: str(dtype) for col, dtype in df.dtypes.items()}
+
+    with Flow() as f:
+        with Stage("write_behind_dtypes"):
+            tbl = indexed()
+            handed_over = describe(tbl)
+
+    store = ConfigContext.get().store
+    consumed = threading.Event()
+    store_table = store.table_store.store_table
+
+    def slow_store_table(table, task):
+        if table.name == "indexed":
+            # Consumers must receive the dataframe before it has been written
+            assert consumed.wait(10)
+        store_table(table, task)
+
+    mocker.patch.object(store.table_store, "store_table", side_effect=slow_store_table)
+    with StageLockContext():
+        result = f.run()
+        assert result.successful
+        retrieved = result.get(tbl, as_type=pd.DataFrame)
+        index, dtypes = result.get(handed_over)
+        assert index == str(retrieved.index) == str(pd.RangeIndex(3))
+        assert dtypes == {col: str(dtype) for col, dtype in retrieved.dtypes.items()}
+
+
+@pytest.mark.usefixtures("write_behind")
+def test_failed_write_fails_stage_commit():
+    @materialize()
+    def duplicates():
+        return Table(pd.DataFrame({"id": [1, 1]}), "duplicates", primary_key="id")
+
+    with Flow() as f:
+        with Stage("write_behind_fail"):
+            task = duplicates()
+
+    result = f.run(fail_fast=False)
+    assert not result.successful
+    # The task only finishes once its outputs have been written
+    assert result.task_states[task] == FinalTaskState.FAILED